@@ -0,0 +1,168 @@
+"""
+Run the benchmarks of issx or compare the results of two runs.
+
+    python -m benchmarks run --output results.json
+    python -m benchmarks compare baseline.json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+from datetime import UTC, datetime
+from importlib import metadata
+from pathlib import Path
+from typing import Any
+
+from attr import asdict
+
+from benchmarks.scenarios import (
+    BACKEND_INDEPENDENT_SCENARIOS,
+    SCENARIOS,
+    SERVERS,
+    BenchmarkOptions,
+)
+
+RESULTS_FORMAT_VERSION = 1
+
+
+def run(args: argparse.Namespace) -> None:
+    options = BenchmarkOptions(
+        latency=args.latency / 1000,
+        rate_limit=args.rate_limit,
+        issues=args.issues,
+        samples=args.samples,
+        concurrency=args.concurrency,
+    )
+    results = []
+    for scenario in args.scenario or list(SCENARIOS):
+        backends = args.backend or list(SERVERS)
+        if scenario in BACKEND_INDEPENDENT_SCENARIOS:
+            backends = backends[:1]
+        for backend in backends:
+            metrics = asyncio.run(SCENARIOS[scenario](backend, options))
+            if scenario in BACKEND_INDEPENDENT_SCENARIOS:
+                backend = None
+            results.append(
+                {"scenario": scenario, "backend": backend, "metrics": metrics}
+            )
+            print(f"{_get_key(results[-1])}: {_format_metrics(metrics)}")
+    report = {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "issx_version": _get_version(),
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": datetime.now(UTC).isoformat(),
+        "options": asdict(options),
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Results written to {args.output}")
+
+
+def compare(args: argparse.Namespace) -> None:
+    baseline, current = (json.loads(path.read_text()) for path in args.files)
+    if baseline["options"] != current["options"]:
+        print("Warning: the results were measured with different options")
+    baseline_results = {_get_key(result): result for result in baseline["results"]}
+    print(f"{'':<40} {baseline['issx_version']:>12} {current['issx_version']:>12}")
+    for result in current["results"]:
+        key = _get_key(result)
+        baseline_metrics = baseline_results.get(key, {}).get("metrics", {})
+        for name, value in result["metrics"].items():
+            if (old := baseline_metrics.get(name)) is None:
+                change = "new"
+            elif old == 0:
+                change = ""
+            else:
+                change = f"{(value - old) / old:+.1%}"
+            old_value = "-" if old is None else f"{old:.2f}"
+            print(f"{key + '.' + name:<40} {old_value:>12} {value:>12.2f} {change:>8}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    subparsers = parser.add_subparsers(required=True)
+
+    defaults = BenchmarkOptions()
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks")
+    run_parser.set_defaults(function=run)
+    run_parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=list(SCENARIOS),
+        help="Scenario to run, can be repeated. Defaults to all scenarios.",
+    )
+    run_parser.add_argument(
+        "--backend",
+        action="append",
+        choices=list(SERVERS),
+        help="Backend to run the scenarios against, can be repeated."
+        " Defaults to all backends.",
+    )
+    run_parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Latency of every response of the fake servers in milliseconds",
+    )
+    run_parser.add_argument(
+        "--rate-limit",
+        type=int,
+        help="Maximum number of requests per second accepted by the fake servers",
+    )
+    run_parser.add_argument(
+        "--issues",
+        type=int,
+        default=defaults.issues,
+        help="Number of issues copied in bulk and present in the target project",
+    )
+    run_parser.add_argument(
+        "--samples",
+        type=int,
+        default=defaults.samples,
+        help="Number of measured single copies and CLI startups",
+    )
+    run_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=defaults.concurrency,
+        help="Maximum number of issues copied concurrently in bulk",
+    )
+    run_parser.add_argument(
+        "--output", type=Path, help="Path to the JSON file to write the results to"
+    )
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="Compare the results of two runs"
+    )
+    compare_parser.set_defaults(function=compare)
+    compare_parser.add_argument(
+        "files", type=Path, nargs=2, metavar="FILE", help="Baseline and current results"
+    )
+
+    args = parser.parse_args(argv)
+    args.function(args)
+
+
+def _get_key(result: dict[str, Any]) -> str:
+    if result["backend"] is None:
+        return str(result["scenario"])
+    return f"{result['scenario']}[{result['backend']}]"
+
+
+def _format_metrics(metrics: dict[str, float | int]) -> str:
+    return ", ".join(f"{name}={value:.2f}" for name, value in metrics.items())
+
+
+def _get_version() -> str:
+    try:
+        return metadata.version("issx")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
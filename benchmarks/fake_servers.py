@@ -0,0 +1,614 @@
+"""
+Local stand-ins of the GitLab and Redmine REST APIs.
+
+The servers implement only the subset of the APIs used by issx and keep
+the issues in memory. Every response can be delayed to simulate the latency
+of a remote instance and the requests can be limited per second,
+in which case the servers respond with `429 Too Many Requests` and the rate
+limit headers sent by GitLab. Like the real instances, the servers send weak
+ETags of the responses and answer matching conditional requests
+with `304 Not Modified`. Uploaded files are kept in memory as well
+and downloaded as binary responses.
+"""
+
+import abc
+import hashlib
+import json
+import math
+import re
+import secrets
+import threading
+import time
+from collections import Counter
+from datetime import UTC, datetime
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import TracebackType
+from typing import Any, Self, cast
+from urllib.parse import parse_qs, quote, urlsplit
+
+Response = tuple[int, Any]
+
+
+class FakeServer(abc.ABC):
+    """
+    Base class of the fake servers running in a background thread.
+
+    Subclasses implement `handle` for the endpoints of their API.
+    """
+
+    def __init__(self, latency: float = 0.0, rate_limit: int | None = None):
+        """
+        :param latency: Number of seconds every response is delayed by
+        :param rate_limit: Maximum number of requests per second
+        or None for no limit
+        """
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.projects: dict[int, dict[int, dict[str, Any]]] = {}
+        self.files: dict[str, bytes] = {}
+        """Content of the uploaded files by their download paths"""
+        self.requests: Counter[str] = Counter()
+        self.throttled = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._window = 0
+        self._window_requests = 0
+        self._httpd: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        if self._httpd is None:
+            raise RuntimeError("The server is not running")
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    @property
+    def request_count(self) -> int:
+        return sum(self.requests.values())
+
+    def start(self) -> None:
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _RequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake_server = self  # type: ignore[attr-defined]
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.throttled = 0
+            self.not_modified = 0
+
+    def add_project(self, project_id: int) -> None:
+        self.projects.setdefault(project_id, {})
+
+    def add_issue(
+        self, project_id: int, title: str, description: str = ""
+    ) -> dict[str, Any]:
+        """
+        Create an issue directly in the storage of the server.
+
+        :return: The issue as returned by the API
+        """
+        with self._lock:
+            return self._create_issue(project_id, title, description)
+
+    @abc.abstractmethod
+    def handle(
+        self, method: str, path: str, query: dict[str, str], body: dict[str, Any]
+    ) -> Response:
+        """
+        :param body: Decoded JSON body of the request. Other bodies are passed
+        as `content` and `content_type` items.
+        :return: Status code and JSON body of the response, None for no body
+        or bytes for a binary body
+        """
+        pass
+
+    @abc.abstractmethod
+    def _create_issue(
+        self, project_id: int, title: str, description: str
+    ) -> dict[str, Any]:
+        pass
+
+    def _allocate_id(self) -> int:
+        issue_id, self._next_id = self._next_id, self._next_id + 1
+        return issue_id
+
+    def _throttle(self) -> dict[str, str] | None:
+        """
+        Count the request in the current one-second window.
+
+        :return: Rate limit headers or None if the rate is not limited
+        """
+        if self.rate_limit is None:
+            return None
+        now = time.time()
+        with self._lock:
+            if int(now) != self._window:
+                self._window, self._window_requests = int(now), 0
+            self._window_requests += 1
+            remaining = self.rate_limit - self._window_requests
+            if remaining < 0:
+                self.throttled += 1
+        headers = {
+            "RateLimit-Limit": str(self.rate_limit),
+            "RateLimit-Remaining": str(max(remaining, 0)),
+            "RateLimit-Reset": str(int(now) + 1),
+        }
+        if remaining < 0:
+            headers["Retry-After"] = str(math.ceil(int(now) + 1 - now))
+        return headers
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, Nagle would delay the body
+    disable_nagle_algorithm = True
+    server: ThreadingHTTPServer
+
+    def do_GET(self) -> None:  # noqa: N802
+        self._dispatch()
+
+    def do_POST(self) -> None:  # noqa: N802
+        self._dispatch()
+
+    def do_PUT(self) -> None:  # noqa: N802
+        self._dispatch()
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def _dispatch(self) -> None:
+        fake: FakeServer = self.server.fake_server  # type: ignore[attr-defined]
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        if fake.latency:
+            time.sleep(fake.latency)
+        rate_limit_headers = fake._throttle()
+        with fake._lock:
+            fake.requests[self.command] += 1
+        if rate_limit_headers and "Retry-After" in rate_limit_headers:
+            status, body = 429, {"message": "429 Too Many Requests"}
+        else:
+            url = urlsplit(self.path)
+            # repeated parameters, e.g. iids[] of GitLab, are joined with commas
+            query = {
+                key: ",".join(values) for key, values in parse_qs(url.query).items()
+            }
+            content_type = self.headers.get("Content-Type", "application/json")
+            try:
+                status, body = fake.handle(
+                    self.command,
+                    url.path,
+                    query,
+                    json.loads(raw_body or b"{}")
+                    if content_type.startswith("application/json")
+                    else {"content": raw_body, "content_type": content_type},
+                )
+            except Exception as e:
+                status, body = 500, {"message": repr(e)}
+        if isinstance(body, bytes):
+            content = body
+        else:
+            content = b"" if body is None else json.dumps(body).encode()
+        headers = dict(rate_limit_headers or {})
+        if self.command == "GET" and status == 200:
+            headers["ETag"] = f'W/"{hashlib.md5(content).hexdigest()}"'
+            if self.headers.get("If-None-Match") == headers["ETag"]:
+                status, content = 304, b""
+                with fake._lock:
+                    fake.not_modified += 1
+        self.send_response(status)
+        for header, value in headers.items():
+            self.send_header(header, value)
+        if isinstance(body, bytes):
+            self.send_header("Content-Type", "application/octet-stream")
+        elif body is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def _now() -> str:
+    return datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _paginate(items: list[dict[str, Any]], offset: int, limit: int) -> list[Any]:
+    return items[offset : offset + limit]
+
+
+class FakeGitlabServer(FakeServer):
+    """
+    Fake GitLab instance serving the v4 API of users, projects, issues
+    and their notes
+    """
+
+    ISSUE_PATH = re.compile(r"/api/v4/projects/(\d+)/issues(?:/(\d+))?")
+    PROJECT_PATH = re.compile(r"/api/v4/projects/(\d+)")
+    UPLOADS_PATH = re.compile(r"/api/v4/projects/(\d+)(/uploads(?:/[0-9a-f]+/[^/]+)?)")
+    NOTES_PATH = re.compile(r"/api/v4/projects/(\d+)/issues/(\d+)/notes")
+
+    def __init__(self, latency: float = 0.0, rate_limit: int | None = None):
+        super().__init__(latency, rate_limit)
+        self.notes: dict[int, list[dict[str, Any]]] = {}
+        """Notes of the issues by their global ids"""
+
+    def handle(
+        self, method: str, path: str, query: dict[str, str], body: dict[str, Any]
+    ) -> Response:
+        if path == "/api/v4/user" and method == "GET":
+            return 200, {"id": 1, "username": "benchmark", "name": "Benchmark"}
+        if match := self.PROJECT_PATH.fullmatch(path):
+            project_id = int(match[1])
+            if project_id not in self.projects:
+                return 404, {"message": "404 Project Not Found"}
+            return 200, {
+                "id": project_id,
+                "path_with_namespace": f"benchmark/project-{project_id}",
+            }
+        if match := self.ISSUE_PATH.fullmatch(path):
+            return self._handle_issues(method, match, query, body)
+        if match := self.UPLOADS_PATH.fullmatch(path):
+            return self._handle_uploads(method, int(match[1]), match[2], body)
+        if match := self.NOTES_PATH.fullmatch(path):
+            return self._handle_notes(method, match, query, body)
+        return 404, {"message": "404 Not Found"}
+
+    def _handle_notes(
+        self,
+        method: str,
+        match: re.Match[str],
+        query: dict[str, str],
+        body: dict[str, Any],
+    ) -> Response:
+        issue = self.projects.get(int(match[1]), {}).get(int(match[2]))
+        if issue is None:
+            return 404, {"message": "404 Not found"}
+        if method == "POST":
+            with self._lock:
+                note = {
+                    "id": self._allocate_id(),
+                    "body": body["body"],
+                    "author": {"id": 1, "username": "benchmark", "name": "Benchmark"},
+                    "created_at": _now(),
+                    "system": False,
+                    "internal": False,
+                    "noteable_iid": issue["iid"],
+                }
+                self.notes.setdefault(issue["id"], []).append(note)
+            return 201, note
+        with self._lock:
+            notes = list(self.notes.get(issue["id"], []))
+        per_page = int(query.get("per_page", 20))
+        page = int(query.get("page", 1))
+        return 200, _paginate(notes, (page - 1) * per_page, per_page)
+
+    def _handle_uploads(
+        self, method: str, project_id: int, path: str, body: dict[str, Any]
+    ) -> Response:
+        if project_id not in self.projects:
+            return 404, {"message": "404 Project Not Found"}
+        if method == "GET":
+            content = self.files.get(f"{project_id}{path}")
+            if content is None:
+                return 404, {"message": "404 Not Found"}
+            return 200, content
+        message = BytesParser(policy=policy.HTTP).parsebytes(
+            f"Content-Type: {body['content_type']}\r\n\r\n".encode() + body["content"]
+        )
+        part = next(
+            part
+            for part in message.iter_parts()
+            if part.get_param("name", header="content-disposition") == "file"
+        )
+        filename = part.get_filename() or "file"
+        url = f"/uploads/{secrets.token_hex(16)}/{quote(filename)}"
+        with self._lock:
+            self.files[f"{project_id}{url}"] = cast(
+                bytes, part.get_payload(decode=True)
+            )
+        return 201, {
+            "alt": filename,
+            "url": url,
+            "full_path": f"/-/project/{project_id}{url}",
+            "markdown": f"![{filename}]({url})",
+        }
+
+    def _handle_issues(
+        self,
+        method: str,
+        match: re.Match[str],
+        query: dict[str, str],
+        body: dict[str, Any],
+    ) -> Response:
+        issues = self.projects.get(int(match[1]))
+        if issues is None:
+            return 404, {"message": "404 Project Not Found"}
+        if match[2] is None:
+            if method == "POST":
+                with self._lock:
+                    created = self._create_issue(
+                        int(match[1]), body["title"], body.get("description", "")
+                    )
+                return 201, created
+            return 200, self._list_issues(issues, query)
+        issue = issues.get(int(match[2]))
+        if issue is None:
+            return 404, {"message": "404 Issue Not Found"}
+        if method == "PUT":
+            with self._lock:
+                issue.update(
+                    {key: body[key] for key in ("title", "description") if key in body},
+                    updated_at=_now(),
+                )
+        return 200, issue
+
+    def _list_issues(
+        self, issues: dict[int, dict[str, Any]], query: dict[str, str]
+    ) -> list[Any]:
+        with self._lock:
+            matching = list(issues.values())
+        if iids := query.get("iids[]"):
+            matching = [
+                issue for issue in matching if str(issue["iid"]) in iids.split(",")
+            ]
+        if search := query.get("search"):
+            matching = [issue for issue in matching if search in issue["title"]]
+        if updated_after := query.get("updated_after"):
+            after = datetime.fromisoformat(updated_after)
+            matching = [
+                issue
+                for issue in matching
+                if datetime.fromisoformat(issue["updated_at"]) > after
+            ]
+        per_page = int(query.get("per_page", 20))
+        page = int(query.get("page", 1))
+        return _paginate(matching, (page - 1) * per_page, per_page)
+
+    def _create_issue(
+        self, project_id: int, title: str, description: str
+    ) -> dict[str, Any]:
+        issues = self.projects.setdefault(project_id, {})
+        iid = len(issues) + 1
+        issue = {
+            "id": self._allocate_id(),
+            "iid": iid,
+            "project_id": project_id,
+            "title": title,
+            "description": description,
+            "state": "opened",
+            "labels": [],
+            "assignees": [],
+            "author": {"id": 1, "username": "benchmark", "name": "Benchmark"},
+            "milestone": None,
+            "web_url": f"{self.url}/benchmark/project-{project_id}/-/issues/{iid}",
+            "references": {
+                "short": f"#{iid}",
+                "full": f"benchmark/project-{project_id}#{iid}",
+            },
+            "created_at": _now(),
+            "updated_at": _now(),
+            "closed_at": None,
+        }
+        issues[iid] = issue
+        return issue
+
+
+class FakeRedmineServer(FakeServer):
+    """
+    Fake Redmine instance serving the REST API of users, projects, issues
+    and their journals
+    """
+
+    ISSUE_PATH = re.compile(r"/issues/(\d+)\.json")
+    PROJECT_PATH = re.compile(r"/projects/(\d+)\.json")
+    PROJECT_ISSUES_PATH = re.compile(r"/projects/(\d+)/issues\.json")
+    DOWNLOAD_PATH = re.compile(r"/attachments/download/\d+/[^/]+")
+
+    def __init__(self, latency: float = 0.0, rate_limit: int | None = None):
+        super().__init__(latency, rate_limit)
+        self.attachments: dict[int, list[dict[str, Any]]] = {}
+        self.journals: dict[int, list[dict[str, Any]]] = {}
+        self._uploads: dict[str, tuple[int, str, bytes, str | None]] = {}
+
+    def handle(
+        self, method: str, path: str, query: dict[str, str], body: dict[str, Any]
+    ) -> Response:
+        if path == "/users/current.json" and method == "GET":
+            return 200, {
+                "user": {
+                    "id": 1,
+                    "login": "benchmark",
+                    "firstname": "Benchmark",
+                    "lastname": "User",
+                }
+            }
+        if match := self.PROJECT_PATH.fullmatch(path):
+            project_id = int(match[1])
+            if project_id not in self.projects:
+                return 404, None
+            return 200, {
+                "project": {
+                    "id": project_id,
+                    "name": f"Project {project_id}",
+                    "identifier": f"project-{project_id}",
+                }
+            }
+        if match := self.PROJECT_ISSUES_PATH.fullmatch(path):
+            if method != "POST" or int(match[1]) not in self.projects:
+                return 404, None
+            return 201, {"issue": self._create_issue_with_uploads(int(match[1]), body)}
+        if path == "/uploads.json" or self.DOWNLOAD_PATH.fullmatch(path):
+            return self._handle_files(method, path, query, body)
+        if path == "/issues.json":
+            if "project_id" in query and int(query["project_id"]) not in self.projects:
+                return 404, None
+            return 200, self._list_issues(query)
+        if match := self.ISSUE_PATH.fullmatch(path):
+            return self._handle_issue(method, int(match[1]), query, body)
+        return 404, None
+
+    def _create_issue_with_uploads(
+        self, project_id: int, body: dict[str, Any]
+    ) -> dict[str, Any]:
+        fields = body["issue"]
+        with self._lock:
+            issue = self._create_issue(
+                project_id, fields["subject"], fields.get("description", "")
+            )
+            for upload in fields.get("uploads", []):
+                self._attach(issue["id"], upload)
+        return issue
+
+    def _handle_files(
+        self, method: str, path: str, query: dict[str, str], body: dict[str, Any]
+    ) -> Response:
+        if method == "GET":
+            content = self.files.get(path)
+            return (404, None) if content is None else (200, content)
+        with self._lock:
+            upload_id = self._allocate_id()
+            token = f"{upload_id}.{hashlib.sha256(body['content']).hexdigest()}"
+            self._uploads[token] = (
+                upload_id,
+                query.get("filename", ""),
+                body["content"],
+                body["content_type"],
+            )
+        return 201, {"upload": {"id": upload_id, "token": token}}
+
+    def _attach(self, issue_id: int, upload: dict[str, Any]) -> None:
+        upload_id, _, content, _ = self._uploads.pop(upload["token"])
+        filename = upload.get("filename", "")
+        path = f"/attachments/download/{upload_id}/{quote(filename)}"
+        self.files[path] = content
+        self.attachments.setdefault(issue_id, []).append(
+            {
+                "id": upload_id,
+                "filename": filename,
+                "filesize": len(content),
+                "content_type": upload.get("content_type"),
+                "content_url": f"{self.url}{path}",
+            }
+        )
+
+    def _handle_issue(
+        self, method: str, issue_id: int, query: dict[str, str], body: dict[str, Any]
+    ) -> Response:
+        issue = next(
+            (
+                issues[issue_id]
+                for issues in self.projects.values()
+                if issue_id in issues
+            ),
+            None,
+        )
+        if issue is None:
+            return 404, None
+        if method == "PUT":
+            fields = body["issue"]
+            with self._lock:
+                issue.update(
+                    {
+                        key: fields[key]
+                        for key in ("subject", "description")
+                        if key in fields
+                    },
+                    updated_on=_now(),
+                )
+                if fields.get("notes"):
+                    self._add_journal(issue_id, fields["notes"])
+            return 204, None
+        includes = query.get("include", "").split(",")
+        if "attachments" in includes:
+            issue = {**issue, "attachments": self.attachments.get(issue_id, [])}
+        if "journals" in includes:
+            issue = {**issue, "journals": self.journals.get(issue_id, [])}
+        return 200, {"issue": issue}
+
+    def _add_journal(self, issue_id: int, notes: str) -> None:
+        self.journals.setdefault(issue_id, []).append(
+            {
+                "id": self._allocate_id(),
+                "user": {"id": 1, "name": "Benchmark"},
+                "notes": notes,
+                "created_on": _now(),
+                "private_notes": False,
+                "details": [],
+            }
+        )
+
+    def _list_issues(self, query: dict[str, str]) -> dict[str, Any]:
+        with self._lock:
+            matching = [
+                issue
+                for project_id, issues in self.projects.items()
+                if str(project_id) == query.get("project_id", str(project_id))
+                for issue in issues.values()
+            ]
+        if issue_ids := query.get("issue_id"):
+            matching = [
+                issue for issue in matching if str(issue["id"]) in issue_ids.split(",")
+            ]
+        if (subject := query.get("subject", "")).startswith("~"):
+            matching = [
+                issue
+                for issue in matching
+                if subject[1:].lower() in issue["subject"].lower()
+            ]
+        if (updated_on := query.get("updated_on", "")).startswith(">="):
+            matching = [
+                issue for issue in matching if issue["updated_on"] >= updated_on[2:]
+            ]
+        offset, limit = int(query.get("offset", 0)), int(query.get("limit", 25))
+        return {
+            "issues": _paginate(matching, offset, limit),
+            "total_count": len(matching),
+            "offset": offset,
+            "limit": limit,
+        }
+
+    def _create_issue(
+        self, project_id: int, title: str, description: str
+    ) -> dict[str, Any]:
+        issue_id = self._allocate_id()
+        issue = {
+            "id": issue_id,
+            "project": {"id": project_id, "name": f"Project {project_id}"},
+            "status": {"id": 1, "name": "New"},
+            "author": {"id": 1, "name": "Benchmark"},
+            "subject": title,
+            "description": description,
+            "created_on": _now(),
+            "updated_on": _now(),
+        }
+        self.projects.setdefault(project_id, {})[issue_id] = issue
+        return issue
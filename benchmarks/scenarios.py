@@ -0,0 +1,254 @@
+"""
+Benchmark scenarios running issx against the fake servers.
+
+Every scenario starts fresh servers and uses an empty data directory,
+so the results do not depend on the mapping or caches of previous runs.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Coroutine, Iterator
+from contextlib import contextmanager
+from functools import partial
+from typing import Any
+
+from attr import define
+
+from benchmarks.fake_servers import FakeGitlabServer, FakeRedmineServer, FakeServer
+from issx.daemon import CommandRunner
+from issx.domain import SupportedBackend
+from issx.instance_managers.config_parser import GenericConfigParser
+from issx.instance_managers.managers import InstanceManager
+from issx.services import CopyResult
+
+InstanceManager.register_backend(
+    SupportedBackend.gitlab,
+    "issx.clients.gitlab:GitlabInstanceClient",
+    "issx.clients.gitlab:GitlabClient",
+)
+InstanceManager.register_backend(
+    SupportedBackend.redmine,
+    "issx.clients.redmine:RedmineInstanceClient",
+    "issx.clients.redmine:RedmineClient",
+)
+
+SERVERS: dict[str, type[FakeServer]] = {
+    SupportedBackend.gitlab: FakeGitlabServer,
+    SupportedBackend.redmine: FakeRedmineServer,
+}
+SOURCE_PROJECT = 1
+TARGET_PROJECT = 2
+
+Metrics = dict[str, float | int]
+
+
+@define
+class BenchmarkOptions:
+    latency: float = 0.0
+    """Number of seconds every response of the fake servers is delayed by"""
+    rate_limit: int | None = None
+    """Maximum number of requests per second accepted by the fake servers"""
+    issues: int = 200
+    """Number of issues copied in bulk and present in the target project"""
+    samples: int = 20
+    """Number of measurements of single copies and CLI startups"""
+    concurrency: int = 10
+    """Maximum number of issues copied concurrently in bulk"""
+
+
+@contextmanager
+def running_server(
+    backend: str, options: BenchmarkOptions
+) -> Iterator[tuple[FakeServer, CommandRunner]]:
+    """
+    Start a fake server of the backend with empty source and target projects
+    and a runner configured with them as the `source` and `target` projects.
+    """
+    with (
+        tempfile.TemporaryDirectory() as data_dir,
+        _environ(ISSX_DATA_DIR=data_dir),
+        SERVERS[backend](options.latency, options.rate_limit) as server,
+    ):
+        server.add_project(SOURCE_PROJECT)
+        server.add_project(TARGET_PROJECT)
+        config = GenericConfigParser.from_dict(
+            {
+                "instances": {
+                    "fake": {"backend": backend, "url": server.url, "token": "token"}
+                },
+                "projects": {
+                    "source": {"instance": "fake", "project": str(SOURCE_PROJECT)},
+                    "target": {"instance": "fake", "project": str(TARGET_PROJECT)},
+                },
+            }
+        )
+        with CommandRunner(config) as runner:
+            yield server, runner
+
+
+async def copy_latency(backend: str, options: BenchmarkOptions) -> Metrics:
+    """
+    Latency of copying single issues to an empty project.
+    The first copy authenticates and fetches the projects, so it is reported
+    separately as the cold copy.
+    """
+    with running_server(backend, options) as (server, runner):
+        issue_ids = _seed_source(server, options.samples + 1)
+        cold = await _timed(partial(runner.copy, "source", "target", issue_ids[0]))
+        server.reset_counters()
+        samples = [
+            await _timed(partial(runner.copy, "source", "target", id_))
+            for id_ in issue_ids[1:]
+        ]
+        return {
+            "cold_ms": cold * 1000,
+            **_latency_metrics(samples),
+            "requests_per_copy": server.request_count / len(samples),
+            "throttled": server.throttled,
+        }
+
+
+async def bulk_copy(backend: str, options: BenchmarkOptions) -> Metrics:
+    """
+    Throughput of copying many issues at once to an empty project
+    """
+    with running_server(backend, options) as (server, runner):
+        issue_ids = _seed_source(server, options.issues)
+        duration = await _timed(
+            lambda: _consume(
+                runner.copy_many(
+                    "source", "target", issue_ids, concurrency=options.concurrency
+                )
+            )
+        )
+        return {
+            "duration_s": duration,
+            "issues_per_s": len(issue_ids) / duration,
+            "requests": server.request_count,
+            "throttled": server.throttled,
+        }
+
+
+async def find_dedup(backend: str, options: BenchmarkOptions) -> Metrics:
+    """
+    Cost of finding the already copied issues by their titles in a project
+    with many issues. Single copies search the target project for every issue,
+    while bulk copies list the project once.
+    """
+    with running_server(backend, options) as (server, runner):
+        issue_ids = _seed_duplicates(server, options)
+        await runner.auth_verify("fake")
+        server.reset_counters()
+        samples = [
+            await _timed(partial(runner.copy, "source", "target", id_))
+            for id_ in issue_ids
+        ]
+        _check_no_duplicates(server)
+        single_requests = server.request_count
+    # a new data directory, so the mapping does not find the issues copied above
+    with running_server(backend, options) as (server, runner):
+        issue_ids = _seed_duplicates(server, options)
+        await runner.auth_verify("fake")
+        server.reset_counters()
+        bulk_duration = await _timed(
+            lambda: _consume(
+                runner.copy_many(
+                    "source", "target", issue_ids, concurrency=options.concurrency
+                )
+            )
+        )
+        _check_no_duplicates(server)
+        return {
+            **_latency_metrics(samples),
+            "requests_per_copy": single_requests / len(samples),
+            "bulk_duration_s": bulk_duration,
+            "bulk_requests": server.request_count,
+        }
+
+
+async def cli_startup(backend: str, options: BenchmarkOptions) -> Metrics:
+    """
+    Wall time of `issx --help` in a new interpreter
+    """
+    command = [sys.executable, "-m", "issx.cli", "--help"]
+    samples = []
+    for _ in range(options.samples):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, capture_output=True)
+        samples.append(time.perf_counter() - start)
+    return _latency_metrics(samples)
+
+
+Scenario = Callable[[str, BenchmarkOptions], Coroutine[Any, Any, Metrics]]
+SCENARIOS: dict[str, Scenario] = {
+    "copy_latency": copy_latency,
+    "bulk_copy": bulk_copy,
+    "find_dedup": find_dedup,
+    "cli_startup": cli_startup,
+}
+BACKEND_INDEPENDENT_SCENARIOS = {"cli_startup"}
+
+
+def _get_title(index: int) -> str:
+    return f"Benchmark issue {index}"
+
+
+def _seed_source(server: FakeServer, count: int) -> list[int]:
+    issues = [
+        server.add_issue(SOURCE_PROJECT, _get_title(index), "Description")
+        for index in range(count)
+    ]
+    # GitLab issues are identified by their iid within the project
+    return [issue.get("iid", issue["id"]) for issue in issues]
+
+
+def _seed_duplicates(server: FakeServer, options: BenchmarkOptions) -> list[int]:
+    issue_ids = _seed_source(server, options.samples)
+    for index in range(max(options.issues, options.samples)):
+        server.add_issue(TARGET_PROJECT, _get_title(index))
+    return issue_ids
+
+
+def _check_no_duplicates(server: FakeServer) -> None:
+    if server.requests["POST"]:
+        raise RuntimeError("Duplicates were created instead of being found")
+
+
+async def _timed(function: Callable[[], Awaitable[Any]]) -> float:
+    start = time.perf_counter()
+    await function()
+    return time.perf_counter() - start
+
+
+async def _consume(results: AsyncIterator[CopyResult]) -> None:
+    async for result in results:
+        if result.error is not None:
+            raise result.error
+
+
+def _latency_metrics(samples: list[float]) -> Metrics:
+    milliseconds = sorted(sample * 1000 for sample in samples)
+    return {
+        "min_ms": milliseconds[0],
+        "median_ms": statistics.median(milliseconds),
+        "p95_ms": milliseconds[max(round(len(milliseconds) * 0.95) - 1, 0)],
+        "mean_ms": statistics.fmean(milliseconds),
+    }
+
+
+@contextmanager
+def _environ(**variables: str) -> Iterator[None]:
+    previous = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
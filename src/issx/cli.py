@@ -1,24 +1,71 @@
 import asyncio
-from typing import Annotated
+import subprocess
+import sys
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Annotated, Any
 
 import typer
 from rich.console import Console
+from rich.table import Table
 from rich.text import Text
 
-from issx.cli_utils import RichConfigReader
-from issx.clients.gitlab import GitlabClient, GitlabInstanceClient
-from issx.clients.redmine import RedmineClient, RedmineInstanceClient
+from issx.cli_utils import (
+    RichConfigReader,
+    parse_import_times,
+    parse_issue_ids,
+    read_issue_ids,
+)
+from issx.clients.cache import IssueCache
+from issx.clients.http_cache import ResponseStore
+from issx.clients.instrumentation import (
+    CallProfiler,
+    add_call_hook,
+    record_metrics,
+    remove_call_hook,
+)
+from issx.daemon import (
+    ClientConfigurationError,
+    CommandRunner,
+    DaemonClient,
+    DaemonServer,
+    RemoteError,
+)
 from issx.domain import SupportedBackend
 from issx.domain.config import InstanceConfig, ProjectFlatConfig
+from issx.domain.templates import TemplateError, compile_template
 from issx.instance_managers.config_parser import GenericConfigParser
 from issx.instance_managers.managers import InstanceManager
-from issx.services import CopyIssueService
+from issx.metrics import REGISTRY, start_http_server
+from issx.services import (
+    CopyPlan,
+    CopyResult,
+    IssueMappingStore,
+    JobDoesNotExistError,
+    JobStore,
+    PlanAction,
+)
 
 app = typer.Typer(no_args_is_help=True)
 config_app = typer.Typer(
     name="config", no_args_is_help=True, help="Commands for configuration of issx"
 )
 app.add_typer(config_app, name="config")
+cache_app = typer.Typer(
+    name="cache", no_args_is_help=True, help="Commands for the local caches"
+)
+app.add_typer(cache_app, name="cache")
+mapping_app = typer.Typer(
+    name="mapping",
+    no_args_is_help=True,
+    help="Commands for the mapping of copied issues",
+)
+app.add_typer(mapping_app, name="mapping")
+debug_app = typer.Typer(
+    name="debug", no_args_is_help=True, help="Commands for debugging issx itself"
+)
+app.add_typer(debug_app, name="debug")
 
 BackendOption = Annotated[SupportedBackend, typer.Option()]
 InstanceNameOption = Annotated[str, typer.Option("--instance")]
@@ -26,17 +73,430 @@ ProjectOption = Annotated[
     str, typer.Option("--project", help="Project name configured in the config file")
 ]
 console = Console()
+state = {"use_daemon": True}
 
 InstanceManager.register_backend(
-    SupportedBackend.gitlab, GitlabInstanceClient, GitlabClient
+    SupportedBackend.gitlab,
+    "issx.clients.gitlab:GitlabInstanceClient",
+    "issx.clients.gitlab:GitlabClient",
 )
 InstanceManager.register_backend(
-    SupportedBackend.redmine, RedmineInstanceClient, RedmineClient
+    SupportedBackend.redmine,
+    "issx.clients.redmine:RedmineInstanceClient",
+    "issx.clients.redmine:RedmineClient",
 )
 
 
+@app.callback()
+def main(
+    ctx: typer.Context,
+    no_daemon: Annotated[
+        bool,
+        typer.Option(
+            "--no-daemon",
+            help="Run the command in this process even if a daemon is running",
+        ),
+    ] = False,
+    profile: Annotated[
+        bool,
+        typer.Option(
+            "--profile",
+            help="Print latencies of the API calls per operation at exit."
+            " The command is run without the daemon.",
+        ),
+    ] = False,
+    spans_file: Annotated[
+        Path | None,
+        typer.Option(
+            "--spans-file",
+            help="Append the API calls as OpenTelemetry spans in the OTLP JSON"
+            " format to the file. The command is run without the daemon.",
+            dir_okay=False,
+        ),
+    ] = None,
+    metrics_file: Annotated[
+        Path | None,
+        typer.Option(
+            "--metrics-file",
+            help="Write metrics in the Prometheus text format to the file at exit,"
+            " e.g. for the textfile collector of the node exporter."
+            " The command is run without the daemon.",
+            dir_okay=False,
+        ),
+    ] = None,
+) -> None:
+    # calls made by the daemon cannot be measured in this process
+    state["use_daemon"] = not no_daemon and not (profile or spans_file or metrics_file)
+    if profile or spans_file:
+        profiler = CallProfiler()
+        add_call_hook(profiler)
+        ctx.call_on_close(lambda: _report_profile(profiler, profile, spans_file))
+    if metrics_file:
+        add_call_hook(record_metrics)
+        ctx.call_on_close(lambda: REGISTRY.write_textfile(metrics_file))
+
+
+def _report_profile(
+    profiler: CallProfiler, print_summary: bool, spans_file: Path | None
+) -> None:
+    remove_call_hook(profiler)
+    if spans_file is not None:
+        with spans_file.open("a") as f:
+            profiler.write_spans(f)
+    if not print_summary:
+        return
+    table = Table(
+        "Backend",
+        "Operation",
+        "Calls",
+        "p50 (ms)",
+        "p95 (ms)",
+        "Max (ms)",
+        "Received (KiB)",
+        "Errors",
+        title="API calls",
+    )
+    for stats in profiler.summary():
+        table.add_row(
+            stats.backend,
+            stats.operation,
+            str(stats.count),
+            f"{stats.p50 * 1000:.1f}",
+            f"{stats.p95 * 1000:.1f}",
+            f"{stats.max * 1000:.1f}",
+            f"{stats.bytes_received / 1024:.1f}",
+            str(stats.errors),
+        )
+    console.print(table)
+
+
+def _get_runner() -> CommandRunner | DaemonClient:
+    """
+    Get a daemon client if a daemon serving the config file is running.
+    Otherwise, get a runner executing commands in this process.
+    """
+    config_file = GenericConfigParser.find_config_file()
+    if state["use_daemon"] and (daemon := DaemonClient.connect(config_file)):
+        return daemon
+    return CommandRunner(GenericConfigParser.from_file(config_file))
+
+
 @app.command()
 def copy(
+    source_project_name: Annotated[
+        str | None,
+        typer.Option(
+            "--source",
+            help="Source project name configured in the config file."
+            " Required unless --resume is used",
+        ),
+    ] = None,
+    target_project_names: Annotated[
+        list[str] | None,
+        typer.Option(
+            "--target",
+            help="Target project name configured in the config file. Repeat it"
+            " to copy the issues to multiple projects at once."
+            " Required unless --resume is used",
+        ),
+    ] = None,
+    issue_id: Annotated[
+        int | None,
+        typer.Argument(help="ID of the issue to copy. Omit when using --ids"),
+    ] = None,
+    ids: Annotated[
+        str | None,
+        typer.Option(
+            "--ids",
+            help="Comma separated issue ids and ranges to copy, e.g. 1,2,5-400",
+        ),
+    ] = None,
+    ids_from_file: Annotated[
+        Path | None,
+        typer.Option(
+            "--ids-from-file",
+            help="File with issue ids to copy. Each line can contain"
+            " the same syntax as --ids",
+            exists=True,
+            dir_okay=False,
+        ),
+    ] = None,
+    concurrency: Annotated[
+        int,
+        typer.Option(
+            "--concurrency",
+            "-c",
+            help="Maximum number of issues copied at the same time in the bulk mode",
+            min=1,
+        ),
+    ] = 10,
+    title_format: Annotated[
+        str,
+        typer.Option(
+            "--title-format",
+            "-T",
+            help="Template of a new issue title. Can contain placeholders of the"
+            " issue attributes: {id}, {title}, {description}, {web_url}, {reference},"
+            " {state}, {labels}, {assignees}, {author}, {milestone}",
+        ),
+    ] = "",
+    description_format: Annotated[
+        str,
+        typer.Option(
+            "--description-format",
+            "-D",
+            help="Template of a new issue description. Can contain placeholders of the"
+            " issue attributes: {id}, {title}, {description}, {web_url}, {reference},"
+            " {state}, {labels}, {assignees}, {author}, {milestone}",
+        ),
+    ] = "{description}",
+    allow_duplicates: Annotated[
+        bool,
+        typer.Option(
+            "--allow-duplicates",
+            "-A",
+            help="Allow for duplicate issues. If set, the command will return the first"
+            " issue found with the same title. If no issues are found,"
+            " a new issue will be created.",
+        ),
+    ] = False,
+    assign_to_me: Annotated[
+        bool,
+        typer.Option(
+            "--assign-to-me",
+            "-M",
+            help="Whether to assign a newly created issue to the current user",
+        ),
+    ] = False,
+    cache: Annotated[
+        bool,
+        typer.Option(
+            "--cache",
+            help="Serve source issues from the local issue cache when possible",
+        ),
+    ] = False,
+    cache_max_age: Annotated[
+        int,
+        typer.Option(
+            "--cache-max-age",
+            help="Number of seconds for which a cached issue is validated against"
+            " the issues updated in the source project instead of being fetched again",
+            min=0,
+        ),
+    ] = 3600,
+    attachments: Annotated[
+        bool,
+        typer.Option(
+            "--attachments",
+            help="Copy files referenced by the descriptions, e.g. uploaded images,"
+            " to the target projects and rewrite the references to the copies",
+        ),
+    ] = False,
+    notes: Annotated[
+        bool,
+        typer.Option(
+            "--notes",
+            help="Copy comments of the issues as well. Comments copied before"
+            " are skipped, so repeating the copy adds only the new ones",
+        ),
+    ] = False,
+    resume: Annotated[
+        str | None,
+        typer.Option(
+            "--resume",
+            help="ID of an interrupted bulk copy job to resume. The projects,"
+            " issue ids and other options are taken from the job, except for"
+            " --concurrency",
+        ),
+    ] = None,
+) -> int:
+    """Copy an issue or a bulk of issues from one project to others."""
+
+    copy_kwargs: dict[str, Any]
+    if resume is not None:
+        source_project_name, target_names, issue_ids, copy_kwargs = _read_job(
+            resume,
+            inputs_given=bool(
+                source_project_name
+                or target_project_names
+                or issue_id is not None
+                or ids
+                or ids_from_file
+            ),
+        )
+    else:
+        if not source_project_name or not target_project_names:
+            raise typer.BadParameter("Provide --source and --target or --resume")
+        try:
+            issue_ids = _collect_issue_ids(issue_id, ids, ids_from_file)
+        except ValueError as e:
+            raise typer.BadParameter(str(e)) from e
+        _validate_templates(title_format, description_format)
+        target_names = list(dict.fromkeys(target_project_names))
+        copy_kwargs = {
+            "title_format": title_format,
+            "description_format": description_format,
+            "allow_duplicates": allow_duplicates,
+            "assign_to_me": assign_to_me,
+            "cache": cache,
+            "cache_max_age": cache_max_age,
+            "attachments": attachments,
+            "notes": notes,
+        }
+    console.print(
+        Text.assemble(
+            f"Copying {_describe_issue_ids(issue_ids)} from project ",
+            (source_project_name, "bold magenta"),
+            " to project " if len(target_names) == 1 else " to projects ",
+            *_join_styled(target_names, "bold magenta"),
+        )
+    )
+    single = (
+        resume is None
+        and len(target_names) == 1
+        and issue_id is not None
+        and not ids
+        and not ids_from_file
+    )
+    job_id = None if single else _start_job(resume)
+    with _get_runner() as runner:
+        try:
+            if len(target_names) > 1:
+                results = runner.copy_to_targets(
+                    source_project_name,
+                    target_names,
+                    issue_ids,
+                    concurrency=concurrency,
+                    job=job_id,
+                    **copy_kwargs,
+                )
+            elif single and issue_id is not None:
+                new_issue = asyncio.run(
+                    runner.copy(
+                        source_project_name,
+                        target_names[0],
+                        issue_id,
+                        **copy_kwargs,
+                    )
+                )
+                console.print(f"Success!\n{new_issue}", style="green")
+                return 0
+            else:
+                results = runner.copy_many(
+                    source_project_name,
+                    target_names[0],
+                    issue_ids,
+                    concurrency=concurrency,
+                    job=job_id,
+                    **copy_kwargs,
+                )
+            failed = asyncio.run(
+                _print_copy_results(results, len(issue_ids) * len(target_names))
+            )
+        except ClientConfigurationError as e:
+            console.print_exception()
+            console.print("Error when configuring client instance.\n", style="red")
+            raise typer.Exit(1) from e
+        except RemoteError as e:
+            console.print(f"The daemon failed to copy: {e}", style="red")
+            raise typer.Exit(1) from e
+    if failed:
+        raise typer.Exit(1)
+    return 0
+
+
+def _start_job(resume: str | None) -> str:
+    job_id = resume or JobStore.new_job_id()
+    console.print(f"Job {job_id}, resume it with: issx copy --resume {job_id}")
+    return job_id
+
+
+def _read_job(
+    job_id: str, inputs_given: bool
+) -> tuple[str, list[str], list[int], dict[str, Any]]:
+    if inputs_given:
+        raise typer.BadParameter(
+            "The projects and issue ids of a resumed job cannot be changed"
+        )
+    try:
+        job = JobStore().read_header(job_id)
+    except (JobDoesNotExistError, ValueError) as e:
+        raise typer.BadParameter(str(e)) from e
+    return job["source"], job["targets"], job["issue_ids"], job["options"]
+
+
+def _collect_issue_ids(
+    issue_id: int | None, ids: str | None, ids_from_file: Path | None
+) -> list[int]:
+    issue_ids = [] if issue_id is None else [issue_id]
+    if ids:
+        issue_ids.extend(parse_issue_ids(ids))
+    if ids_from_file:
+        issue_ids.extend(read_issue_ids(ids_from_file))
+    if not issue_ids:
+        raise ValueError("Provide an issue id, --ids or --ids-from-file")
+    return list(dict.fromkeys(issue_ids))
+
+
+def _validate_templates(*templates: str) -> None:
+    for template in templates:
+        try:
+            compile_template(template)
+        except TemplateError as e:
+            raise typer.BadParameter(str(e)) from e
+
+
+def _describe_issue_ids(issue_ids: list[int]) -> str:
+    if len(issue_ids) == 1:
+        return f"issue {issue_ids[0]}"
+    return f"{len(issue_ids)} issues"
+
+
+def _join_styled(values: list[str], style: str) -> list[str | tuple[str, str]]:
+    parts: list[str | tuple[str, str]] = []
+    for index, value in enumerate(values):
+        if index:
+            parts.append(", ")
+        parts.append((value, style))
+    return parts
+
+
+async def _print_copy_results(results: AsyncIterator[CopyResult], total: int) -> int:
+    """
+    Print results of a bulk copy as soon as they are available
+    and a summary at the end.
+
+    Returns: Number of failed copies
+    """
+    copied = failed = 0
+    started_at = time.perf_counter()
+    async for result in results:
+        issue = f"{result.issue_id}" + (f" ({result.target})" if result.target else "")
+        if result.issue is not None:
+            copied += 1
+            console.print(
+                f"[{copied + failed}/{total}] {issue} ->"
+                f" {result.issue.reference or result.issue.id}",
+                style="green",
+            )
+        else:
+            failed += 1
+            console.print(
+                f"[{copied + failed}/{total}] {issue} failed: {result.error!r}",
+                style="red",
+            )
+    elapsed = time.perf_counter() - started_at
+    console.print(
+        f"\nCopied {copied} of {total} issues, {failed} failed"
+        f" in {elapsed:.2f}s ({(copied + failed) / elapsed if elapsed else 0:.2f}"
+        " issues/s)",
+        style="red bold" if failed else "green bold",
+    )
+    return failed
+
+
+@app.command()
+def plan(
     source_project_name: Annotated[
         str,
         typer.Option(
@@ -49,14 +509,45 @@ def copy(
             "--target", help="Target project name configured in the config file"
         ),
     ],
-    issue_id: int,
+    issue_id: Annotated[
+        int | None,
+        typer.Argument(help="ID of the issue to plan. Omit when using --ids"),
+    ] = None,
+    ids: Annotated[
+        str | None,
+        typer.Option(
+            "--ids",
+            help="Comma separated issue ids and ranges to plan, e.g. 1,2,5-400",
+        ),
+    ] = None,
+    ids_from_file: Annotated[
+        Path | None,
+        typer.Option(
+            "--ids-from-file",
+            help="File with issue ids to plan. Each line can contain"
+            " the same syntax as --ids",
+            exists=True,
+            dir_okay=False,
+        ),
+    ] = None,
+    concurrency: Annotated[
+        int,
+        typer.Option(
+            "--concurrency",
+            "-c",
+            help="Maximum number of issues copied at the same time when the plan"
+            " is applied, used to estimate its duration",
+            min=1,
+        ),
+    ] = 10,
     title_format: Annotated[
         str,
         typer.Option(
             "--title-format",
             "-T",
             help="Template of a new issue title. Can contain placeholders of the"
-            " issue attributes: {id}, {title}, {description}, {web_url}, {reference}",
+            " issue attributes: {id}, {title}, {description}, {web_url}, {reference},"
+            " {state}, {labels}, {assignees}, {author}, {milestone}",
         ),
     ] = "",
     description_format: Annotated[
@@ -65,7 +556,8 @@ def copy(
             "--description-format",
             "-D",
             help="Template of a new issue description. Can contain placeholders of the"
-            " issue attributes: {id}, {title}, {description}, {web_url}, {reference}",
+            " issue attributes: {id}, {title}, {description}, {web_url}, {reference},"
+            " {state}, {labels}, {assignees}, {author}, {milestone}",
         ),
     ] = "{description}",
     allow_duplicates: Annotated[
@@ -73,9 +565,8 @@ def copy(
         typer.Option(
             "--allow-duplicates",
             "-A",
-            help="Allow for duplicate issues. If set, the command will return the first"
-            " issue found with the same title. If no issues are found,"
-            " a new issue will be created.",
+            help="Plan to create all issues, even if the target project already"
+            " has issues with the same titles",
         ),
     ] = False,
     assign_to_me: Annotated[
@@ -83,79 +574,392 @@ def copy(
         typer.Option(
             "--assign-to-me",
             "-M",
-            help="Whether to assign a newly created issue to the current user",
+            help="Whether to assign the created issues to the current user",
         ),
     ] = False,
-) -> int:
-    """Copy an issue from one project to another."""
-
+    cache: Annotated[
+        bool,
+        typer.Option(
+            "--cache",
+            help="Serve source issues from the local issue cache when possible",
+        ),
+    ] = False,
+    cache_max_age: Annotated[
+        int,
+        typer.Option(
+            "--cache-max-age",
+            help="Number of seconds for which a cached issue is validated against"
+            " the issues updated in the source project instead of being fetched again",
+            min=0,
+        ),
+    ] = 3600,
+    output: Annotated[
+        Path | None,
+        typer.Option(
+            "--output",
+            "-o",
+            help="File to write the plan to as JSON, so it can be applied"
+            " with the apply command",
+            dir_okay=False,
+        ),
+    ] = None,
+) -> None:
+    """Plan copying issues without making any changes in the target project."""
+    try:
+        issue_ids = _collect_issue_ids(issue_id, ids, ids_from_file)
+    except ValueError as e:
+        raise typer.BadParameter(str(e)) from e
+    _validate_templates(title_format, description_format)
+    with _get_runner() as runner:
+        try:
+            copy_plan = asyncio.run(
+                runner.plan(
+                    source_project_name,
+                    target_project_name,
+                    issue_ids,
+                    title_format=title_format,
+                    description_format=description_format,
+                    allow_duplicates=allow_duplicates,
+                    assign_to_me=assign_to_me,
+                    cache=cache,
+                    cache_max_age=cache_max_age,
+                    concurrency=concurrency,
+                )
+            )
+        except ClientConfigurationError as e:
+            console.print_exception()
+            console.print("Error when configuring client instance.\n", style="red")
+            raise typer.Exit(1) from e
+        except RemoteError as e:
+            console.print(f"The daemon failed to plan: {e}", style="red")
+            raise typer.Exit(1) from e
     console.print(
         Text.assemble(
-            f"Copying issue {issue_id} from project ",
+            f"Planned copying {_describe_issue_ids(issue_ids)} from project ",
             (source_project_name, "bold magenta"),
             " to project ",
             (target_project_name, "bold magenta"),
         )
     )
-    config = GenericConfigParser.from_file()
-    instance_manager = InstanceManager(config)
+    conflicts = copy_plan.get_entries(PlanAction.conflict)
+    for entry in conflicts:
+        console.print(f"{entry.issue_id} conflicts: {entry.reason}", style="red")
+    estimate = copy_plan.estimate
+    console.print(
+        f"Create: {len(copy_plan.get_entries(PlanAction.create))},"
+        f" skip: {len(copy_plan.get_entries(PlanAction.skip))},"
+        f" conflicts: {len(conflicts)}",
+        style="yellow bold" if conflicts else "green bold",
+    )
+    console.print(
+        f"Planned with {estimate.planning_requests} requests, applying it takes"
+        f" {estimate.requests} requests and about {estimate.seconds:.1f}s"
+    )
+    if output is not None:
+        with output.open("w") as f:
+            copy_plan.write(f)
+        console.print(f"Plan written to {output}", style="green")
+
+
+@app.command()
+def apply(
+    plan_file: Annotated[
+        Path,
+        typer.Argument(
+            help="File written by the plan command", exists=True, dir_okay=False
+        ),
+    ],
+    concurrency: Annotated[
+        int,
+        typer.Option(
+            "--concurrency",
+            "-c",
+            help="Maximum number of issues copied at the same time",
+            min=1,
+        ),
+    ] = 10,
+) -> None:
+    """Copy issues according to a plan without fetching them again."""
     try:
-        source_client = instance_manager.get_project_client(source_project_name)
-        target_client = instance_manager.get_project_client(target_project_name)
-    except Exception as e:
-        console.print_exception()
-        console.print("Error when configuring client instance.\n", style="red")
-        raise typer.Exit(1) from e
-    title_format = (
-        title_format
-        or config.get_project_config(target_project_name).issue_title_template
-        or "{title}"
-    )
-    new_issue = asyncio.run(
-        CopyIssueService(source_client, target_client).copy(
-            issue_id,
-            title_format,
-            description_format,
-            allow_duplicates=allow_duplicates,
-            assign_to_me=assign_to_me,
+        with plan_file.open() as f:
+            copy_plan = CopyPlan.read(f)
+    except (ValueError, KeyError) as e:
+        raise typer.BadParameter(f"Invalid plan file: {e}") from e
+    console.print(
+        Text.assemble(
+            f"Applying the plan of {_describe_issue_ids(copy_plan.issue_ids)}"
+            " from project ",
+            (str(copy_plan.source), "bold magenta"),
+            " to project ",
+            (str(copy_plan.target), "bold magenta"),
         )
     )
-    console.print(f"Success!\n{new_issue}", style="green")
-    return 0
+    with _get_runner() as runner:
+        try:
+            failed = asyncio.run(
+                _print_copy_results(
+                    runner.apply_plan(copy_plan, concurrency=concurrency),
+                    len(copy_plan.entries),
+                )
+            )
+        except ClientConfigurationError as e:
+            console.print_exception()
+            console.print("Error when configuring client instance.\n", style="red")
+            raise typer.Exit(1) from e
+        except RemoteError as e:
+            console.print(f"The daemon failed to apply the plan: {e}", style="red")
+            raise typer.Exit(1) from e
+    if failed:
+        raise typer.Exit(1)
+
+
+@app.command()
+def sync(
+    source_project_name: Annotated[
+        str,
+        typer.Option(
+            "--source", help="Source project name configured in the config file"
+        ),
+    ],
+    target_project_name: Annotated[
+        str,
+        typer.Option(
+            "--target", help="Target project name configured in the config file"
+        ),
+    ],
+    title_format: Annotated[
+        str,
+        typer.Option(
+            "--title-format",
+            "-T",
+            help="Template of a target issue title. Can contain placeholders of the"
+            " issue attributes: {id}, {title}, {description}, {web_url}, {reference},"
+            " {state}, {labels}, {assignees}, {author}, {milestone}",
+        ),
+    ] = "",
+    description_format: Annotated[
+        str,
+        typer.Option(
+            "--description-format",
+            "-D",
+            help="Template of a target issue description. Can contain placeholders"
+            " of the issue attributes: {id}, {title}, {description}, {web_url},"
+            " {reference}, {state}, {labels}, {assignees}, {author}, {milestone}",
+        ),
+    ] = "{description}",
+    full: Annotated[
+        bool,
+        typer.Option(
+            "--full",
+            help="Synchronize all issues instead of the ones changed since"
+            " the previous run",
+        ),
+    ] = False,
+    concurrency: Annotated[
+        int,
+        typer.Option(
+            "--concurrency",
+            "-c",
+            help="Maximum number of issues synchronized at the same time",
+            min=1,
+        ),
+    ] = 10,
+) -> None:
+    """Synchronize issues changed since the previous run from one project to another."""
+    _validate_templates(title_format, description_format)
+    with _get_runner() as runner:
+        try:
+            report = asyncio.run(
+                runner.sync(
+                    source_project_name,
+                    target_project_name,
+                    title_format=title_format,
+                    description_format=description_format,
+                    full=full,
+                    concurrency=concurrency,
+                )
+            )
+        except ClientConfigurationError as e:
+            console.print_exception()
+            console.print("Error when configuring client instance.\n", style="red")
+            raise typer.Exit(1) from e
+        except RemoteError as e:
+            console.print(f"The daemon failed to synchronize: {e}", style="red")
+            raise typer.Exit(1) from e
+    console.print(
+        Text.assemble(
+            "Synchronized project ",
+            (source_project_name, "bold magenta"),
+            " to project ",
+            (target_project_name, "bold magenta"),
+            f" (changes since {report.updated_after or 'the beginning'})",
+        )
+    )
+    for issue_id, error in report.errors.items():
+        console.print(f"{issue_id} failed: {error!r}", style="red")
+    console.print(
+        f"Created: {len(report.created)}, updated: {len(report.updated)},"
+        f" unchanged: {len(report.unchanged)}, failed: {len(report.errors)}",
+        style="red bold" if report.errors else "green bold",
+    )
+    if report.errors:
+        raise typer.Exit(1)
 
 
 @app.command()
 def auth_verify(instance_name: InstanceNameOption) -> None:
     """Verify the authentication to the instance."""
-    config = GenericConfigParser.from_file()
-    instance_manager = InstanceManager(config)
-    try:
-        instance = instance_manager.get_instance_client(instance_name)
-    except Exception as e:
-        console.print_exception()
-        console.print("Error when configuring client instance.\n", style="red")
-        raise typer.Exit(1) from e
-    try:
-        username = asyncio.run(instance.auth())
+    with _get_runner() as runner:
+        try:
+            url, username = asyncio.run(runner.auth_verify(instance_name))
+        except ClientConfigurationError as e:
+            console.print_exception()
+            console.print("Error when configuring client instance.\n", style="red")
+            raise typer.Exit(1) from e
+        except Exception as e:
+            if not isinstance(e, RemoteError):
+                console.print_exception()
+            console.print(
+                f"Error when authenticating to {instance_name}: {e!r}", style="red"
+            )
+            raise typer.Exit(1) from e
         if not username:
-            raise Exception("Authentication failed")
-    except Exception as e:
-        console.print_exception()
-        console.print(
-            f"Error when authenticating to {instance.get_instance_url()}",
-            style="red",
-        )
-        raise typer.Exit(1) from e
-    else:
+            console.print(f"Error when authenticating to {url}", style="red")
+            raise typer.Exit(1)
         console.print(
             "Authentication successful",
-            f"Instance: {instance.get_instance_url()}",
+            f"Instance: {url}",
             f"User: {username}",
             sep="\n",
             style="green bold italic",
         )
 
 
+@app.command()
+def serve(
+    metrics_port: Annotated[
+        int | None,
+        typer.Option(
+            "--metrics-port",
+            help="Serve metrics in the Prometheus text format on /metrics on the port",
+            min=0,
+            max=65535,
+        ),
+    ] = None,
+    metrics_host: Annotated[
+        str,
+        typer.Option("--metrics-host", help="Address to serve the metrics on"),
+    ] = "127.0.0.1",
+) -> None:
+    """Run a daemon serving commands of other issx processes over a local socket."""
+    server = DaemonServer(GenericConfigParser.find_config_file())
+    console.print(
+        f"Serving {server.config_file} on {server.socket_path}", style="green"
+    )
+    metrics_server = None
+    if metrics_port is not None:
+        add_call_hook(record_metrics)
+        metrics_server = start_http_server(metrics_port, metrics_host)
+        host, port = metrics_server.server_address[:2]
+        console.print(f"Serving metrics on http://{host!s}:{port}/metrics")
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        console.print("Daemon stopped")
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+
+
+@cache_app.command("stats")
+def cache_stats() -> None:
+    """Show statistics of the local issue cache and the stored responses."""
+    stats = IssueCache().stats()
+    console.print(
+        f"Path: {stats.path}",
+        f"Cached issues: {stats.entries}",
+        f"Projects: {stats.projects}",
+        f"Hits: {stats.hits}",
+        f"Size: {stats.size_bytes / 1024:.1f} KiB",
+        sep="\n",
+    )
+    response_stats = ResponseStore().stats()
+    console.print(
+        f"\nPath: {response_stats.path}",
+        f"Stored responses: {response_stats.entries}",
+        f"Revalidated: {response_stats.hits}",
+        f"Size: {response_stats.size_bytes / 1024:.1f} KiB",
+        sep="\n",
+    )
+
+
+@cache_app.command("clear")
+def cache_clear() -> None:
+    """Remove all issues from the local issue cache and the stored responses."""
+    IssueCache().clear()
+    ResponseStore().clear()
+    console.print("Cache cleared", style="green")
+
+
+@mapping_app.command("export")
+def mapping_export(
+    file: Annotated[
+        Path, typer.Argument(help="File to write the mappings to", dir_okay=False)
+    ],
+) -> None:
+    """Export the mapping of copied issues to a JSON lines file."""
+    with file.open("w") as f:
+        count = IssueMappingStore().export(f)
+    console.print(f"Exported {count} mappings to {file}", style="green")
+
+
+@mapping_app.command("import")
+def mapping_import(
+    file: Annotated[
+        Path,
+        typer.Argument(
+            help="File written by the export command", exists=True, dir_okay=False
+        ),
+    ],
+) -> None:
+    """Import the mapping of copied issues from a JSON lines file."""
+    with file.open() as f:
+        count = IssueMappingStore().import_(f)
+    console.print(f"Imported {count} mappings from {file}", style="green")
+
+
+@debug_app.command("import-time")
+def debug_import_time(
+    module: Annotated[
+        str, typer.Option("--module", help="Module to measure the import time of")
+    ] = "issx.cli",
+    limit: Annotated[
+        int,
+        typer.Option("--limit", "-n", help="Number of the slowest packages to show"),
+    ] = 15,
+) -> None:
+    """Show how long importing issx takes, broken down by top-level packages."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        console.print(result.stderr, style="red")
+        raise typer.Exit(1)
+    import_times = parse_import_times(result.stderr)
+    total = sum(import_times.values())
+    table = Table(f"Package ({len(import_times)} total)", "Self time (ms)", "Share")
+    for package, microseconds in sorted(
+        import_times.items(), key=lambda item: item[1], reverse=True
+    )[:limit]:
+        table.add_row(
+            package, f"{microseconds / 1000:.1f}", f"{microseconds / total:.0%}"
+        )
+    console.print(table)
+    console.print(f"Importing {module} took {total / 1000:.1f} ms", style="bold")
+
+
 @config_app.command()
 def generate_instance(
     instance_name: Annotated[
@@ -1,5 +1,6 @@
 import inspect
 from enum import Enum
+from pathlib import Path
 from typing import Any, TypeVar
 
 from attr import Attribute
@@ -37,3 +38,78 @@ class RichConfigReader:
             default=str(field.default) if field.default else ...,  # type: ignore[arg-type]
             choices=choices,
         )
+
+
+def parse_issue_ids(spec: str) -> list[int]:
+    """
+    Parse a comma separated list of issue ids and inclusive ranges,
+    e.g. `1,2,5-400`. Whitespace around items is ignored.
+
+    Args:
+        spec: Comma separated ids and ranges
+
+    Returns: List of issue ids in the order of appearance
+    """
+    issue_ids: list[int] = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        start, separator, end = item.partition("-")
+        try:
+            if not separator:
+                issue_ids.append(int(start))
+                continue
+            first, last = int(start), int(end)
+        except ValueError as e:
+            raise ValueError(f"Invalid issue id or range: {item!r}") from e
+        if first > last:
+            raise ValueError(f"Invalid issue range: {item!r}")
+        issue_ids.extend(range(first, last + 1))
+    return issue_ids
+
+
+def read_issue_ids(path: Path) -> list[int]:
+    """
+    Read issue ids from a file. Every line can contain the same syntax
+    as accepted by `parse_issue_ids`. Empty lines and lines starting with `#`
+    are skipped.
+
+    Args:
+        path: Path to the file with issue ids
+
+    Returns: List of issue ids in the order of appearance
+    """
+    issue_ids: list[int] = []
+    for line in path.read_text().splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            issue_ids.extend(parse_issue_ids(line))
+    return issue_ids
+
+
+def parse_import_times(output: str) -> dict[str, int]:
+    """
+    Parse the output of `python -X importtime` summing the self time
+    of all imported modules by their top-level package.
+
+    Args:
+        output: Standard error output of the interpreter
+
+    Returns: Mapping of top-level package names to microseconds
+    """
+    import_times: dict[str, int] = {}
+    for line in output.splitlines():
+        prefix, _, timings = line.partition("import time:")
+        if prefix or not timings:
+            continue
+        self_time, _, rest = timings.partition("|")
+        _, _, module = rest.partition("|")
+        try:
+            microseconds = int(self_time)
+        except ValueError:
+            # the header line
+            continue
+        package = module.strip().split(".")[0]
+        import_times[package] = import_times.get(package, 0) + microseconds
+    return import_times
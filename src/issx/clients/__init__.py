@@ -1,4 +1,21 @@
+import importlib
+from typing import TYPE_CHECKING, Any
+
 __all__ = ["GitlabClient", "RedmineClient"]
 
-from issx.clients.gitlab import GitlabClient
-from issx.clients.redmine import RedmineClient
+if TYPE_CHECKING:
+    from issx.clients.gitlab import GitlabClient
+    from issx.clients.redmine import RedmineClient
+
+# backend modules import their client libraries, which is slow,
+# so they are imported only when their clients are used
+_LAZY_ATTRIBUTES = {
+    "GitlabClient": "issx.clients.gitlab",
+    "RedmineClient": "issx.clients.redmine",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRIBUTES:
+        return getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
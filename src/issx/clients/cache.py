@@ -0,0 +1,393 @@
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator, Iterable, Sequence
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import BinaryIO, Self
+
+from attr import define
+
+from issx.clients.interfaces import IssueClientInterface
+from issx.domain.config import InstanceConfig, ProjectFlatConfig
+from issx.domain.issues import (
+    Attachment,
+    AttachmentReference,
+    Issue,
+    Note,
+    UploadedAttachment,
+    issue_from_dict,
+    issue_to_dict,
+)
+from issx.storage import connect, get_data_dir
+
+SCHEMA_VERSION = 4
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    instance TEXT NOT NULL,
+    project TEXT NOT NULL,
+    issue_id INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (instance, project, issue_id)
+);
+CREATE INDEX IF NOT EXISTS issues_accessed_at ON issues (accessed_at);
+CREATE TABLE IF NOT EXISTS validations (
+    instance TEXT NOT NULL,
+    project TEXT NOT NULL,
+    validated_at REAL NOT NULL,
+    PRIMARY KEY (instance, project)
+);
+"""
+# tolerated difference between the local clock and the clock of an instance
+CLOCK_SKEW = 300
+
+
+@define
+class CachedIssue:
+    issue: Issue
+    fetched_at: float
+
+    def age(self) -> float:
+        """
+        :return: Number of seconds since the issue was fetched
+        """
+        return time.time() - self.fetched_at
+
+
+@define
+class IssueCacheStats:
+    entries: int
+    projects: int
+    hits: int
+    size_bytes: int
+    path: Path
+
+
+class IssueCache:
+    """
+    On-disk cache of issues keyed by the instance, project and issue id.
+
+    Issues are stored as mapped domain objects together with the time
+    they were fetched. The least recently used entries are evicted when the cache
+    grows over `max_entries`. The time of the last validation of the cached
+    issues is stored per project.
+    """
+
+    def __init__(self, path: Path | None = None, max_entries: int = 10_000):
+        """
+        :param path: Path to the database file. Defaults to `issues.sqlite3`
+        in the issx data directory.
+        :param max_entries: Maximum number of cached issues
+        """
+        self.path = path or get_data_dir() / "issues.sqlite3"
+        self.max_entries = max_entries
+        self._connection = connect(self.path, SCHEMA, SCHEMA_VERSION)
+
+    def get(self, instance: str, project: str, issue_id: int) -> CachedIssue | None:
+        """
+        Get a cached issue marking it as recently used.
+
+        :return: The cached issue or None if it is not cached
+        """
+        key = (instance, project, issue_id)
+        with self._connection:
+            row = self._connection.execute(
+                "SELECT data, fetched_at FROM issues"
+                " WHERE instance = ? AND project = ? AND issue_id = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE issues SET accessed_at = ?, hits = hits + 1"
+                " WHERE instance = ? AND project = ? AND issue_id = ?",
+                (time.time(), *key),
+            )
+        return CachedIssue(_issue_from_json(row["data"]), row["fetched_at"])
+
+    def put(self, instance: str, project: str, issues: list[Issue]) -> None:
+        """
+        Store freshly fetched issues evicting the least recently used ones
+        if the cache is full.
+        """
+        now = time.time()
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO issues"
+                " (instance, project, issue_id, data, fetched_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (instance, project, issue_id) DO UPDATE SET"
+                " data = excluded.data, fetched_at = excluded.fetched_at,"
+                " accessed_at = excluded.accessed_at",
+                [
+                    (instance, project, issue.id, _issue_to_json(issue), now, now)
+                    for issue in issues
+                ],
+            )
+            self._evict()
+
+    def get_oldest_fetched_at(
+        self, instance: str, project: str, since: float
+    ) -> float | None:
+        """
+        :return: The time the least recently fetched issue of the project
+        was fetched, ignoring the ones fetched before `since`, or None
+        if there are no such issues
+        """
+        row = self._connection.execute(
+            "SELECT MIN(fetched_at) FROM issues"
+            " WHERE instance = ? AND project = ? AND fetched_at >= ?",
+            (instance, project, since),
+        ).fetchone()
+        oldest: float | None = row[0]
+        return oldest
+
+    def get_validated_at(self, instance: str, project: str) -> float | None:
+        """
+        :return: The time since which all cached issues of the project
+        are known to be current or None if they have never been validated
+        """
+        row = self._connection.execute(
+            "SELECT validated_at FROM validations WHERE instance = ? AND project = ?",
+            (instance, project),
+        ).fetchone()
+        return None if row is None else row["validated_at"]
+
+    def set_validated_at(self, instance: str, project: str, at: float) -> None:
+        with self._connection:
+            self._connection.execute(
+                "INSERT INTO validations (instance, project, validated_at)"
+                " VALUES (?, ?, ?)"
+                " ON CONFLICT (instance, project) DO UPDATE SET"
+                " validated_at = excluded.validated_at",
+                (instance, project, at),
+            )
+
+    def invalidate(self, instance: str, project: str, issue_id: int) -> None:
+        with self._connection:
+            self._connection.execute(
+                "DELETE FROM issues"
+                " WHERE instance = ? AND project = ? AND issue_id = ?",
+                (instance, project, issue_id),
+            )
+
+    def clear(self) -> None:
+        with self._connection:
+            self._connection.execute("DELETE FROM issues")
+            self._connection.execute("DELETE FROM validations")
+        self._connection.execute("VACUUM")
+
+    def stats(self) -> IssueCacheStats:
+        row = self._connection.execute(
+            "SELECT COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS hits,"
+            " COUNT(DISTINCT instance || '/' || project) AS projects FROM issues"
+        ).fetchone()
+        return IssueCacheStats(
+            entries=row["entries"],
+            projects=row["projects"],
+            hits=row["hits"],
+            size_bytes=self.path.stat().st_size,
+            path=self.path,
+        )
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _evict(self) -> None:
+        self._connection.execute(
+            "DELETE FROM issues WHERE rowid IN (SELECT rowid FROM issues"
+            " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+class CachedIssueClient(IssueClientInterface):
+    """
+    Client wrapping another client and serving issues from an `IssueCache`.
+
+    Cached issues younger than `max_age` are served without fetching them
+    again once they are validated against the source: the issues updated since
+    the previous validation of the project are listed and replace their cached
+    versions, the others have not changed. The time of the validation is stored
+    in the cache, so within `validation_interval` after it the cached issues
+    are served without any requests, also by other clients of the cache.
+    Older issues are fetched again. Issues returned by any other call
+    of the wrapped client refresh the cache, so e.g. listing a project warms it
+    for subsequent `get_issue` calls.
+    """
+
+    def __init__(
+        self,
+        client: IssueClientInterface,
+        cache: IssueCache,
+        instance: str,
+        project: str,
+        max_age: float = 3600,
+        validation_interval: float = 60,
+    ):
+        """
+        :param client: Client to wrap
+        :param cache: Cache to store the issues in
+        :param instance: Name of the instance of the wrapped client
+        :param project: Identifier of the project of the wrapped client
+        :param max_age: Number of seconds for which a cached issue is validated
+        instead of being fetched again. It bounds how long an issue removed from
+        the project is served from the cache, as listings do not report removals.
+        :param validation_interval: Number of seconds after a validation during
+        which cached issues are served without validating them again. It bounds
+        how long a change in the source project may be missed.
+        """
+        self.client = client
+        self.cache = cache
+        self.instance = instance
+        self.project = project
+        self.max_age = max_age
+        self.validation_interval = validation_interval
+        self._validation_lock = asyncio.Lock()
+
+    async def validate_project(self) -> None:
+        await self.client.validate_project()
+
+    async def get_issue(self, issue_id: int) -> Issue:
+        if issue := (await self._get_validated([issue_id])).get(issue_id):
+            return issue
+        issue = await self.client.get_issue(issue_id)
+        self.cache.put(self.instance, self.project, [issue])
+        return issue
+
+    async def get_issues(self, issue_ids: Iterable[int]) -> dict[int, Issue]:
+        issue_ids = list(dict.fromkeys(issue_ids))
+        issues = await self._get_validated(issue_ids)
+        if missing := [issue_id for issue_id in issue_ids if issue_id not in issues]:
+            fetched = await self.client.get_issues(missing)
+            self.cache.put(self.instance, self.project, list(fetched.values()))
+            issues.update(fetched)
+        return issues
+
+    async def _get_validated(self, issue_ids: Iterable[int]) -> dict[int, Issue]:
+        """
+        :return: Current versions of the cached issues younger than `max_age`
+        """
+        # issues read during a validation of another call might be refreshed by it
+        async with self._validation_lock:
+            issues = {}
+            for issue_id in issue_ids:
+                entry = self.cache.get(self.instance, self.project, issue_id)
+                if entry is not None and entry.age() <= self.max_age:
+                    issues[issue_id] = entry.issue
+            if not issues:
+                return {}
+            changed = await self._validate()
+        return {
+            issue_id: changed.get(issue_id, issue) for issue_id, issue in issues.items()
+        }
+
+    async def _validate(self) -> dict[int, Issue]:
+        """
+        List the issues of the project updated in the source since the cached
+        issues were validated, unless the previous validation is recent enough.
+
+        :return: The listed issues by their IDs, they are stored in the cache
+        """
+        now = time.time()
+        validated_at = self.cache.get_validated_at(self.instance, self.project)
+        if validated_at is not None and now - validated_at <= self.validation_interval:
+            return {}
+        # every issue that may be served reflects the source at least
+        # from the later of the previous validation and its fetch
+        since = self.cache.get_oldest_fetched_at(
+            self.instance, self.project, now - self.max_age
+        )
+        if since is None:
+            return {}
+        if validated_at is not None:
+            since = max(since, validated_at)
+        changed = {
+            issue.id: issue
+            async for issue in self.iter_issues(
+                updated_after=datetime.fromtimestamp(since - CLOCK_SKEW, UTC)
+            )
+        }
+        self.cache.set_validated_at(self.instance, self.project, now)
+        return changed
+
+    async def create_issue(
+        self,
+        title: str,
+        description: str,
+        assign_to_me: bool = False,
+        attachments: Sequence[UploadedAttachment] = (),
+    ) -> Issue:
+        issue = await self.client.create_issue(
+            title, description, assign_to_me, attachments
+        )
+        self.cache.put(self.instance, self.project, [issue])
+        return issue
+
+    async def update_issue(self, issue_id: int, title: str, description: str) -> Issue:
+        issue = await self.client.update_issue(issue_id, title, description)
+        self.cache.put(self.instance, self.project, [issue])
+        return issue
+
+    async def find_attachments(
+        self, issue: Issue, text: str
+    ) -> list[AttachmentReference]:
+        return await self.client.find_attachments(issue, text)
+
+    async def download_attachment(
+        self, attachment: Attachment, file: BinaryIO, chunk_size: int = 64 * 1024
+    ) -> None:
+        await self.client.download_attachment(attachment, file, chunk_size)
+
+    async def upload_attachment(
+        self, filename: str, file: BinaryIO, content_type: str | None = None
+    ) -> UploadedAttachment:
+        return await self.client.upload_attachment(filename, file, content_type)
+
+    def iter_notes(self, issue_id: int, page_size: int = 100) -> AsyncIterator[Note]:
+        return self.client.iter_notes(issue_id, page_size)
+
+    async def create_note(self, issue_id: int, body: str) -> None:
+        await self.client.create_note(issue_id, body)
+
+    async def find_issues(self, title: str) -> list[Issue]:
+        issues = await self.client.find_issues(title)
+        self.cache.put(self.instance, self.project, issues)
+        return issues
+
+    async def iter_issues(
+        self,
+        page_size: int = 100,
+        updated_after: datetime | None = None,
+        search: str | None = None,
+    ) -> AsyncIterator[Issue]:
+        page: list[Issue] = []
+        async for issue in self.client.iter_issues(
+            page_size=page_size, updated_after=updated_after, search=search
+        ):
+            page.append(issue)
+            if len(page) == page_size:
+                self.cache.put(self.instance, self.project, page)
+                page = []
+            yield issue
+        self.cache.put(self.instance, self.project, page)
+
+    @classmethod
+    def from_config(
+        cls, instance_config: InstanceConfig, project_config: ProjectFlatConfig
+    ) -> Self:
+        raise TypeError(
+            f"{cls.__name__} wraps an existing client and cannot be created"
+            " from a config"
+        )
+
+
+def _issue_to_json(issue: Issue) -> str:
+    return json.dumps(issue_to_dict(issue), separators=(",", ":"))
+
+
+def _issue_from_json(data: str) -> Issue:
+    return issue_from_dict(json.loads(data))
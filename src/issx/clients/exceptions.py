@@ -10,3 +10,9 @@ class IssueDoesNotExistError(EntityDoesNotExistError):
 
 class ProjectDoesNotExistError(EntityDoesNotExistError):
     pass
+
+
+class AttachmentDoesNotExistError(EntityDoesNotExistError):
+    def __init__(self, url: str):
+        self.url = url
+        super().__init__(f"Attachment {url} does not exist")
@@ -0,0 +1,54 @@
+import asyncio
+import contextvars
+import functools
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import ParamSpec, TypeVar
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+class BlockingExecutor:
+    """
+    Runs blocking calls of synchronous client libraries in a thread pool,
+    so they do not block the event loop and concurrent calls
+    overlap on the network.
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        """
+        :param max_workers: Maximum number of calls running at the same time.
+        Defaults to the `ThreadPoolExecutor` default.
+        """
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+
+    async def run(self, func: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+        """
+        Run a blocking function in the thread pool and wait for its result.
+        The function runs in a copy of the current context, so it sees
+        the context variables of the caller, e.g. the instrumented call.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._get_executor(),
+            functools.partial(context.run, func, *args, **kwargs),
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Shut down the thread pool. The executor can still be used afterwards,
+        a new pool is created on the next call.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="issx"
+            )
+        return self._executor
@@ -1,13 +1,63 @@
-from typing import Self, cast
+import asyncio
+import re
+from collections.abc import AsyncIterator, Iterable, Sequence
+from datetime import UTC, datetime
+from typing import Any, BinaryIO, Self, cast
+from urllib.parse import unquote
 
 from attr import asdict
-from gitlab import Gitlab, GitlabGetError
-from gitlab.v4.objects import CurrentUser, Project, ProjectIssue
+from gitlab import (
+    Gitlab,
+    GitlabCreateError,
+    GitlabError,
+    GitlabGetError,
+    GitlabHttpError,
+    GitlabListError,
+    GitlabUpdateError,
+)
+from gitlab.v4.objects import CurrentUser, Project, ProjectIssue, ProjectIssueNote
+from requests import Response
+from requests_toolbelt.multipart.encoder import MultipartEncoder
 
-from issx.clients.exceptions import IssueDoesNotExistError, ProjectDoesNotExistError
+from issx.clients.exceptions import (
+    AttachmentDoesNotExistError,
+    IssueDoesNotExistError,
+    ProjectDoesNotExistError,
+)
+from issx.clients.executors import BlockingExecutor
+from issx.clients.http import configure_session
+from issx.clients.instrumentation import instrumented, track_call
 from issx.clients.interfaces import InstanceClientInterface, IssueClientInterface
-from issx.domain.config import InstanceConfig, ProjectFlatConfig
-from issx.domain.issues import Issue
+from issx.clients.paging import MAX_PAGE_SIZE, chunked, paginate
+from issx.clients.users import CurrentUserCache
+from issx.domain import SupportedBackend
+from issx.domain.config import InstanceConfig, ProjectFlatConfig, RemoteInstanceConfig
+from issx.domain.issues import (
+    Attachment,
+    AttachmentReference,
+    Issue,
+    Note,
+    UploadedAttachment,
+)
+
+# markdown links of files uploaded to the project, e.g. `/uploads/<secret>/a.png`,
+# links with a host or a path before may point to other projects
+UPLOAD_PATTERN = re.compile(
+    r"(?<![\w/.-])/uploads/(?P<secret>[0-9a-f]{16,64})"
+    r"/(?P<filename>[^\s()<>\[\]\"'/]+)"
+)
+
+
+class RateLimitedGitlab(Gitlab):
+    """
+    Gitlab client leaving the retries of throttled requests to the adapter
+    installed by `configure_session`. Otherwise, python-gitlab would retry
+    every request retried by the adapter as well, bypassing its token bucket.
+    """
+
+    def http_request(self, verb: str, path: str, *args: Any, **kwargs: Any) -> Response:
+        kwargs.setdefault("obey_rate_limit", False)
+        return super().http_request(verb, path, *args, **kwargs)
 
 
 class IssueMapper:
@@ -23,25 +73,70 @@ class IssueMapper:
             description=issue.description,
             web_url=issue.web_url,
             reference=issue.references["full"],
+            updated_at=datetime.fromisoformat(issue.updated_at),
+            state=getattr(issue, "state", None),
+            labels=tuple(getattr(issue, "labels", ())),
+            assignees=tuple(
+                assignee["username"] for assignee in getattr(issue, "assignees", ())
+            ),
+            author=cls._get_name(issue, "author", "username"),
+            milestone=cls._get_name(issue, "milestone", "title"),
+            created_at=cls._parse_datetime(getattr(issue, "created_at", None)),
+            closed_at=cls._parse_datetime(getattr(issue, "closed_at", None)),
         )
 
     @classmethod
     def issues_to_domain_list(cls, issues: list[ProjectIssue]) -> list[Issue]:
         return [cls.issue_to_domain(issue) for issue in issues]
 
+    @classmethod
+    def note_to_domain(cls, note: ProjectIssueNote) -> Note:
+        return Note(
+            id=note.id,
+            body=note.body,
+            author=cls._get_name(note, "author", "username"),
+            created_at=cls._parse_datetime(getattr(note, "created_at", None)),
+        )
+
+    @staticmethod
+    def _get_name(
+        obj: ProjectIssue | ProjectIssueNote, attribute: str, key: str
+    ) -> str | None:
+        value = getattr(obj, attribute, None)
+        return value[key] if value else None
+
+    @staticmethod
+    def _parse_datetime(value: str | None) -> datetime | None:
+        return datetime.fromisoformat(value) if value else None
+
 
 class GitlabInstanceClient(InstanceClientInterface):
-    def __init__(self, client: Gitlab):
+    instance_config_class = RemoteInstanceConfig
+    backend = SupportedBackend.gitlab
+
+    def __init__(
+        self,
+        client: Gitlab,
+        executor: BlockingExecutor | None = None,
+        user_cache: CurrentUserCache[CurrentUser] | None = None,
+    ):
         self.client = client
+        self.executor = executor or BlockingExecutor()
+        self.user_cache = user_cache or CurrentUserCache()
 
     async def auth(self) -> str | None:
-        self.client.auth()
-        if user := self.client.user:
-            return cast(str, user.username)
-        return None
+        try:
+            user = await self.get_user()
+        except ValueError:
+            return None
+        return cast(str, user.username)
+
+    async def get_user(self) -> CurrentUser:
+        return await self.user_cache.get(self._fetch_user)
 
-    def get_user(self) -> CurrentUser:
-        self.client.auth()
+    @instrumented("get_user")
+    async def _fetch_user(self) -> CurrentUser:
+        await self.executor.run(self.client.auth)
         if not self.client.user:
             raise ValueError("Cannot get user from Gitlab client")
         return self.client.user
@@ -49,68 +144,334 @@ class GitlabInstanceClient(InstanceClientInterface):
     def get_instance_url(self) -> str:
         return self.client.url
 
+    def close(self) -> None:
+        self.client.session.close()
+        self.executor.shutdown(wait=False)
+
     @classmethod
     def instance_from_config(cls, instance_config: InstanceConfig) -> Self:
         instance_config = cls.instance_config_class(**asdict(instance_config))
-        return cls(Gitlab(instance_config.url, private_token=instance_config.token))
+        client = RateLimitedGitlab(
+            instance_config.url, private_token=instance_config.token
+        )
+        configure_session(client.session, instance_config)
+        return cls(
+            client,
+            executor=BlockingExecutor(instance_config.max_workers),
+            user_cache=CurrentUserCache(instance_config.user_cache_ttl),
+        )
 
 
 class GitlabClient(IssueClientInterface, GitlabInstanceClient):
     """Gitlab client implementations"""
 
-    def __init__(self, client: Gitlab, project_id: int):
+    def __init__(
+        self,
+        client: Gitlab,
+        project_id: int,
+        executor: BlockingExecutor | None = None,
+        user_cache: CurrentUserCache[CurrentUser] | None = None,
+    ):
+        super().__init__(client, executor=executor, user_cache=user_cache)
         self.project_id = project_id
-        self._project: Project | None = None
-        super().__init__(client)
+        # a lazy project does not make any request, it is only used to build
+        # the URLs of the issues until the project is validated
+        self._project: Project = client.projects.get(project_id, lazy=True)
+        self._project_validated = False
+        self._project_lock = asyncio.Lock()
 
+    @instrumented("create_issue")
     async def create_issue(
-        self, title: str, description: str, assign_to_me: bool = False
+        self,
+        title: str,
+        description: str,
+        assign_to_me: bool = False,
+        attachments: Sequence[UploadedAttachment] = (),
     ) -> Issue:
-        project = await self._get_project()
-        issue: ProjectIssue = cast(
-            ProjectIssue,
-            project.issues.create(
-                {
-                    "title": title,
-                    "description": description,
-                    "assignee_id": self.get_user().id,
-                }
-            ),
-        )
+        # uploads belong to the project, the links in the description are enough
+        user = await self.get_user()
+        try:
+            issue = cast(
+                ProjectIssue,
+                await self.executor.run(
+                    self._project.issues.create,
+                    {
+                        "title": title,
+                        "description": description,
+                        "assignee_id": user.id,
+                    },
+                ),
+            )
+        except GitlabCreateError as e:
+            await self._check_project(e)
+            raise
         return IssueMapper.issue_to_domain(issue)
 
+    @instrumented("get_issue")
     async def get_issue(self, issue_id: int) -> Issue:
         issue: ProjectIssue = await self._get_issue(issue_id)
         return IssueMapper.issue_to_domain(issue)
 
-    async def find_issues(self, title: str) -> list[Issue]:
-        project = await self._get_project()
-        issues = cast(list[ProjectIssue], list(project.issues.list(search=title)))
-        return IssueMapper.issues_to_domain_list(issues)
+    @instrumented("get_issues")
+    async def get_issues(self, issue_ids: Iterable[int]) -> dict[int, Issue]:
+        # iids of existing issues are always positive
+        issue_ids = [issue_id for issue_id in dict.fromkeys(issue_ids) if issue_id > 0]
 
-    async def _get_project(self) -> Project:
-        if self._project is None:
+        async def fetch_chunk(chunk: list[int]) -> list[ProjectIssue]:
             try:
-                self._project = self.client.projects.get(self.project_id)
-            except GitlabGetError as e:
-                raise ProjectDoesNotExistError(
-                    f"Project with id={self.project_id} does not exist"
-                ) from e
-        return self._project
+                return cast(
+                    list[ProjectIssue],
+                    await self.executor.run(
+                        self._project.issues.list,
+                        iids=chunk,
+                        per_page=len(chunk),
+                        page=1,
+                    ),
+                )
+            except GitlabListError as e:
+                await self._check_project(e)
+                raise
+
+        chunks = await asyncio.gather(
+            *map(fetch_chunk, chunked(issue_ids, MAX_PAGE_SIZE))
+        )
+        return {
+            issue.iid: IssueMapper.issue_to_domain(issue)
+            for chunk in chunks
+            for issue in chunk
+        }
+
+    @instrumented("find_issues")
+    async def find_issues(self, title: str) -> list[Issue]:
+        # search matches substrings as well, only exact matches are expected
+        return [
+            issue
+            async for issue in self.iter_issues(search=title)
+            if issue.title == title
+        ]
+
+    @instrumented("update_issue")
+    async def update_issue(self, issue_id: int, title: str, description: str) -> Issue:
+        issue = self._project.issues.get(issue_id, lazy=True)
+        issue.title = title
+        issue.description = description
+        try:
+            await self.executor.run(issue.save)
+        except GitlabUpdateError as e:
+            await self._check_project(e)
+            if e.response_code == 404:
+                raise IssueDoesNotExistError(issue_id) from e
+            raise
+        return IssueMapper.issue_to_domain(issue)
+
+    async def find_attachments(
+        self, issue: Issue, text: str
+    ) -> list[AttachmentReference]:
+        return [
+            AttachmentReference(
+                Attachment(filename=unquote(match["filename"]), url=match[0]),
+                start=match.start(),
+                end=match.end(),
+            )
+            for match in UPLOAD_PATTERN.finditer(text)
+        ]
+
+    @instrumented("download_attachment")
+    async def download_attachment(
+        self, attachment: Attachment, file: BinaryIO, chunk_size: int = 64 * 1024
+    ) -> None:
+        try:
+            await self.executor.run(
+                self._download_attachment, attachment.url, file, chunk_size
+            )
+        except GitlabHttpError as e:
+            if e.response_code == 404:
+                raise AttachmentDoesNotExistError(attachment.url) from e
+            raise
+
+    def _download_attachment(self, url: str, file: BinaryIO, chunk_size: int) -> None:
+        # uploads are served by the API of the project under the same path
+        response = self.client.http_request(
+            "get", f"/projects/{self._project.encoded_id}{url}", streamed=True
+        )
+        with response:
+            for chunk in response.iter_content(chunk_size):
+                file.write(chunk)
+
+    @instrumented("upload_attachment")
+    async def upload_attachment(
+        self, filename: str, file: BinaryIO, content_type: str | None = None
+    ) -> UploadedAttachment:
+        try:
+            upload = await self.executor.run(
+                self._upload_attachment,
+                filename,
+                file,
+                content_type or "application/octet-stream",
+            )
+        except GitlabHttpError as e:
+            await self._check_project(e)
+            raise
+        return UploadedAttachment(
+            filename=filename,
+            url=upload["url"],
+            content_type=content_type,
+        )
+
+    def _upload_attachment(
+        self, filename: str, file: BinaryIO, content_type: str
+    ) -> dict[str, Any]:
+        # the encoder reads the file in chunks while the body is being sent,
+        # so the file is never held in memory as a whole
+        encoder = MultipartEncoder(fields={"file": (filename, file, content_type)})
+        response = self.client.http_request(
+            "post",
+            f"/projects/{self._project.encoded_id}/uploads",
+            post_data=encoder,
+            raw=True,
+            extra_headers={"Content-type": encoder.content_type},
+            # the body cannot be sent again once the file is consumed, so
+            # a failed upload is not retried by python-gitlab or the adapter
+            # and the copy of the issue fails instead
+            obey_rate_limit=False,
+            retry_transient_errors=False,
+        )
+        return cast(dict[str, Any], response.json())
+
+    async def iter_notes(
+        self, issue_id: int, page_size: int = 100
+    ) -> AsyncIterator[Note]:
+        notes = self._project.issues.get(issue_id, lazy=True).notes
+
+        async def fetch_page(index: int) -> list[ProjectIssueNote]:
+            async with track_call(self.backend, "list_notes"):
+                try:
+                    return cast(
+                        list[ProjectIssueNote],
+                        await self.executor.run(
+                            notes.list,
+                            page=index + 1,
+                            per_page=page_size,
+                            order_by="created_at",
+                            sort="asc",
+                        ),
+                    )
+                except GitlabListError as e:
+                    await self._check_project(e)
+                    if e.response_code == 404:
+                        raise IssueDoesNotExistError(issue_id) from e
+                    raise
+
+        async for note in paginate(fetch_page, page_size):
+            # system notes record changes of the issue, internal ones
+            # are visible only to the members of the project
+            if not getattr(note, "system", False) and not getattr(
+                note, "internal", False
+            ):
+                yield IssueMapper.note_to_domain(note)
+
+    @instrumented("create_note")
+    async def create_note(self, issue_id: int, body: str) -> None:
+        notes = self._project.issues.get(issue_id, lazy=True).notes
+        try:
+            await self.executor.run(notes.create, {"body": body})
+        except GitlabCreateError as e:
+            await self._check_project(e)
+            if e.response_code == 404:
+                raise IssueDoesNotExistError(issue_id) from e
+            raise
+
+    async def iter_issues(
+        self,
+        page_size: int = 100,
+        updated_after: datetime | None = None,
+        search: str | None = None,
+    ) -> AsyncIterator[Issue]:
+        # the oldest issues first, so issues created while iterating
+        # do not shift the pages
+        filters: dict[str, Any] = {"order_by": "created_at", "sort": "asc"}
+        if updated_after is not None:
+            if updated_after.tzinfo is None:
+                updated_after = updated_after.replace(tzinfo=UTC)
+            filters["updated_after"] = updated_after.isoformat()
+        if search is not None:
+            filters["search"] = search
+            filters["in"] = "title"
+
+        async def fetch_page(index: int) -> list[ProjectIssue]:
+            async with track_call(self.backend, "list_issues"):
+                try:
+                    return cast(
+                        list[ProjectIssue],
+                        await self.executor.run(
+                            self._project.issues.list,
+                            page=index + 1,
+                            per_page=page_size,
+                            **filters,
+                        ),
+                    )
+                except GitlabListError as e:
+                    await self._check_project(e)
+                    raise
+
+        async for issue in paginate(fetch_page, page_size):
+            yield IssueMapper.issue_to_domain(issue)
+
+    async def validate_project(self) -> None:
+        if self._project_validated:
+            return
+        async with self._project_lock:
+            if not self._project_validated:
+                self._project = await self._fetch_project()
+                self._project_validated = True
+
+    @instrumented("get_project")
+    async def _fetch_project(self) -> Project:
+        try:
+            return await self.executor.run(self.client.projects.get, self.project_id)
+        except GitlabGetError as e:
+            raise ProjectDoesNotExistError(
+                f"Project with id={self.project_id} does not exist"
+            ) from e
+
+    async def _check_project(self, error: GitlabError) -> None:
+        """
+        Raise ProjectDoesNotExistError if the request failed with 404
+        because the project does not exist
+        """
+        if error.response_code == 404:
+            await self.validate_project()
 
     async def _get_issue(self, issue_id: int) -> ProjectIssue:
-        project = await self._get_project()
         try:
-            return project.issues.get(issue_id)
+            return await self.executor.run(self._project.issues.get, issue_id)
         except GitlabGetError as e:
+            await self._check_project(e)
             raise IssueDoesNotExistError(issue_id) from e
 
     @classmethod
     def from_config(
         cls, instance_config: InstanceConfig, project_config: ProjectFlatConfig
     ) -> Self:
+        return cls.from_instance_client(
+            GitlabInstanceClient.instance_from_config(instance_config),
+            instance_config,
+            project_config,
+        )
+
+    @classmethod
+    def from_instance_client(
+        cls,
+        instance_client: InstanceClientInterface,
+        instance_config: InstanceConfig,
+        project_config: ProjectFlatConfig,
+    ) -> Self:
+        if not isinstance(instance_client, GitlabInstanceClient):
+            return cls.from_config(instance_config, project_config)
         project_config = cls.project_config_class(**asdict(project_config))
         return cls(
-            GitlabInstanceClient.instance_from_config(instance_config).client,
+            instance_client.client,
             project_id=int(project_config.project),
+            executor=instance_client.executor,
+            user_cache=instance_client.user_cache,
         )
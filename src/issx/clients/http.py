@@ -0,0 +1,313 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+from requests import PreparedRequest, Response, Session, exceptions
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from issx.clients.http_cache import ResponseStore, StoredResponse, get_cache_key
+from issx.clients.instrumentation import record_response, record_retry
+from issx.domain.config import RemoteInstanceConfig
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# 429 responses are rejected before processing, so any request can be retried
+THROTTLED_STATUSES = frozenset({429})
+TRANSIENT_STATUSES = frozenset({502, 503, 504})
+MAX_RETRY_DELAY = 60.0
+# values of a reset header greater than this are unix timestamps, not deltas
+RESET_EPOCH_THRESHOLD = 1_000_000_000
+GONE_STATUSES = frozenset({404, 410})
+CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since", "Range")
+# the stored body is already decoded and its length may differ
+HOP_BY_HOP_HEADERS = frozenset(
+    {"content-encoding", "content-length", "transfer-encoding", "connection"}
+)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket pacing the requests sent to an instance.
+
+    Every request takes a token. Tokens are refilled at `rate` per second
+    up to `capacity`, which allows short bursts. Without a rate the bucket
+    only honors pauses requested by the instance, e.g. with `Retry-After`.
+    """
+
+    def __init__(self, rate: float | None = None, capacity: int = 1):
+        """
+        :param rate: Number of tokens added per second or None for no limit
+        :param capacity: Maximum number of tokens available at once
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Take a token waiting until one is available.
+
+        :return: Number of seconds spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            delay = max(self._paused_until - now, 0.0)
+            if self.rate is not None:
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                # a negative balance reserves the token for this caller
+                self._tokens -= 1
+                if self._tokens < 0:
+                    delay = max(delay, -self._tokens / self.rate)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold all requests for the given number of seconds.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    Adapter pacing the requests with a `TokenBucket` and retrying
+    throttled and failed ones.
+
+    Throttled requests (429) are retried regardless of their method.
+    Requests failed with a transient error (502, 503, 504 or a connection
+    error) are retried only if they are idempotent. The delay is taken from
+    the `Retry-After` header if present, otherwise an exponential backoff
+    with full jitter is used. `RateLimit-Remaining` and `RateLimit-Reset`
+    headers pause the bucket before the limit is exceeded.
+    """
+
+    def __init__(
+        self,
+        bucket: TokenBucket,
+        retries: int = 3,
+        backoff: float = 0.5,
+        **kwargs: Any,
+    ):
+        """
+        :param bucket: Bucket shared by all requests sent to the instance
+        :param retries: Maximum number of retries of a single request
+        :param backoff: Base of the exponential backoff in seconds
+        """
+        self.bucket = bucket
+        self.retries = retries
+        self.backoff = backoff
+        super().__init__(**kwargs)
+
+    def send(  # type: ignore[override]
+        self, request: PreparedRequest, **kwargs: Any
+    ) -> Response:
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                response = super().send(request, **kwargs)
+            except (exceptions.ConnectionError, exceptions.Timeout):
+                if not self._can_retry(request, attempt, idempotent_only=True):
+                    raise
+                record_retry()
+                time.sleep(self._get_backoff(attempt))
+            else:
+                record_response(
+                    response,
+                    stream=bool(kwargs.get("stream")),
+                    throttled=response.status_code in THROTTLED_STATUSES,
+                )
+                self._observe_rate_limit(response)
+                if response.status_code in THROTTLED_STATUSES:
+                    can_retry = self._can_retry(request, attempt, idempotent_only=False)
+                elif response.status_code in TRANSIENT_STATUSES:
+                    can_retry = self._can_retry(request, attempt, idempotent_only=True)
+                else:
+                    can_retry = False
+                if not can_retry:
+                    return response
+                response.close()
+                record_retry()
+                retry_after = get_retry_after(response)
+                if retry_after is None:
+                    time.sleep(self._get_backoff(attempt))
+                else:
+                    # the instance asked every client to slow down
+                    self.bucket.pause(min(retry_after, MAX_RETRY_DELAY))
+            attempt += 1
+
+    def _can_retry(
+        self, request: PreparedRequest, attempt: int, idempotent_only: bool
+    ) -> bool:
+        if attempt >= self.retries:
+            return False
+        if idempotent_only and request.method not in IDEMPOTENT_METHODS:
+            return False
+        # streamed bodies are consumed by the first attempt
+        return request.body is None or isinstance(request.body, bytes | str)
+
+    def _get_backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff * 2**attempt, MAX_RETRY_DELAY))
+
+    def _observe_rate_limit(self, response: Response) -> None:
+        remaining = response.headers.get("RateLimit-Remaining")
+        reset = response.headers.get("RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            if int(remaining) > 0:
+                return
+            delay = float(reset)
+        except ValueError:
+            return
+        if delay > RESET_EPOCH_THRESHOLD:
+            delay -= time.time()
+        if delay > 0:
+            self.bucket.pause(min(delay, MAX_RETRY_DELAY))
+
+
+class ConditionalRequestAdapter(RateLimitedAdapter):
+    """
+    Rate limited adapter revalidating the responses to GET requests
+    stored in a `ResponseStore`.
+
+    Responses with an `ETag` or `Last-Modified` header are stored. Subsequent
+    requests of the same resource send them back in `If-None-Match`
+    and `If-Modified-Since` headers, so an unchanged resource is answered with
+    304 Not Modified without a body. The 304 response is replaced with
+    the stored one, so the client libraries never see it.
+    """
+
+    def __init__(self, bucket: TokenBucket, store: ResponseStore, **kwargs: Any):
+        """
+        :param store: Store of the responses, it may be shared between adapters
+        """
+        self.store = store
+        super().__init__(bucket, **kwargs)
+
+    def send(  # type: ignore[override]
+        self, request: PreparedRequest, **kwargs: Any
+    ) -> Response:
+        if (
+            request.method != "GET"
+            or kwargs.get("stream")
+            or any(header in request.headers for header in CONDITIONAL_HEADERS)
+        ):
+            return super().send(request, **kwargs)
+        key = get_cache_key(request)
+        stored = self.store.get(key)
+        if stored is not None:
+            if stored.etag is not None:
+                request.headers["If-None-Match"] = stored.etag
+            if stored.last_modified is not None:
+                request.headers["If-Modified-Since"] = stored.last_modified
+        response = super().send(request, **kwargs)
+        if response.status_code == 304 and stored is not None:
+            self.store.touch(key)
+            # the restored response is never read, so the connection of the 304
+            # response has to be returned to the pool here
+            response.close()
+            return self._restore_response(request, response, stored)
+        if response.status_code == 200:
+            self.store.put(
+                key,
+                StoredResponse(
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                    headers=_get_end_to_end_headers(response),
+                    body=response.content,
+                ),
+            )
+        elif stored is not None and response.status_code in GONE_STATUSES:
+            self.store.delete(key)
+        return response
+
+    @staticmethod
+    def _restore_response(
+        request: PreparedRequest, not_modified: Response, stored: StoredResponse
+    ) -> Response:
+        response = Response()
+        response.status_code = 200
+        response.reason = "OK"
+        # the 304 response carries the current values of the end-to-end headers
+        response.headers = CaseInsensitiveDict(
+            {**stored.headers, **_get_end_to_end_headers(not_modified)}
+        )
+        response.headers["Content-Length"] = str(len(stored.body))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = stored.body
+        response.url = not_modified.url
+        response.request = request
+        response.connection = not_modified.connection
+        response.elapsed = not_modified.elapsed
+        return response
+
+
+def _get_end_to_end_headers(response: Response) -> dict[str, str]:
+    return {
+        name: value
+        for name, value in response.headers.items()
+        if name.lower() not in HOP_BY_HOP_HEADERS
+    }
+
+
+def get_retry_after(response: Response) -> float | None:
+    """
+    :return: Number of seconds from the `Retry-After` header or None
+    if the header is missing or invalid
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def configure_session(session: Session, instance_config: RemoteInstanceConfig) -> None:
+    """
+    Configure the connection pool and the rate limiting of a session used
+    by a client library.
+
+    Connections are kept alive and reused between requests. At most
+    `max_connections` connections are open at the same time, further requests
+    wait for a free connection instead of opening a new one. Requests are
+    paced and retried according to the rate limiting settings of the instance.
+    With `conditional_requests`, responses are stored and revalidated
+    with the instance instead of being downloaded again.
+
+    Args:
+        session: Session of the client library
+        instance_config: Configuration of the instance the session connects to
+    """
+    bucket = TokenBucket(instance_config.rate_limit, instance_config.rate_limit_burst)
+    options: dict[str, Any] = {
+        "retries": instance_config.max_retries,
+        "backoff": instance_config.retry_backoff,
+        "pool_connections": 1,
+        "pool_maxsize": instance_config.max_connections,
+        "pool_block": True,
+    }
+    adapter: RateLimitedAdapter
+    if instance_config.conditional_requests:
+        adapter = ConditionalRequestAdapter(bucket, ResponseStore(), **options)
+    else:
+        adapter = RateLimitedAdapter(bucket, **options)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from attr import define
+
+from issx.storage import connect, get_data_dir
+
+if TYPE_CHECKING:
+    from requests import PreparedRequest
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+# headers identifying the user, so responses are never shared between tokens
+AUTH_HEADERS = (
+    "Authorization",
+    "PRIVATE-TOKEN",
+    "JOB-TOKEN",
+    "X-Redmine-API-Key",
+    "X-Redmine-Switch-User",
+)
+
+
+@define
+class StoredResponse:
+    """
+    Body and headers of a response together with its validators
+    """
+
+    etag: str | None
+    last_modified: str | None
+    headers: dict[str, str]
+    body: bytes
+
+
+@define
+class ResponseStoreStats:
+    entries: int
+    hits: int
+    size_bytes: int
+    path: Path
+
+
+class ResponseStore:
+    """
+    On-disk store of responses to GET requests revalidated
+    with conditional requests.
+
+    Responses are keyed by a hash of the URL and the authentication headers,
+    so neither the URLs nor the tokens are written to the disk. The least
+    recently used responses are evicted when the store grows over `max_entries`.
+    The store can be used from multiple threads and the database is opened
+    only when it is used for the first time.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        max_entries: int = 10_000,
+        max_body_size: int = 1024 * 1024,
+    ):
+        """
+        :param path: Path to the database file. Defaults to `responses.sqlite3`
+        in the issx data directory.
+        :param max_entries: Maximum number of stored responses
+        :param max_body_size: Responses with larger bodies are not stored
+        """
+        self.path = path or get_data_dir() / "responses.sqlite3"
+        self.max_entries = max_entries
+        self.max_body_size = max_body_size
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> StoredResponse | None:
+        """
+        :return: The stored response or None if it is not stored
+        """
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT etag, last_modified, headers, body FROM responses"
+                    " WHERE key = ?",
+                    (key,),
+                )
+                .fetchone()
+            )
+        if row is None:
+            return None
+        return StoredResponse(
+            etag=row["etag"],
+            last_modified=row["last_modified"],
+            headers=json.loads(row["headers"]),
+            body=row["body"],
+        )
+
+    def put(self, key: str, response: StoredResponse) -> None:
+        """
+        Store a response evicting the least recently used ones if the store
+        is full. Responses without validators or with too large bodies
+        are ignored.
+        """
+        if response.etag is None and response.last_modified is None:
+            return
+        if len(response.body) > self.max_body_size:
+            return
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "INSERT INTO responses"
+                " (key, etag, last_modified, headers, body, stored_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET etag = excluded.etag,"
+                " last_modified = excluded.last_modified,"
+                " headers = excluded.headers, body = excluded.body,"
+                " stored_at = excluded.stored_at, accessed_at = excluded.accessed_at",
+                (
+                    key,
+                    response.etag,
+                    response.last_modified,
+                    json.dumps(response.headers),
+                    response.body,
+                    now,
+                    now,
+                ),
+            )
+            connection.execute(
+                "DELETE FROM responses WHERE rowid IN (SELECT rowid FROM responses"
+                " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def touch(self, key: str) -> None:
+        """
+        Mark a response as revalidated, i.e. still up to date
+        """
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "UPDATE responses SET accessed_at = ?, hits = hits + 1 WHERE key = ?",
+                (time.time(), key),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._connect() as connection:
+            connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM responses")
+            connection.execute("VACUUM")
+
+    def stats(self) -> ResponseStoreStats:
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS hits"
+                    " FROM responses"
+                )
+                .fetchone()
+            )
+        return ResponseStoreStats(
+            entries=row["entries"],
+            hits=row["hits"],
+            size_bytes=self.path.stat().st_size,
+            path=self.path,
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = connect(
+                self.path, SCHEMA, SCHEMA_VERSION, check_same_thread=False
+            )
+        return self._connection
+
+
+def get_cache_key(request: "PreparedRequest") -> str:
+    """
+    :return: Key of the response to the request in a `ResponseStore`
+    """
+    parts = [str(request.url)]
+    parts.extend(
+        f"{header}: {request.headers[header]!r}"
+        for header in AUTH_HEADERS
+        if header in request.headers
+    )
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
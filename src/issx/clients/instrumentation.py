@@ -0,0 +1,394 @@
+"""
+Instrumentation of the calls made by the clients to the instances.
+
+Every call of a client operation, e.g. `get_issue` or `create_issue`,
+emits a `CallEvent` to the hooks registered with `add_call_hook` and to the hooks
+of its context registered with `scoped_call_hook`. The event contains
+the duration of the call and the HTTP requests sent during it.
+When no hooks are registered, the calls are not measured at all.
+"""
+
+import functools
+import json
+import math
+import secrets
+import time
+from collections.abc import AsyncIterator, Callable, Coroutine, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Concatenate,
+    ParamSpec,
+    Protocol,
+    TextIO,
+    TypeVar,
+)
+
+from attr import define, field
+
+from issx.metrics import REGISTRY
+
+if TYPE_CHECKING:
+    from requests import Response
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+@define(frozen=True)
+class CallEvent:
+    """
+    A finished call of a client operation
+    """
+
+    backend: str
+    operation: str
+    start_time: float
+    """Unix time at which the call started"""
+    duration: float
+    """Duration of the call in seconds"""
+    status: int | None = None
+    """Status code of the last response or None if no request was sent"""
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    requests: int = 0
+    """Number of HTTP requests sent during the call, including retries"""
+    retries: int = 0
+    throttled: int = 0
+    """Number of responses rejected by the rate limit of the instance"""
+    error: str | None = None
+    """Name of the exception raised by the call"""
+    span_id: str = ""
+    parent_span_id: str | None = None
+    """Span of the call during which this call was made, if any"""
+
+
+CallHook = Callable[[CallEvent], None]
+
+
+@define
+class _CallRecord:
+    span_id: str
+    parent_span_id: str | None
+    status: int | None = None
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    requests: int = 0
+    retries: int = 0
+    throttled: int = 0
+
+
+_hooks: list[CallHook] = []
+# the executor copies the context to its threads, so the HTTP adapter
+# records the requests in the call that has sent them
+_current_call: ContextVar[_CallRecord | None] = ContextVar(
+    "issx_current_call", default=None
+)
+_scoped_hooks: ContextVar[tuple[CallHook, ...]] = ContextVar(
+    "issx_scoped_call_hooks", default=()
+)
+
+
+def add_call_hook(hook: CallHook) -> None:
+    """
+    Register a function called with every finished call of a client operation.
+    Hooks are called in the event loop, so they should return quickly.
+    """
+    _hooks.append(hook)
+
+
+def remove_call_hook(hook: CallHook) -> None:
+    _hooks.remove(hook)
+
+
+@contextmanager
+def scoped_call_hook(hook: CallHook) -> Iterator[None]:
+    """
+    Register a hook called only with the calls made inside the block
+    by the current task and the tasks created in it. Calls made concurrently
+    by other tasks, e.g. other commands of the daemon, are not passed to it.
+    """
+    token = _scoped_hooks.set((*_scoped_hooks.get(), hook))
+    try:
+        yield
+    finally:
+        _scoped_hooks.reset(token)
+
+
+@asynccontextmanager
+async def track_call(backend: str, operation: str) -> AsyncIterator[None]:
+    """
+    Measure the code inside the block as a call of a client operation.
+
+    Requests sent by a nested call are counted only in the innermost call,
+    while the duration of the outer call includes the nested one.
+    """
+    hooks = [*_hooks, *_scoped_hooks.get()]
+    if not hooks:
+        yield
+        return
+    parent = _current_call.get()
+    record = _CallRecord(
+        span_id=secrets.token_hex(8),
+        parent_span_id=parent.span_id if parent is not None else None,
+    )
+    token = _current_call.set(record)
+    start_time, start = time.time(), time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current_call.reset(token)
+        event = CallEvent(
+            backend=backend,
+            operation=operation,
+            start_time=start_time,
+            duration=duration,
+            status=record.status,
+            bytes_sent=record.bytes_sent,
+            bytes_received=record.bytes_received,
+            requests=record.requests,
+            retries=record.retries,
+            throttled=record.throttled,
+            error=error,
+            span_id=record.span_id,
+            parent_span_id=record.parent_span_id,
+        )
+        for hook in hooks:
+            hook(event)
+
+
+class _InstrumentedClient(Protocol):
+    @property
+    def backend(self) -> str: ...
+
+
+TClient = TypeVar("TClient", bound=_InstrumentedClient)
+
+
+def instrumented(
+    operation: str,
+) -> Callable[
+    [Callable[Concatenate[TClient, P], Coroutine[Any, Any, T]]],
+    Callable[Concatenate[TClient, P], Coroutine[Any, Any, T]],
+]:
+    """
+    Decorate an async method of a client to track its calls as the operation.
+    The backend is taken from the `backend` attribute of the client.
+    """
+
+    def decorator(
+        method: Callable[Concatenate[TClient, P], Coroutine[Any, Any, T]],
+    ) -> Callable[Concatenate[TClient, P], Coroutine[Any, Any, T]]:
+        @functools.wraps(method)
+        async def wrapper(self: TClient, *args: P.args, **kwargs: P.kwargs) -> T:
+            async with track_call(self.backend, operation):
+                return await method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_response(
+    response: "Response", stream: bool = False, throttled: bool = False
+) -> None:
+    """
+    Record a response received during the current call, if any.
+
+    :param stream: Whether the body is streamed. The size of a streamed body
+    is known only from its `Content-Length` header.
+    :param throttled: Whether the request was rejected by the rate limit
+    """
+    record = _current_call.get()
+    if record is None:
+        return
+    record.requests += 1
+    record.throttled += throttled
+    record.status = response.status_code
+    body = response.request.body
+    if isinstance(body, str):
+        body = body.encode()
+    record.bytes_sent += len(body) if isinstance(body, bytes) else 0
+    length = response.headers.get("Content-Length", "")
+    if length.isdigit():
+        record.bytes_received += int(length)
+    elif not stream:
+        record.bytes_received += len(response.content)
+
+
+def record_retry() -> None:
+    """
+    Record that the last request of the current call, if any, is retried
+    """
+    if (record := _current_call.get()) is not None:
+        record.retries += 1
+
+
+API_CALLS = REGISTRY.counter(
+    "issx_api_calls_total",
+    "Number of calls of client operations by their outcome",
+    ["backend", "operation", "outcome"],
+)
+API_CALL_DURATION = REGISTRY.histogram(
+    "issx_api_call_duration_seconds",
+    "Duration of calls of client operations",
+    ["backend", "operation"],
+)
+API_REQUESTS = REGISTRY.counter(
+    "issx_api_requests_total",
+    "Number of HTTP requests sent to the instances, including retries",
+    ["backend"],
+)
+API_RETRIES = REGISTRY.counter(
+    "issx_api_retries_total", "Number of retried HTTP requests", ["backend"]
+)
+API_THROTTLED = REGISTRY.counter(
+    "issx_api_throttled_total",
+    "Number of HTTP requests rejected by the rate limit of the instances",
+    ["backend"],
+)
+API_RECEIVED_BYTES = REGISTRY.counter(
+    "issx_api_received_bytes_total",
+    "Number of bytes received from the instances",
+    ["backend"],
+)
+
+
+def record_metrics(event: CallEvent) -> None:
+    """
+    Hook recording the calls in the metrics of `issx.metrics.REGISTRY`
+    """
+    backend, operation = str(event.backend), event.operation
+    API_CALLS.inc(
+        backend=backend,
+        operation=operation,
+        outcome="success" if event.error is None else "error",
+    )
+    API_CALL_DURATION.observe(event.duration, backend=backend, operation=operation)
+    API_REQUESTS.inc(event.requests, backend=backend)
+    API_RETRIES.inc(event.retries, backend=backend)
+    API_THROTTLED.inc(event.throttled, backend=backend)
+    API_RECEIVED_BYTES.inc(event.bytes_received, backend=backend)
+
+
+@define(frozen=True)
+class OperationStats:
+    backend: str
+    operation: str
+    count: int
+    p50: float
+    p95: float
+    max: float
+    bytes_received: int
+    errors: int
+
+
+@define
+class CallProfiler:
+    """
+    Hook collecting the call events, e.g. to summarize the latencies
+    of the operations or to export them as spans
+    """
+
+    events: list[CallEvent] = field(factory=list)
+    trace_id: str = field(factory=lambda: secrets.token_hex(16))
+
+    def __call__(self, event: CallEvent) -> None:
+        self.events.append(event)
+
+    def summary(self) -> list[OperationStats]:
+        """
+        :return: Statistics of the calls of every operation of every backend
+        """
+        calls: dict[tuple[str, str], list[CallEvent]] = {}
+        for event in self.events:
+            calls.setdefault((event.backend, event.operation), []).append(event)
+        stats = []
+        for (backend, operation), events in sorted(calls.items()):
+            durations = sorted(event.duration for event in events)
+            stats.append(
+                OperationStats(
+                    backend=backend,
+                    operation=operation,
+                    count=len(events),
+                    p50=_percentile(durations, 0.5),
+                    p95=_percentile(durations, 0.95),
+                    max=durations[-1],
+                    bytes_received=sum(event.bytes_received for event in events),
+                    errors=sum(event.error is not None for event in events),
+                )
+            )
+        return stats
+
+    def write_spans(self, file: TextIO) -> None:
+        """
+        Write the calls as spans of a single trace in the OTLP JSON format,
+        as a line of the file exporter of the OpenTelemetry Collector.
+        """
+        spans = [self._to_span(event) for event in self.events]
+        document = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _to_attributes({"service.name": "issx"})
+                    },
+                    "scopeSpans": [{"scope": {"name": "issx.clients"}, "spans": spans}],
+                }
+            ]
+        }
+        file.write(json.dumps(document) + "\n")
+
+    def _to_span(self, event: CallEvent) -> dict[str, Any]:
+        start = int(event.start_time * 1e9)
+        span: dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": event.span_id,
+            "name": f"{event.backend}.{event.operation}",
+            "kind": 3,  # client
+            "startTimeUnixNano": str(start),
+            "endTimeUnixNano": str(start + int(event.duration * 1e9)),
+            "attributes": _to_attributes(
+                {
+                    "issx.backend": event.backend,
+                    "issx.operation": event.operation,
+                    "http.response.status_code": event.status,
+                    "issx.requests": event.requests,
+                    "issx.retries": event.retries,
+                    "issx.throttled": event.throttled,
+                    "issx.bytes_sent": event.bytes_sent,
+                    "issx.bytes_received": event.bytes_received,
+                }
+            ),
+            # unset or error
+            "status": {"code": 2, "message": event.error} if event.error else {},
+        }
+        if event.parent_span_id is not None:
+            span["parentSpanId"] = event.parent_span_id
+        return span
+
+
+def _to_attributes(values: dict[str, str | int | None]) -> list[dict[str, Any]]:
+    # integers are encoded as strings in OTLP JSON
+    return [
+        {
+            "key": key,
+            "value": (
+                {"intValue": str(value)}
+                if isinstance(value, int)
+                else {"stringValue": value}
+            ),
+        }
+        for key, value in values.items()
+        if value is not None
+    ]
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    return values[max(math.ceil(len(values) * fraction) - 1, 0)]
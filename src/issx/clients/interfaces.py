@@ -1,8 +1,18 @@
 import abc
-from typing import ClassVar, Self
+import asyncio
+from collections.abc import AsyncIterator, Iterable, Sequence
+from datetime import datetime
+from typing import BinaryIO, ClassVar, Self
 
+from issx.clients.exceptions import IssueDoesNotExistError
 from issx.domain.config import InstanceConfig, ProjectFlatConfig
-from issx.domain.issues import Issue
+from issx.domain.issues import (
+    Attachment,
+    AttachmentReference,
+    Issue,
+    Note,
+    UploadedAttachment,
+)
 
 
 class InstanceClientInterface(abc.ABC):
@@ -28,6 +38,13 @@ class InstanceClientInterface(abc.ABC):
         """
         pass
 
+    def close(self) -> None:
+        """
+        Release resources held by the client, e.g. open connections.
+        Clients that do not hold any resources do not need to override it.
+        """
+        return None
+
     @classmethod
     @abc.abstractmethod
     def instance_from_config(cls, instance_config: InstanceConfig) -> Self:
@@ -46,6 +63,17 @@ class InstanceClientInterface(abc.ABC):
 class IssueClientInterface(abc.ABC):
     project_config_class: ClassVar[type[ProjectFlatConfig]] = ProjectFlatConfig
 
+    @abc.abstractmethod
+    async def validate_project(self) -> None:
+        """
+        Check that the project of the client exists.
+        Raises ProjectDoesNotExistError if the project does not exist.
+        Other methods do not fetch the project upfront, they validate it only
+        when a request fails as if the project was missing. Clients should cache
+        a successful validation, so it costs at most one request.
+        """
+        pass
+
     @abc.abstractmethod
     async def get_issue(self, issue_id: int) -> Issue:
         """
@@ -56,19 +84,127 @@ class IssueClientInterface(abc.ABC):
         """
         pass
 
+    async def get_issues(self, issue_ids: Iterable[int]) -> dict[int, Issue]:
+        """
+        Retrieve multiple issues by their IDs.
+        Issues that do not exist are missing in the result.
+        The default implementation fetches the issues one by one concurrently,
+        clients should override it if the API can fetch them in batches.
+        :param issue_ids: The IDs of the issues
+        :return: Dictionary of the found issues by their IDs
+        """
+
+        async def get_issue(issue_id: int) -> Issue | None:
+            try:
+                return await self.get_issue(issue_id)
+            except IssueDoesNotExistError:
+                return None
+
+        issue_ids = list(dict.fromkeys(issue_ids))
+        issues = await asyncio.gather(*map(get_issue, issue_ids))
+        return {
+            issue_id: issue
+            for issue_id, issue in zip(issue_ids, issues, strict=True)
+            if issue is not None
+        }
+
     @abc.abstractmethod
     async def create_issue(
-        self, title: str, description: str, assign_to_me: bool = False
+        self,
+        title: str,
+        description: str,
+        assign_to_me: bool = False,
+        attachments: Sequence[UploadedAttachment] = (),
     ) -> Issue:
         """
         Create a new issue.
         :param title: The title of the issue
         :param description: The description of the issue
         :param assign_to_me: Assign the issue to the authenticated user
+        :param attachments: Files uploaded with `upload_attachment` to attach
+        to the issue. Their links are expected to be in the description already.
         :return:
         """
         pass
 
+    @abc.abstractmethod
+    async def update_issue(self, issue_id: int, title: str, description: str) -> Issue:
+        """
+        Update the title and the description of an existing issue.
+        Raises IssueDoesNotExistError if the issue does not exist.
+        :param issue_id: The ID of the issue
+        :param title: The new title of the issue
+        :param description: The new description of the issue
+        :return: Updated issue
+        """
+        pass
+
+    @abc.abstractmethod
+    async def find_attachments(
+        self, issue: Issue, text: str
+    ) -> list[AttachmentReference]:
+        """
+        Find references to files uploaded to the project in a text.
+        :param issue: The issue of the project the text was rendered from,
+        e.g. a source issue of a copy. References are resolved
+        against its attachments.
+        :param text: The text to search, e.g. a rendered description
+        :return: References ordered by their position in the text
+        """
+        pass
+
+    @abc.abstractmethod
+    async def download_attachment(
+        self, attachment: Attachment, file: BinaryIO, chunk_size: int = 64 * 1024
+    ) -> None:
+        """
+        Write the content of an uploaded file to a binary file chunk by chunk,
+        so the whole file is never kept in memory.
+        Raises AttachmentDoesNotExistError if the file does not exist.
+        :param attachment: The file, e.g. of a reference found by `find_attachments`
+        :param file: The file to write to
+        :param chunk_size: Number of bytes read from the response at a time
+        """
+        pass
+
+    @abc.abstractmethod
+    async def upload_attachment(
+        self, filename: str, file: BinaryIO, content_type: str | None = None
+    ) -> UploadedAttachment:
+        """
+        Upload the content of a binary file to the project. The content is
+        streamed from the current position of the file to its end.
+        :param filename: The name of the uploaded file
+        :param file: The file to read from
+        :param content_type: The media type of the content, if known
+        :return: The uploaded file to link and attach to a created issue
+        """
+        pass
+
+    @abc.abstractmethod
+    def iter_notes(self, issue_id: int, page_size: int = 100) -> AsyncIterator[Note]:
+        """
+        Iterate over the comments of an issue from the oldest one.
+        Notes generated by the tracker, e.g. of changed fields, and private
+        comments are skipped. Comments are fetched page by page while iterating
+        if the API pages them.
+        Raises IssueDoesNotExistError while iterating if the issue does not exist.
+        :param issue_id: The ID of the issue
+        :param page_size: Number of comments fetched in a single request
+        :return: Async iterator of comments
+        """
+        pass
+
+    @abc.abstractmethod
+    async def create_note(self, issue_id: int, body: str) -> None:
+        """
+        Add a comment to an issue.
+        Raises IssueDoesNotExistError if the issue does not exist.
+        :param issue_id: The ID of the issue
+        :param body: The text of the comment
+        """
+        pass
+
     @abc.abstractmethod
     async def find_issues(self, title: str) -> list[Issue]:
         """
@@ -78,6 +214,26 @@ class IssueClientInterface(abc.ABC):
         """
         pass
 
+    @abc.abstractmethod
+    def iter_issues(
+        self,
+        page_size: int = 100,
+        updated_after: datetime | None = None,
+        search: str | None = None,
+    ) -> AsyncIterator[Issue]:
+        """
+        Iterate over all issues of the project regardless of their state.
+        Issues are fetched page by page while iterating, so only a single
+        page is kept in memory at a time.
+        :param page_size: Number of issues fetched in a single request
+        :param updated_after: If set, only issues updated at
+        or after this time are returned. Naive datetimes are treated as UTC.
+        :param search: If set, only issues with titles containing
+        this text are returned
+        :return: Async iterator of issues
+        """
+        pass
+
     @classmethod
     @abc.abstractmethod
     def from_config(
@@ -100,3 +256,25 @@ class IssueClientInterface(abc.ABC):
 
         """
         pass
+
+    @classmethod
+    def from_instance_client(
+        cls,
+        instance_client: InstanceClientInterface,
+        instance_config: InstanceConfig,
+        project_config: ProjectFlatConfig,
+    ) -> Self:
+        """
+        Create an instance of the client reusing the connection of an already
+        created instance client, so all projects of the instance share it.
+        Falls back to `from_config` by default.
+
+        Args:
+            instance_client: Instance client created for the `instance_config`
+            instance_config: InstanceConfig to configure the client to the instance
+            project_config: ProjectFlatConfig to configure client
+
+        Returns:
+            An instance of the client
+        """
+        return cls.from_config(instance_config, project_config)
@@ -0,0 +1,68 @@
+import asyncio
+from collections.abc import (
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    Sequence,
+)
+from itertools import islice
+from typing import TypeVar
+
+T = TypeVar("T")
+
+# the largest page accepted by both GitLab and Redmine APIs
+MAX_PAGE_SIZE = 100
+
+
+async def paginate(
+    fetch_page: Callable[[int], Awaitable[Sequence[T]]],
+    page_size: int,
+    prefetch: bool = True,
+) -> AsyncGenerator[T, None]:
+    """
+    Iterate over the items of consecutive pages.
+
+    Only a single page is kept in memory at a time. With `prefetch` the next
+    page is requested while the items of the current one are consumed,
+    so the consumer does not wait for the network between the pages.
+    Iteration stops at the first page shorter than `page_size`.
+
+    :param fetch_page: Function fetching a page by its index starting from 0
+    :param page_size: Number of items requested per page
+    :param prefetch: Whether to fetch the next page in the background
+    """
+    page_index = 0
+    next_page: asyncio.Future[Sequence[T]] | None = asyncio.ensure_future(
+        fetch_page(page_index)
+    )
+    try:
+        while next_page is not None:
+            page = await next_page
+            next_page = None
+            is_last = len(page) < page_size
+            if not is_last and prefetch:
+                page_index += 1
+                next_page = asyncio.ensure_future(fetch_page(page_index))
+            for item in page:
+                yield item
+            if not is_last and not prefetch:
+                page_index += 1
+                next_page = asyncio.ensure_future(fetch_page(page_index))
+    finally:
+        if next_page is not None and not next_page.cancel():
+            # the page has been fetched already, retrieve its exception
+            # to avoid warnings about exceptions that were never retrieved
+            if not next_page.cancelled():
+                next_page.exception()
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """
+    Split the items into consecutive lists of `size` items, the last one
+    may be shorter
+    """
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
@@ -1,16 +1,48 @@
-from typing import Self
+import asyncio
+import re
+from collections.abc import AsyncIterator, Iterable, Sequence
+from datetime import UTC, datetime
+from typing import Any, BinaryIO, Self
+from urllib.parse import quote, unquote
 
 from attr import asdict
 from redminelib import Redmine
 from redminelib.exceptions import ResourceNotFoundError
 from redminelib.resources import Issue as RedmineIssue
-from redminelib.resources import Project
-from redminelib.resultsets import ResourceSet
+from redminelib.resources import Project, User
 
-from issx.clients.exceptions import IssueDoesNotExistError, ProjectDoesNotExistError
+from issx.clients.exceptions import (
+    AttachmentDoesNotExistError,
+    IssueDoesNotExistError,
+    ProjectDoesNotExistError,
+)
+from issx.clients.executors import BlockingExecutor
+from issx.clients.http import configure_session
+from issx.clients.instrumentation import instrumented, track_call
 from issx.clients.interfaces import InstanceClientInterface, IssueClientInterface
-from issx.domain.config import InstanceConfig, ProjectFlatConfig
-from issx.domain.issues import Issue
+from issx.clients.paging import MAX_PAGE_SIZE, chunked, paginate
+from issx.clients.users import CurrentUserCache
+from issx.domain import SupportedBackend
+from issx.domain.config import InstanceConfig, ProjectFlatConfig, RemoteInstanceConfig
+from issx.domain.issues import (
+    Attachment,
+    AttachmentReference,
+    Issue,
+    Note,
+    UploadedAttachment,
+)
+
+# references of the attachments of an issue: links of the files,
+# `attachment:` links and inline images of Textile and Markdown
+REFERENCE_PATTERN = re.compile(
+    r"(?P<url>(?:https?://[^\s()<>\[\]\"']*?)?/attachments/(?:download/)?(?P<id>\d+)"
+    r"(?:/[^\s()<>\[\]\"']*)?)"
+    r'|attachment:"(?P<quoted>[^"]+)"'
+    r"|attachment:(?P<name>[^\s()<>\[\]\"']+)"
+    r"|!(?P<image>[^\s()!]+)!"
+    r"|\]\((?P<link>[^\s()<>]+)\)"
+)
+ATTACHMENT_ID_PATTERN = re.compile(r"/attachments/download/(\d+)/")
 
 
 class RedmineIssueMapper:
@@ -20,89 +52,389 @@ class RedmineIssueMapper:
 
     @classmethod
     def issue_to_domain(cls, issue: RedmineIssue) -> Issue:  # type: ignore[no-any-unimported]
+        # the payload is read directly, as accessing a missing include,
+        # e.g. the attachments, would fetch the issue again
+        payload = issue.raw()
         return Issue(
             id=issue.id,
             title=issue.subject,
             description=issue.description,
             web_url=issue.url,
             reference=issue.id,
+            updated_at=getattr(issue, "updated_on", None),
+            state=cls._get_name(payload, "status"),
+            assignees=(name,)
+            if (name := cls._get_name(payload, "assigned_to"))
+            else (),
+            author=cls._get_name(payload, "author"),
+            milestone=cls._get_name(payload, "fixed_version"),
+            created_at=cls._parse_datetime(payload.get("created_on")),
+            closed_at=cls._parse_datetime(payload.get("closed_on")),
+            attachments=tuple(
+                Attachment(
+                    filename=attachment["filename"],
+                    url=attachment["content_url"],
+                    size=attachment.get("filesize"),
+                    content_type=attachment.get("content_type"),
+                )
+                for attachment in payload.get("attachments") or ()
+            ),
         )
 
     @classmethod
-    def issues_to_domain_list(cls, issues: ResourceSet) -> list[Issue]:  # type: ignore[no-any-unimported]
+    def issues_to_domain_list(cls, issues: Iterable[RedmineIssue]) -> list[Issue]:  # type: ignore[no-any-unimported]
         return [cls.issue_to_domain(issue) for issue in issues]
 
+    @classmethod
+    def journal_to_domain(cls, journal: dict[str, Any]) -> Note:
+        return Note(
+            id=journal["id"],
+            body=journal["notes"],
+            author=cls._get_name(journal, "user"),
+            created_at=cls._parse_datetime(journal.get("created_on")),
+        )
+
+    @staticmethod
+    def _get_name(payload: dict[str, Any], key: str) -> str | None:
+        value = payload.get(key)
+        return value["name"] if value else None
+
+    @staticmethod
+    def _parse_datetime(value: str | None) -> datetime | None:
+        return datetime.fromisoformat(value) if value else None
+
 
 class RedmineInstanceClient(InstanceClientInterface):
-    def __init__(self, client: Redmine):  # type: ignore[no-any-unimported]
+    instance_config_class = RemoteInstanceConfig
+    backend = SupportedBackend.redmine
+
+    def __init__(  # type: ignore[no-any-unimported]
+        self,
+        client: Redmine,
+        executor: BlockingExecutor | None = None,
+        user_cache: CurrentUserCache[User] | None = None,
+    ):
         self.client = client
+        self.executor = executor or BlockingExecutor()
+        self.user_cache = user_cache or CurrentUserCache()
 
     async def auth(self) -> str | None:
-        return str(self.client.auth())
+        return str(await self.get_user())
+
+    async def get_user(self) -> User:  # type: ignore[no-any-unimported]
+        return await self.user_cache.get(self._fetch_user)
+
+    @instrumented("get_user")
+    async def _fetch_user(self) -> User:  # type: ignore[no-any-unimported]
+        return await self.executor.run(self.client.auth)
 
     def get_instance_url(self) -> str:
         return str(self.client.url)
 
+    def close(self) -> None:
+        self.client.engine.session.close()
+        self.executor.shutdown(wait=False)
+
     @classmethod
     def instance_from_config(cls, instance_config: InstanceConfig) -> Self:
         instance_config = cls.instance_config_class(**asdict(instance_config))
+        client = Redmine(
+            instance_config.url,
+            key=instance_config.token,
+        )
+        configure_session(client.engine.session, instance_config)
         return cls(
-            Redmine(
-                instance_config.url,
-                key=instance_config.token,
-            )
+            client,
+            executor=BlockingExecutor(instance_config.max_workers),
+            user_cache=CurrentUserCache(instance_config.user_cache_ttl),
         )
 
 
 class RedmineClient(IssueClientInterface, RedmineInstanceClient):
     """Redmine client implementation"""
 
-    def __init__(self, client: Redmine, project_id: int):  # type: ignore[no-any-unimported]
+    def __init__(  # type: ignore[no-any-unimported]
+        self,
+        client: Redmine,
+        project_id: int,
+        executor: BlockingExecutor | None = None,
+        user_cache: CurrentUserCache[User] | None = None,
+    ):
         self._project_id = project_id
         self._project: Project | None = None  # type: ignore[no-any-unimported]
-        super().__init__(client)
+        self._project_lock = asyncio.Lock()
+        super().__init__(client, executor=executor, user_cache=user_cache)
 
+    @instrumented("create_issue")
     async def create_issue(
-        self, title: str, description: str, assign_to_me: bool = False
+        self,
+        title: str,
+        description: str,
+        assign_to_me: bool = False,
+        attachments: Sequence[UploadedAttachment] = (),
     ) -> Issue:
-        issue = self.client.issue.create(
-            project_id=(await self.get_project()).id,
-            subject=title,
-            description=description,
-            assigned_to_id="me" if assign_to_me else None,
-        )
+        fields: dict[str, Any] = {}
+        if attachments:
+            fields["uploads"] = [
+                {
+                    "token": attachment.token,
+                    "filename": attachment.filename,
+                    "content_type": attachment.content_type,
+                }
+                for attachment in attachments
+            ]
+        try:
+            issue = await self.executor.run(
+                self.client.issue.create,
+                project_id=self._project_id,
+                subject=title,
+                description=description,
+                assigned_to_id=self._get_assignee_id() if assign_to_me else None,
+                **fields,
+            )
+        except ResourceNotFoundError:
+            await self.validate_project()
+            raise
         return RedmineIssueMapper.issue_to_domain(issue)
 
+    def _get_assignee_id(self) -> int | str:
+        """
+        Use the id of the cached user if available. Otherwise, let Redmine
+        resolve the current user with "me", without an extra request.
+        """
+        if (user := self.user_cache.user) is not None:
+            return int(user.id)
+        return "me"
+
+    @instrumented("get_issue")
     async def get_issue(self, issue_id: int) -> Issue:
         try:
-            issue = self.client.issue.get(issue_id)
+            issue = await self.executor.run(self.client.issue.get, issue_id)
         except ResourceNotFoundError as e:
             raise IssueDoesNotExistError(issue_id) from e
         return RedmineIssueMapper.issue_to_domain(issue)
 
+    @instrumented("get_issues")
+    async def get_issues(self, issue_ids: Iterable[int]) -> dict[int, Issue]:
+        # ids of existing issues are always positive
+        issue_ids = [issue_id for issue_id in dict.fromkeys(issue_ids) if issue_id > 0]
+
+        async def fetch_chunk(chunk: list[int]) -> list[RedmineIssue]:  # type: ignore[no-any-unimported]
+            # closed issues are filtered out unless any status is requested
+            return await self.executor.run(
+                self._filter_issues,
+                issue_id=",".join(map(str, chunk)),
+                status_id="*",
+                limit=len(chunk),
+            )
+
+        chunks = await asyncio.gather(
+            *map(fetch_chunk, chunked(issue_ids, MAX_PAGE_SIZE))
+        )
+        return {
+            issue.id: RedmineIssueMapper.issue_to_domain(issue)
+            for chunk in chunks
+            for issue in chunk
+        }
+
+    @instrumented("find_issues")
     async def find_issues(self, title: str) -> list[Issue]:
-        return RedmineIssueMapper.issues_to_domain_list(
-            self.client.issue.filter(
-                project_id=(await self.get_project()).id, subject=title
+        # the subject filter matches substrings, only exact matches are expected
+        return [
+            issue
+            async for issue in self.iter_issues(search=title)
+            if issue.title == title
+        ]
+
+    @instrumented("update_issue")
+    async def update_issue(self, issue_id: int, title: str, description: str) -> Issue:
+        try:
+            await self.executor.run(
+                self.client.issue.update,
+                issue_id,
+                subject=title,
+                description=description,
             )
+        except ResourceNotFoundError as e:
+            raise IssueDoesNotExistError(issue_id) from e
+        return await self.get_issue(issue_id)
+
+    async def find_attachments(
+        self, issue: Issue, text: str
+    ) -> list[AttachmentReference]:
+        matches = list(REFERENCE_PATTERN.finditer(text))
+        if not matches:
+            return []
+        attachments = issue.attachments or await self._get_attachments(issue.id)
+        by_id = {
+            match[1]: attachment
+            for attachment in attachments
+            if (match := ATTACHMENT_ID_PATTERN.search(attachment.url))
+        }
+        # Redmine links the latest attachment of the same name
+        by_name = {attachment.filename: attachment for attachment in attachments}
+        references = []
+        for match in matches:
+            group = next(
+                name
+                for name in ("url", "quoted", "name", "image", "link")
+                if match[name] is not None
+            )
+            if group == "url":
+                attachment = by_id.get(match["id"])
+            else:
+                attachment = by_name.get(unquote(match[group]))
+            if attachment is not None:
+                start, end = match.span(group)
+                references.append(AttachmentReference(attachment, start, end))
+        return references
+
+    @instrumented("get_attachments")
+    async def _get_attachments(self, issue_id: int) -> tuple[Attachment, ...]:
+        try:
+            issue = await self.executor.run(
+                self.client.issue.get, issue_id, include=["attachments"]
+            )
+        except ResourceNotFoundError as e:
+            raise IssueDoesNotExistError(issue_id) from e
+        return RedmineIssueMapper.issue_to_domain(issue).attachments
+
+    @instrumented("download_attachment")
+    async def download_attachment(
+        self, attachment: Attachment, file: BinaryIO, chunk_size: int = 64 * 1024
+    ) -> None:
+        await self.executor.run(
+            self._download_attachment, attachment.url, file, chunk_size
         )
 
-    async def get_project(self) -> Project:  # type: ignore[no-any-unimported]
-        if self._project is None:
+    def _download_attachment(self, url: str, file: BinaryIO, chunk_size: int) -> None:
+        # the session sends the API key, while `Redmine.download` would switch
+        # the shared engine to raw responses for the time of the request
+        with self.client.engine.session.get(url, stream=True) as response:
+            if response.status_code == 404:
+                raise AttachmentDoesNotExistError(url)
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size):
+                file.write(chunk)
+
+    @instrumented("upload_attachment")
+    async def upload_attachment(
+        self, filename: str, file: BinaryIO, content_type: str | None = None
+    ) -> UploadedAttachment:
+        upload = await self.executor.run(self.client.upload, file, filename=filename)
+        # inline images and links refer to the attachments of the issue by name
+        return UploadedAttachment(
+            filename=filename,
+            url=quote(filename),
+            token=upload["token"],
+            content_type=content_type,
+        )
+
+    async def iter_notes(
+        self, issue_id: int, page_size: int = 100
+    ) -> AsyncIterator[Note]:
+        # journals are not paged, all of them come with the issue
+        async with track_call(self.backend, "list_notes"):
             try:
-                self._project = self.client.project.get(self._project_id)
+                issue = await self.executor.run(
+                    self.client.issue.get, issue_id, include=["journals"]
+                )
             except ResourceNotFoundError as e:
-                raise ProjectDoesNotExistError(
-                    f"Project with id={self._project_id} does not exist"
-                ) from e
+                raise IssueDoesNotExistError(issue_id) from e
+        for journal in issue.raw().get("journals") or ():
+            # journals without notes record only changes of the fields
+            if journal.get("notes") and not journal.get("private_notes"):
+                yield RedmineIssueMapper.journal_to_domain(journal)
+
+    @instrumented("create_note")
+    async def create_note(self, issue_id: int, body: str) -> None:
+        try:
+            await self.executor.run(self.client.issue.update, issue_id, notes=body)
+        except ResourceNotFoundError as e:
+            raise IssueDoesNotExistError(issue_id) from e
+
+    async def iter_issues(
+        self,
+        page_size: int = 100,
+        updated_after: datetime | None = None,
+        search: str | None = None,
+    ) -> AsyncIterator[Issue]:
+        filters = {"project_id": self._project_id, "status_id": "*"}
+        if updated_after is not None:
+            if updated_after.tzinfo is not None:
+                updated_after = updated_after.astimezone(UTC)
+            filters["updated_on"] = updated_after.strftime(">=%Y-%m-%dT%H:%M:%SZ")
+        if search is not None:
+            filters["subject"] = f"~{search}"
+
+        async def fetch_page(index: int) -> list[RedmineIssue]:  # type: ignore[no-any-unimported]
+            async with track_call(self.backend, "list_issues"):
+                try:
+                    return await self.executor.run(
+                        self._filter_issues,
+                        sort="id",
+                        offset=index * page_size,
+                        limit=page_size,
+                        **filters,
+                    )
+                except ResourceNotFoundError:
+                    await self.validate_project()
+                    raise
+
+        async for issue in paginate(fetch_page, page_size):
+            yield RedmineIssueMapper.issue_to_domain(issue)
+
+    def _filter_issues(self, **filters: object) -> list[RedmineIssue]:  # type: ignore[no-any-unimported]
+        # ResourceSet is lazy, so it has to be evaluated inside the executor
+        return list(self.client.issue.filter(**filters))
+
+    async def validate_project(self) -> None:
+        await self.get_project()
+
+    async def get_project(self) -> Project:  # type: ignore[no-any-unimported]
+        """
+        :return: The project with its metadata fetched once per client.
+        Requests of the issues use the configured project id instead.
+        """
+        if self._project is not None:
+            return self._project
+        async with self._project_lock:
+            if self._project is None:
+                self._project = await self._fetch_project()
         return self._project
 
+    @instrumented("get_project")
+    async def _fetch_project(self) -> Project:  # type: ignore[no-any-unimported]
+        try:
+            return await self.executor.run(self.client.project.get, self._project_id)
+        except ResourceNotFoundError as e:
+            raise ProjectDoesNotExistError(
+                f"Project with id={self._project_id} does not exist"
+            ) from e
+
     @classmethod
     def from_config(
         cls, instance_config: InstanceConfig, project_config: ProjectFlatConfig
     ) -> Self:
+        return cls.from_instance_client(
+            RedmineInstanceClient.instance_from_config(instance_config),
+            instance_config,
+            project_config,
+        )
+
+    @classmethod
+    def from_instance_client(
+        cls,
+        instance_client: InstanceClientInterface,
+        instance_config: InstanceConfig,
+        project_config: ProjectFlatConfig,
+    ) -> Self:
+        if not isinstance(instance_client, RedmineInstanceClient):
+            return cls.from_config(instance_config, project_config)
         project_config = cls.project_config_class(**asdict(project_config))
         return cls(
-            RedmineInstanceClient.instance_from_config(instance_config).client,
+            instance_client.client,
             project_id=int(project_config.project),
+            executor=instance_client.executor,
+            user_cache=instance_client.user_cache,
         )
@@ -0,0 +1,55 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+TUser = TypeVar("TUser")
+
+
+class CurrentUserCache(Generic[TUser]):
+    """
+    Caches the user authenticated with an instance, so it is fetched once
+    per instance instead of once per API call that needs it.
+    """
+
+    def __init__(self, ttl: float | None = None):
+        """
+        :param ttl: Number of seconds after which the cached user is fetched again.
+        If None, the user is cached until `invalidate` is called.
+        """
+        self.ttl = ttl
+        self._user: TUser | None = None
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def user(self) -> TUser | None:
+        """
+        :return: The cached user or None if the cache is empty or expired
+        """
+        if self.ttl is not None and time.monotonic() - self._fetched_at > self.ttl:
+            return None
+        return self._user
+
+    async def get(self, fetch: Callable[[], Awaitable[TUser]]) -> TUser:
+        """
+        Return the cached user, fetching it first if the cache is empty or expired.
+        Concurrent calls wait for a single fetch.
+
+        :param fetch: Coroutine function fetching the current user from the instance
+        :return: The current user
+        """
+        if (user := self.user) is not None:
+            return user
+        async with self._lock:
+            if (user := self.user) is not None:
+                return user
+            user = await fetch()
+            self._user, self._fetched_at = user, time.monotonic()
+            return user
+
+    def invalidate(self) -> None:
+        """
+        Drop the cached user, e.g. after the token of the instance has changed.
+        """
+        self._user = None
@@ -0,0 +1,13 @@
+__all__ = [
+    "ClientConfigurationError",
+    "CommandRunner",
+    "DaemonClient",
+    "DaemonServer",
+    "RemoteError",
+    "get_socket_path",
+]
+
+from issx.daemon.client import DaemonClient
+from issx.daemon.protocol import RemoteError, get_socket_path
+from issx.daemon.runner import ClientConfigurationError, CommandRunner
+from issx.daemon.server import DaemonServer
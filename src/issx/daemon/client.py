@@ -0,0 +1,156 @@
+import asyncio
+import socket
+from collections.abc import AsyncIterator
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+from issx.daemon.protocol import (
+    STREAM_LIMIT,
+    RemoteError,
+    copy_result_from_dict,
+    decode,
+    encode,
+    get_socket_path,
+    sync_report_from_dict,
+)
+from issx.daemon.runner import ClientConfigurationError
+from issx.domain.issues import Issue, issue_from_dict
+from issx.services import CopyPlan, CopyResult, SyncReport
+from issx.services.planning import plan_from_dict, plan_to_dict
+
+
+class DaemonClient:
+    """
+    Forwards the commands to a running daemon.
+
+    It has the same interface as `CommandRunner`, so the CLI can use
+    either of them. Errors raised by the daemon are re-raised
+    as `RemoteError` or `ClientConfigurationError`.
+    """
+
+    def __init__(self, socket_path: Path | None = None):
+        self.socket_path = socket_path or get_socket_path()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    @classmethod
+    def connect(
+        cls, config_file: Path, socket_path: Path | None = None, timeout: float = 1
+    ) -> Self | None:
+        """
+        :param config_file: Config file the daemon is expected to serve
+        :return: A client if a daemon serving the config file is running,
+        None otherwise
+        """
+        client = cls(socket_path)
+        if not client.socket_path.exists():
+            return None
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout)
+                sock.connect(str(client.socket_path))
+                sock.sendall(encode({"command": "ping", "args": {}}))
+                with sock.makefile("rb") as file:
+                    response = decode(file.readline())
+        except (OSError, ValueError):
+            return None
+        if response.get("config_file") != str(config_file.resolve()):
+            return None
+        return client
+
+    async def auth_verify(self, instance: str) -> tuple[str, str | None]:
+        response = await self._request_one("auth_verify", instance=instance)
+        return response["url"], response["username"]
+
+    async def copy(
+        self, source: str, target: str, issue_id: int, **kwargs: Any
+    ) -> Issue:
+        response = await self._request_one(
+            "copy", source=source, target=target, issue_id=issue_id, **kwargs
+        )
+        return issue_from_dict(response["issue"])
+
+    async def copy_many(
+        self, source: str, target: str, issue_ids: list[int], **kwargs: Any
+    ) -> AsyncIterator[CopyResult]:
+        async for message in self._request(
+            "copy_many", source=source, target=target, issue_ids=issue_ids, **kwargs
+        ):
+            if message["event"] == "result":
+                yield copy_result_from_dict(message)
+
+    async def copy_to_targets(
+        self, source: str, targets: list[str], issue_ids: list[int], **kwargs: Any
+    ) -> AsyncIterator[CopyResult]:
+        async for message in self._request(
+            "copy_to_targets",
+            source=source,
+            targets=targets,
+            issue_ids=issue_ids,
+            **kwargs,
+        ):
+            if message["event"] == "result":
+                yield copy_result_from_dict(message)
+
+    async def plan(
+        self, source: str, target: str, issue_ids: list[int], **kwargs: Any
+    ) -> CopyPlan:
+        response = await self._request_one(
+            "plan", source=source, target=target, issue_ids=issue_ids, **kwargs
+        )
+        return plan_from_dict(response["plan"])
+
+    async def apply_plan(
+        self, plan: CopyPlan, **kwargs: Any
+    ) -> AsyncIterator[CopyResult]:
+        async for message in self._request(
+            "apply_plan", plan=plan_to_dict(plan), **kwargs
+        ):
+            if message["event"] == "result":
+                yield copy_result_from_dict(message)
+
+    async def sync(self, source: str, target: str, **kwargs: Any) -> SyncReport:
+        response = await self._request_one(
+            "sync", source=source, target=target, **kwargs
+        )
+        return sync_report_from_dict(response["report"])
+
+    def close(self) -> None:
+        # every request uses its own connection
+        return None
+
+    async def _request_one(self, command: str, **args: Any) -> dict[str, Any]:
+        async for message in self._request(command, **args):
+            if message["event"] == "done":
+                return message
+        raise RemoteError("The daemon closed the connection without a response")
+
+    async def _request(
+        self, command: str, **args: Any
+    ) -> AsyncIterator[dict[str, Any]]:
+        reader, writer = await asyncio.open_unix_connection(
+            self.socket_path, limit=STREAM_LIMIT
+        )
+        try:
+            writer.write(encode({"command": command, "args": args}))
+            await writer.drain()
+            async for line in reader:
+                message = decode(line)
+                if message["event"] == "error":
+                    if message["configuration"]:
+                        raise ClientConfigurationError(message["message"])
+                    raise RemoteError(message["message"])
+                yield message
+        finally:
+            writer.close()
+            await writer.wait_closed()
@@ -0,0 +1,92 @@
+"""
+Messages exchanged between the CLI and the daemon.
+
+Every connection carries a single request followed by the responses
+to it. All messages are JSON objects, one per line. A request has
+`command` and `args` keys. Responses have an `event` key, which is
+`result` for a partial result, `done` for the final response and `error`
+if the command failed.
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from issx.domain.issues import issue_from_dict, issue_to_dict
+from issx.services import CopyResult, SyncReport
+from issx.storage import get_data_dir
+
+# reports of large projects do not fit into the default limit of 64 KiB
+STREAM_LIMIT = 64 * 1024 * 1024
+
+
+class RemoteError(Exception):
+    """
+    Error raised by the daemon while running a command
+    """
+
+    def __repr__(self) -> str:
+        # the message is already the representation of the original error
+        return str(self)
+
+
+def get_socket_path() -> Path:
+    return get_data_dir() / "daemon.sock"
+
+
+def encode(message: dict[str, Any]) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def decode(line: bytes) -> dict[str, Any]:
+    message: dict[str, Any] = json.loads(line)
+    return message
+
+
+def copy_result_to_dict(result: CopyResult) -> dict[str, Any]:
+    return {
+        "issue_id": result.issue_id,
+        "issue": issue_to_dict(result.issue) if result.issue else None,
+        "error": repr(result.error) if result.error else None,
+        "target": result.target,
+    }
+
+
+def copy_result_from_dict(data: dict[str, Any]) -> CopyResult:
+    return CopyResult(
+        data["issue_id"],
+        issue=issue_from_dict(data["issue"]) if data["issue"] else None,
+        error=RemoteError(data["error"]) if data["error"] else None,
+        target=data.get("target"),
+    )
+
+
+def sync_report_to_dict(report: SyncReport) -> dict[str, Any]:
+    return {
+        "created": [issue_to_dict(issue) for issue in report.created],
+        "updated": [issue_to_dict(issue) for issue in report.updated],
+        "unchanged": [issue_to_dict(issue) for issue in report.unchanged],
+        "errors": {str(key): repr(error) for key, error in report.errors.items()},
+        "updated_after": _datetime_to_str(report.updated_after),
+        "cursor": _datetime_to_str(report.cursor),
+    }
+
+
+def sync_report_from_dict(data: dict[str, Any]) -> SyncReport:
+    return SyncReport(
+        created=[issue_from_dict(issue) for issue in data["created"]],
+        updated=[issue_from_dict(issue) for issue in data["updated"]],
+        unchanged=[issue_from_dict(issue) for issue in data["unchanged"]],
+        errors={int(key): RemoteError(error) for key, error in data["errors"].items()},
+        updated_after=_datetime_from_str(data["updated_after"]),
+        cursor=_datetime_from_str(data["cursor"]),
+    )
+
+
+def _datetime_to_str(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+def _datetime_from_str(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
@@ -0,0 +1,414 @@
+from collections.abc import AsyncIterator
+from types import TracebackType
+from typing import Any, Self
+
+from issx.clients.cache import CachedIssueClient, IssueCache
+from issx.clients.interfaces import IssueClientInterface
+from issx.domain.config import RemoteInstanceConfig
+from issx.domain.issues import Issue
+from issx.instance_managers.config_parser import GenericConfigParser
+from issx.instance_managers.managers import InstanceManager
+from issx.services import (
+    AttachmentTransferService,
+    CopyIssueService,
+    CopyPlan,
+    CopyPlanner,
+    CopyResult,
+    FanOutCopyService,
+    IssueMapping,
+    IssueMappingStore,
+    JobJournal,
+    JobStore,
+    NoteCopyService,
+    ProjectRef,
+    SyncReport,
+    SyncService,
+    SyncStateStore,
+)
+
+
+class ClientConfigurationError(Exception):
+    """
+    Raised when a client of a configured instance or project cannot be created
+    """
+
+
+class CommandRunner:
+    """
+    Runs the commands of issx against the configured instances.
+
+    The runner keeps the instance clients and the local stores open
+    between the commands. The CLI creates a runner for a single command,
+    while the daemon keeps one for its whole lifetime.
+    """
+
+    def __init__(self, config: GenericConfigParser):
+        self.config = config
+        self.instance_manager = InstanceManager(config)
+        self._mapping_store: IssueMappingStore | None = None
+        self._state_store: SyncStateStore | None = None
+        self._issue_cache: IssueCache | None = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    async def auth_verify(self, instance: str) -> tuple[str, str | None]:
+        """
+        :return: URL of the instance and the name of the authenticated user
+        or None if the authentication failed
+        """
+        try:
+            client = self.instance_manager.get_instance_client(instance)
+        except Exception as e:
+            raise ClientConfigurationError(str(e)) from e
+        return client.get_instance_url(), await client.auth()
+
+    async def copy(
+        self,
+        source: str,
+        target: str,
+        issue_id: int,
+        title_format: str = "",
+        description_format: str = "{description}",
+        allow_duplicates: bool = False,
+        assign_to_me: bool = False,
+        cache: bool = False,
+        cache_max_age: float = 3600,
+        attachments: bool = False,
+        notes: bool = False,
+    ) -> Issue:
+        """
+        Copy a single issue. See `CopyIssueService.copy` for the details.
+
+        An empty `title_format` falls back to the title template
+        of the target project.
+        """
+        service = self._get_copy_service(
+            source, target, cache, cache_max_age, attachments, notes
+        )
+        return await service.copy(
+            issue_id,
+            title_format=self._get_title_format(target, title_format),
+            description_format=description_format,
+            allow_duplicates=allow_duplicates,
+            assign_to_me=assign_to_me,
+        )
+
+    async def copy_many(
+        self,
+        source: str,
+        target: str,
+        issue_ids: list[int],
+        title_format: str = "",
+        description_format: str = "{description}",
+        allow_duplicates: bool = False,
+        assign_to_me: bool = False,
+        cache: bool = False,
+        cache_max_age: float = 3600,
+        attachments: bool = False,
+        notes: bool = False,
+        concurrency: int = 10,
+        job: str | None = None,
+    ) -> AsyncIterator[CopyResult]:
+        """
+        Copy multiple issues. See `CopyIssueService.copy_many` for the details.
+
+        An empty `title_format` falls back to the title template
+        of the target project.
+
+        :param job: ID of the job the copy is journaled as. A new job is created
+        or an existing one with the same arguments is resumed.
+        """
+        journal = self._open_job(
+            job,
+            source=source,
+            targets=[target],
+            issue_ids=issue_ids,
+            options={
+                "title_format": title_format,
+                "description_format": description_format,
+                "allow_duplicates": allow_duplicates,
+                "assign_to_me": assign_to_me,
+                "cache": cache,
+                "cache_max_age": cache_max_age,
+                "attachments": attachments,
+                "notes": notes,
+            },
+        )
+        service = self._get_copy_service(
+            source, target, cache, cache_max_age, attachments, notes, journal
+        )
+        try:
+            async for result in service.copy_many(
+                issue_ids,
+                title_format=self._get_title_format(target, title_format),
+                description_format=description_format,
+                allow_duplicates=allow_duplicates,
+                assign_to_me=assign_to_me,
+                max_concurrency=concurrency,
+            ):
+                yield result
+        finally:
+            if journal is not None:
+                journal.close()
+
+    async def copy_to_targets(
+        self,
+        source: str,
+        targets: list[str],
+        issue_ids: list[int],
+        title_format: str = "",
+        description_format: str = "{description}",
+        allow_duplicates: bool = False,
+        assign_to_me: bool = False,
+        cache: bool = False,
+        cache_max_age: float = 3600,
+        attachments: bool = False,
+        notes: bool = False,
+        concurrency: int = 10,
+        job: str | None = None,
+    ) -> AsyncIterator[CopyResult]:
+        """
+        Copy issues to multiple targets fetching every source issue once.
+        See `FanOutCopyService.copy_many` for the details.
+
+        An empty `title_format` falls back to the title templates
+        of the particular targets.
+
+        :param job: ID of the job the copy is journaled as, see `copy_many`
+        """
+        targets = list(dict.fromkeys(targets))
+        journal = self._open_job(
+            job,
+            source=source,
+            targets=targets,
+            issue_ids=issue_ids,
+            options={
+                "title_format": title_format,
+                "description_format": description_format,
+                "allow_duplicates": allow_duplicates,
+                "assign_to_me": assign_to_me,
+                "cache": cache,
+                "cache_max_age": cache_max_age,
+                "attachments": attachments,
+                "notes": notes,
+            },
+        )
+        service = FanOutCopyService(
+            self._get_source_client(source, cache, cache_max_age),
+            {
+                target: self._get_copy_service(
+                    source, target, cache, cache_max_age, attachments, notes, journal
+                )
+                for target in targets
+            },
+        )
+        try:
+            async for result in service.copy_many(
+                issue_ids,
+                description_format=description_format,
+                allow_duplicates=allow_duplicates,
+                assign_to_me=assign_to_me,
+                max_concurrency=concurrency,
+                title_formats={
+                    target: self._get_title_format(target, title_format)
+                    for target in targets
+                },
+            ):
+                yield result
+        finally:
+            if journal is not None:
+                journal.close()
+
+    async def plan(
+        self,
+        source: str,
+        target: str,
+        issue_ids: list[int],
+        title_format: str = "",
+        description_format: str = "{description}",
+        allow_duplicates: bool = False,
+        assign_to_me: bool = False,
+        cache: bool = False,
+        cache_max_age: float = 3600,
+        concurrency: int = 10,
+    ) -> CopyPlan:
+        """
+        Plan copying multiple issues without making any changes.
+        See `CopyPlanner.plan` for the details. The duration is estimated
+        with the rate limit of the target instance.
+
+        An empty `title_format` falls back to the title template
+        of the target project.
+        """
+        planner = CopyPlanner(
+            self._get_source_client(source, cache, cache_max_age),
+            self._get_client(target),
+            mapping=self._get_mapping(source, target),
+        )
+        rate_limit, rate_limit_burst = self._get_rate_limit(target)
+        plan = await planner.plan(
+            issue_ids,
+            title_format=self._get_title_format(target, title_format),
+            description_format=description_format,
+            allow_duplicates=allow_duplicates,
+            assign_to_me=assign_to_me,
+            max_concurrency=concurrency,
+            rate_limit=rate_limit,
+            rate_limit_burst=rate_limit_burst,
+        )
+        plan.source, plan.target = source, target
+        return plan
+
+    async def apply_plan(
+        self, plan: CopyPlan, concurrency: int = 10
+    ) -> AsyncIterator[CopyResult]:
+        """
+        Execute a plan made by `plan`. See `CopyIssueService.apply_plan`
+        for the details.
+        """
+        if plan.source is None or plan.target is None:
+            raise ValueError("The plan does not name its source and target projects")
+        service = self._get_copy_service(
+            plan.source, plan.target, cache=False, cache_max_age=0
+        )
+        async for result in service.apply_plan(plan, max_concurrency=concurrency):
+            yield result
+
+    async def sync(
+        self,
+        source: str,
+        target: str,
+        title_format: str = "",
+        description_format: str = "{description}",
+        full: bool = False,
+        concurrency: int = 10,
+    ) -> SyncReport:
+        """
+        Synchronize the target project with the source project.
+        See `SyncService.sync` for the details.
+        """
+        source_client, target_client = self._get_clients(source, target)
+        source_config = self.config.get_project_config(source)
+        target_config = self.config.get_project_config(target)
+        if self._state_store is None:
+            self._state_store = SyncStateStore()
+        service = SyncService(
+            source_client,
+            target_client,
+            self._state_store,
+            sync_key=f"{source_config.instance}/{source_config.project}"
+            f"->{target_config.instance}/{target_config.project}",
+            mapping=self._get_mapping(source, target),
+        )
+        return await service.sync(
+            title_format=self._get_title_format(target, title_format),
+            description_format=description_format,
+            full=full,
+            max_concurrency=concurrency,
+        )
+
+    def close(self) -> None:
+        self.instance_manager.close()
+        for store in (self._mapping_store, self._state_store, self._issue_cache):
+            if store is not None:
+                store.close()
+        self._mapping_store = self._state_store = self._issue_cache = None
+
+    def _get_copy_service(
+        self,
+        source: str,
+        target: str,
+        cache: bool,
+        cache_max_age: float,
+        attachments: bool = False,
+        notes: bool = False,
+        journal: JobJournal | None = None,
+    ) -> CopyIssueService:
+        source_client = self._get_source_client(source, cache, cache_max_age)
+        target_client = self._get_client(target)
+        return CopyIssueService(
+            source_client,
+            target_client,
+            mapping=self._get_mapping(source, target),
+            attachments=(
+                AttachmentTransferService(source_client, target_client)
+                if attachments
+                else None
+            ),
+            notes=NoteCopyService(source_client, target_client) if notes else None,
+            journal=journal.for_target(target) if journal is not None else None,
+        )
+
+    @staticmethod
+    def _open_job(job: str | None, **header: Any) -> JobJournal | None:
+        return JobStore().open(job, header) if job is not None else None
+
+    def _get_source_client(
+        self, source: str, cache: bool, cache_max_age: float
+    ) -> IssueClientInterface:
+        source_client = self._get_client(source)
+        if not cache:
+            return source_client
+        if self._issue_cache is None:
+            self._issue_cache = IssueCache()
+        source_config = self.config.get_project_config(source)
+        return CachedIssueClient(
+            source_client,
+            self._issue_cache,
+            instance=source_config.instance,
+            project=source_config.project,
+            max_age=cache_max_age,
+        )
+
+    def _get_clients(
+        self, source: str, target: str
+    ) -> tuple[IssueClientInterface, IssueClientInterface]:
+        return self._get_client(source), self._get_client(target)
+
+    def _get_client(self, project: str) -> IssueClientInterface:
+        try:
+            return self.instance_manager.get_project_client(project)
+        except Exception as e:
+            raise ClientConfigurationError(str(e)) from e
+
+    def _get_mapping(self, source: str, target: str) -> IssueMapping:
+        if self._mapping_store is None:
+            self._mapping_store = IssueMappingStore()
+        source_config = self.config.get_project_config(source)
+        target_config = self.config.get_project_config(target)
+        return IssueMapping(
+            self._mapping_store,
+            source=ProjectRef(source_config.instance, source_config.project),
+            target=ProjectRef(target_config.instance, target_config.project),
+        )
+
+    def _get_rate_limit(self, project: str) -> tuple[float | None, int]:
+        """
+        :return: The rate limit and the burst of the project's instance
+        """
+        instance_config = self.config.get_instance_config(
+            self.config.get_project_config(project).instance
+        )
+        client_class = self.instance_manager.get_backend(instance_config.backend)[0]
+        settings = client_class.instance_config_class(
+            **instance_config.raw_config, raw_config=instance_config.raw_config
+        )
+        if not isinstance(settings, RemoteInstanceConfig):
+            return None, 1
+        return settings.rate_limit, settings.rate_limit_burst
+
+    def _get_title_format(self, target: str, title_format: str) -> str:
+        return (
+            title_format
+            or self.config.get_project_config(target).issue_title_template
+            or "{title}"
+        )
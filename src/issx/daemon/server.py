@@ -0,0 +1,160 @@
+import asyncio
+import os
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+from typing import Any
+
+from issx.daemon.protocol import (
+    STREAM_LIMIT,
+    copy_result_to_dict,
+    decode,
+    encode,
+    get_socket_path,
+    sync_report_to_dict,
+)
+from issx.daemon.runner import ClientConfigurationError, CommandRunner
+from issx.domain.issues import issue_to_dict
+from issx.instance_managers.config_parser import GenericConfigParser
+from issx.services import CopyResult
+from issx.services.planning import plan_from_dict, plan_to_dict
+
+# commands streaming the results of the particular copies
+BULK_COMMANDS = ("copy_many", "copy_to_targets", "apply_plan")
+
+
+class DaemonServer:
+    """
+    Serves the commands of issx over a Unix domain socket.
+
+    The server keeps a single `CommandRunner`, so the parsed config,
+    the authenticated instance clients and their connection pools are reused
+    by all commands. The config file is parsed again when it changes
+    and no other command is running.
+    """
+
+    def __init__(
+        self,
+        config_file: Path,
+        socket_path: Path | None = None,
+        runner_factory: Callable[[GenericConfigParser], CommandRunner] = (
+            CommandRunner
+        ),
+    ):
+        """
+        :param config_file: Path to the config file of the served instances
+        :param socket_path: Path to the socket. Defaults to `daemon.sock`
+        in the issx data directory.
+        :param runner_factory: Function creating a runner for the parsed config
+        """
+        self.config_file = config_file.resolve()
+        self.socket_path = socket_path or get_socket_path()
+        self.runner_factory = runner_factory
+        self._runner: CommandRunner | None = None
+        self._config_mtime: float | None = None
+        self._running_commands = 0
+
+    async def serve(self, started: asyncio.Event | None = None) -> None:
+        """
+        Serve the commands until cancelled.
+
+        :param started: Event set once the server accepts connections
+        """
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.socket_path.unlink(missing_ok=True)
+        server = await asyncio.start_unix_server(
+            self._handle_connection, path=self.socket_path, limit=STREAM_LIMIT
+        )
+        os.chmod(self.socket_path, 0o600)
+        try:
+            async with server:
+                if started is not None:
+                    started.set()
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._runner is not None:
+            self._runner.close()
+            self._runner = None
+        self.socket_path.unlink(missing_ok=True)
+
+    def get_runner(self) -> CommandRunner:
+        """
+        :return: The runner, recreated if the config file has changed
+        """
+        mtime = self.config_file.stat().st_mtime
+        if self._runner is not None and mtime != self._config_mtime:
+            # clients of the old runner cannot be closed under running commands
+            if self._running_commands > 1:
+                return self._runner
+            self._runner.close()
+            self._runner = None
+        if self._runner is None:
+            self._runner = self.runner_factory(
+                GenericConfigParser.from_file(self.config_file)
+            )
+            self._config_mtime = mtime
+        return self._runner
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._running_commands += 1
+        try:
+            request = decode(await reader.readline())
+            async for message in self._run(request["command"], request["args"]):
+                writer.write(encode(message))
+                await writer.drain()
+        except Exception as e:
+            writer.write(
+                encode(
+                    {
+                        "event": "error",
+                        "message": repr(e),
+                        "configuration": isinstance(e, ClientConfigurationError),
+                    }
+                )
+            )
+        finally:
+            self._running_commands -= 1
+            writer.close()
+            await writer.wait_closed()
+
+    async def _run(
+        self, command: str, args: dict[str, Any]
+    ) -> AsyncIterator[dict[str, Any]]:
+        if command == "ping":
+            yield {
+                "event": "done",
+                "pid": os.getpid(),
+                "config_file": str(self.config_file),
+            }
+        elif command == "auth_verify":
+            url, username = await self.get_runner().auth_verify(**args)
+            yield {"event": "done", "url": url, "username": username}
+        elif command == "copy":
+            issue = await self.get_runner().copy(**args)
+            yield {"event": "done", "issue": issue_to_dict(issue)}
+        elif command in BULK_COMMANDS:
+            async for result in self._run_bulk(command, args):
+                yield {"event": "result", **copy_result_to_dict(result)}
+            yield {"event": "done"}
+        elif command == "plan":
+            plan = await self.get_runner().plan(**args)
+            yield {"event": "done", "plan": plan_to_dict(plan)}
+        elif command == "sync":
+            report = await self.get_runner().sync(**args)
+            yield {"event": "done", "report": sync_report_to_dict(report)}
+        else:
+            raise ValueError(f"Unknown command: {command}")
+
+    def _run_bulk(
+        self, command: str, args: dict[str, Any]
+    ) -> AsyncIterator[CopyResult]:
+        runner = self.get_runner()
+        if command == "copy_many":
+            return runner.copy_many(**args)
+        if command == "copy_to_targets":
+            return runner.copy_to_targets(**args)
+        return runner.apply_plan(**{**args, "plan": plan_from_dict(args["plan"])})
@@ -55,6 +55,54 @@ class InstanceConfig(BaseConfig):
     token: str = attr.ib(validator=attr.validators.instance_of(str))
 
 
+@define(kw_only=True)
+class RemoteInstanceConfig(InstanceConfig):
+    """
+    Configuration of an instance reached over the network. Besides the connection
+    details it contains optional tuning options that can be set
+    in the instance's table of the config file.
+    """
+
+    max_workers: int = attr.ib(
+        default=10,
+        validator=[attr.validators.instance_of(int), attr.validators.ge(1)],
+    )
+    max_connections: int = attr.ib(
+        default=10,
+        validator=[attr.validators.instance_of(int), attr.validators.ge(1)],
+    )
+    user_cache_ttl: float | None = attr.ib(
+        default=None,
+        validator=attr.validators.optional(attr.validators.instance_of((int, float))),
+    )
+    rate_limit: float | None = attr.ib(
+        default=None,
+        validator=attr.validators.optional(attr.validators.instance_of((int, float))),
+    )
+    rate_limit_burst: int = attr.ib(
+        default=10,
+        validator=[attr.validators.instance_of(int), attr.validators.ge(1)],
+    )
+    max_retries: int = attr.ib(
+        default=3,
+        validator=[attr.validators.instance_of(int), attr.validators.ge(0)],
+    )
+    retry_backoff: float = attr.ib(
+        default=0.5,
+        validator=[attr.validators.instance_of((int, float)), attr.validators.ge(0)],
+    )
+    conditional_requests: bool = attr.ib(
+        default=True, validator=attr.validators.instance_of(bool)
+    )
+
+    @rate_limit.validator
+    def validate_rate_limit(
+        self, attribute: attr.Attribute, value: float | None
+    ) -> None:
+        if value is not None and value <= 0:
+            raise ValueError(f"'{attribute.name}' must be > 0: {value!r}")
+
+
 @define(kw_only=True)
 class ProjectFlatConfig(BaseConfig):
     instance: str = attr.ib(validator=attr.validators.instance_of(str))
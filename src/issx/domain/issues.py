@@ -1,10 +1,111 @@
+from datetime import datetime
+from typing import Any
+
 import attr
 
 
-@attr.s()
+@attr.s(frozen=True, slots=True)
+class Attachment:
+    filename: str = attr.ib()
+    url: str = attr.ib()
+    size: int | None = attr.ib(default=None)
+    content_type: str | None = attr.ib(default=None)
+
+
+@attr.s(frozen=True, slots=True)
+class AttachmentReference:
+    """
+    Reference to an uploaded file in a text, e.g. a link in a description
+    """
+
+    attachment: Attachment = attr.ib()
+    start: int = attr.ib()
+    end: int = attr.ib()
+    """Span of the text replaced with the link of the copied file"""
+
+
+@attr.s(frozen=True, slots=True)
+class UploadedAttachment:
+    """
+    File uploaded to a project, ready to be linked from an issue
+    """
+
+    filename: str = attr.ib()
+    url: str = attr.ib()
+    """Link of the file in descriptions of the project's issues"""
+    token: str | None = attr.ib(default=None)
+    """Token attaching the file to a created issue, if the backend needs one.
+    Files without a token can be linked from any issue of the project."""
+    content_type: str | None = attr.ib(default=None)
+
+
+@attr.s(frozen=True, slots=True)
 class Issue:
+    """
+    Issue of a project with the fields available in the payloads of both
+    backends. Fields that a backend does not provide keep their defaults,
+    e.g. Redmine issues have no labels.
+    """
+
     id: int = attr.ib()
     title: str = attr.ib()
     description: str = attr.ib()
     web_url: str = attr.ib(default=None)
     reference: str = attr.ib(default=None)
+    updated_at: datetime | None = attr.ib(default=None)
+    state: str | None = attr.ib(default=None)
+    """State of the issue as named by the backend, e.g. `opened` or `New`"""
+    labels: tuple[str, ...] = attr.ib(default=())
+    assignees: tuple[str, ...] = attr.ib(default=())
+    """Usernames of the assignees in GitLab, names of the assignee in Redmine"""
+    author: str | None = attr.ib(default=None)
+    milestone: str | None = attr.ib(default=None)
+    """Title of the milestone in GitLab, name of the target version in Redmine"""
+    created_at: datetime | None = attr.ib(default=None)
+    closed_at: datetime | None = attr.ib(default=None)
+    attachments: tuple[Attachment, ...] = attr.ib(default=())
+
+
+@attr.s(frozen=True, slots=True)
+class Note:
+    """
+    Comment of an issue, a note in GitLab or a journal with notes in Redmine
+    """
+
+    id: int = attr.ib()
+    body: str = attr.ib()
+    author: str | None = attr.ib(default=None)
+    """Username of the author in GitLab, name of the author in Redmine"""
+    created_at: datetime | None = attr.ib(default=None)
+
+
+DATETIME_FIELDS = ("updated_at", "created_at", "closed_at")
+
+
+def issue_to_dict(issue: Issue) -> dict[str, Any]:
+    """
+    Convert an issue to a dictionary that can be serialized to JSON.
+    """
+    return attr.asdict(issue, value_serializer=_serialize_value)
+
+
+def issue_from_dict(data: dict[str, Any]) -> Issue:
+    """
+    Create an issue from a dictionary returned by `issue_to_dict`.
+    """
+    data = dict(data)
+    for name in DATETIME_FIELDS:
+        if data.get(name):
+            data[name] = datetime.fromisoformat(data[name])
+    for name in ("labels", "assignees"):
+        data[name] = tuple(data.get(name, ()))
+    data["attachments"] = tuple(
+        Attachment(**attachment) for attachment in data.get("attachments", ())
+    )
+    return Issue(**data)
+
+
+def _serialize_value(instance: object, field: object, value: object) -> object:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
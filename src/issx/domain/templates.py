@@ -0,0 +1,210 @@
+import ast
+import functools
+import inspect
+import string
+import types
+import typing
+from collections.abc import Callable
+from typing import Any
+
+import attr
+
+from issx.domain.issues import Issue
+
+FILTERS: dict[str, Callable[..., Any]] = {
+    "upper": lambda value: str(value).upper(),
+    "lower": lambda value: str(value).lower(),
+    "strip": lambda value: str(value).strip(),
+    "first_line": lambda value: str(value).partition("\n")[0],
+    "truncate": lambda value, length: (
+        text if len(text := str(value)) <= length else text[: length - 1] + "…"
+    ),
+    "default": lambda value, default: default if value in (None, "") else value,
+    "join": lambda value, separator=", ": separator.join(map(str, value)),
+}
+CONVERSIONS: dict[str, Callable[[Any], str]] = {"r": repr, "s": str, "a": ascii}
+
+
+class TemplateError(ValueError):
+    """
+    Raised when a template cannot be compiled or a placeholder cannot be read
+    from an issue
+    """
+
+
+@attr.define(frozen=True)
+class _Field:
+    path: tuple[str, ...]
+    filters: tuple[tuple[Callable[..., Any], tuple[Any, ...]], ...]
+    conversion: Callable[[Any], str] | None
+    format_spec: str
+
+    def render(self, issue: Issue) -> str:
+        value: Any = issue
+        for name in self.path:
+            try:
+                value = getattr(value, name)
+            except AttributeError as e:
+                # e.g. an attribute of a date that is not set
+                raise TemplateError(
+                    f"Placeholder {{{'.'.join(self.path)}}} cannot be rendered: {e}"
+                ) from e
+        for filter_, args in self.filters:
+            value = filter_(value, *args)
+        if self.conversion is not None:
+            value = self.conversion(value)
+        return format(value, self.format_spec)
+
+
+class Template:
+    """
+    Template of an issue title or description compiled once and rendered
+    for many issues.
+
+    The syntax is the one of `str.format` with placeholders of the issue
+    attributes, e.g. `[{reference}] {title}`. Placeholders can also access
+    nested attributes, e.g. `{updated_at.year}`, and pass the value through
+    filters separated with `|`, e.g. `{description|first_line|truncate(80)}`
+    or `{labels|join(" ")}`. Arguments of filters cannot contain `:` or `!`,
+    which start the format specification and the conversion.
+    Only the attributes used by the template are read from the issues.
+    """
+
+    def __init__(self, source: str):
+        """
+        :param source: Template string
+        :raises TemplateError: If the template is invalid or uses unknown
+        attributes or filters
+        """
+        self.source = source
+        self._parts: list[str | _Field] = []
+        try:
+            parsed = list(string.Formatter().parse(source))
+        except ValueError as e:
+            raise TemplateError(f"Invalid template {source!r}: {e}") from e
+        for literal, field_name, format_spec, conversion in parsed:
+            if literal:
+                self._parts.append(literal)
+            if field_name is not None:
+                self._parts.append(
+                    self._compile_field(field_name, format_spec or "", conversion)
+                )
+
+    @property
+    def fields(self) -> frozenset[str]:
+        """
+        Names of the issue attributes used by the template
+        """
+        return frozenset(
+            part.path[0] for part in self._parts if isinstance(part, _Field)
+        )
+
+    def render(self, issue: Issue) -> str:
+        """
+        :raises TemplateError: If a nested attribute of the issue cannot be read,
+        e.g. the year of a date that is not set
+        """
+        return "".join(
+            part if isinstance(part, str) else part.render(issue)
+            for part in self._parts
+        )
+
+    def _compile_field(
+        self, field_name: str, format_spec: str, conversion: str | None
+    ) -> _Field:
+        expression, *filter_expressions = (
+            item.strip() for item in field_name.split("|")
+        )
+        path = tuple(expression.split("."))
+        issue_fields = {field.name for field in attr.fields(Issue)}
+        if path[0] not in issue_fields or not all(name.isidentifier() for name in path):
+            raise TemplateError(
+                f"Unknown placeholder {{{expression}}} in template {self.source!r}."
+                f" Available placeholders: {', '.join(sorted(issue_fields))}"
+            )
+        self._check_path(path)
+        if filter_expressions and (conversion is not None or format_spec):
+            *_, last_filter = filter_expressions
+            if "(" in last_filter and not last_filter.endswith(")"):
+                # the placeholder was split at a `:` or `!` inside the arguments
+                raise TemplateError(
+                    f"Arguments of filters cannot contain ':' or '!'"
+                    f" in template {self.source!r}"
+                )
+        if conversion is not None and conversion not in CONVERSIONS:
+            raise TemplateError(
+                f"Unknown conversion !{conversion} in template {self.source!r}"
+            )
+        if "{" in format_spec:
+            raise TemplateError(
+                f"Nested placeholders are not supported in template {self.source!r}"
+            )
+        return _Field(
+            path=path,
+            filters=tuple(self._compile_filter(item) for item in filter_expressions),
+            conversion=CONVERSIONS[conversion] if conversion else None,
+            format_spec=format_spec,
+        )
+
+    def _check_path(self, path: tuple[str, ...]) -> None:
+        """
+        Check that the nested attributes exist on the types of the issue fields
+        """
+        type_: Any = Issue
+        for depth, name in enumerate(path):
+            classes = _get_classes(type_)
+            if name.startswith("_") or not all(hasattr(cls, name) for cls in classes):
+                raise TemplateError(
+                    f"Unknown placeholder {{{'.'.join(path[: depth + 1])}}}"
+                    f" in template {self.source!r}"
+                )
+            if len(classes) != 1 or not attr.has(classes[0]):
+                # the types of attributes of other classes are not known
+                return
+            type_ = typing.get_type_hints(classes[0])[name]
+
+    def _compile_filter(
+        self, expression: str
+    ) -> tuple[Callable[..., Any], tuple[Any, ...]]:
+        name, _, args_source = expression.partition("(")
+        if name not in FILTERS:
+            raise TemplateError(
+                f"Unknown filter {name!r} in template {self.source!r}."
+                f" Available filters: {', '.join(sorted(FILTERS))}"
+            )
+        args: tuple[Any, ...] = ()
+        try:
+            if args_source:
+                if not args_source.endswith(")"):
+                    raise SyntaxError("unclosed parenthesis")
+                args = tuple(ast.literal_eval(f"({args_source[:-1]},)"))
+            inspect.signature(FILTERS[name]).bind(None, *args)
+        except (ValueError, SyntaxError, TypeError) as e:
+            raise TemplateError(
+                f"Invalid arguments of filter {name!r} in template {self.source!r}: {e}"
+            ) from e
+        return FILTERS[name], args
+
+
+def _get_classes(type_: Any) -> list[type]:
+    """
+    :return: Classes of the values of the type, without None of optional types
+    """
+    if isinstance(type_, types.UnionType) or typing.get_origin(type_) is typing.Union:
+        return [
+            cls
+            for arg in typing.get_args(type_)
+            if arg is not types.NoneType
+            for cls in _get_classes(arg)
+        ]
+    return [typing.get_origin(type_) or type_]
+
+
+@functools.lru_cache(maxsize=128)
+def compile_template(source: str) -> Template:
+    """
+    Compile a template reusing templates compiled before.
+
+    :raises TemplateError: If the template is invalid
+    """
+    return Template(source)
@@ -35,7 +35,7 @@ class GenericConfigParser:
 
     @classmethod
     def from_file(cls, config_file: Path | None = None) -> Self:
-        config_file = config_file or cls._find_config_file()
+        config_file = config_file or cls.find_config_file()
         return cls.from_dict(tomllib.loads(config_file.read_text()))
 
     @classmethod
@@ -63,7 +63,11 @@ class GenericConfigParser:
         return cls(parsed_data)
 
     @staticmethod
-    def _find_config_file() -> Path:
+    def find_config_file() -> Path:
+        """
+        Find the configuration file in the working directory
+        or in the user's config directory.
+        """
         locations = [
             Path("issx.toml"),
             Path("~/.config/issx.toml").expanduser(),
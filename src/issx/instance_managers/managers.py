@@ -1,26 +1,90 @@
+import importlib
+from types import TracebackType
+from typing import Any, Self
+
 from issx.clients.interfaces import InstanceClientInterface, IssueClientInterface
 from issx.domain import SupportedBackend
 from issx.instance_managers.config_parser import GenericConfigParser
 
 
 class InstanceManager:
+    """
+    Creates clients for the configured instances and projects.
+
+    Instance clients are created once per instance name and reused,
+    so all project clients of the same instance share its connection pool.
+    The manager should be closed when it is no longer needed, either
+    explicitly with `close` or by using it as a context manager.
+
+    Backends can be registered with import paths of their client classes,
+    e.g. `"issx.clients.gitlab:GitlabClient"`. Such backends are imported
+    only when a client of the backend is created for the first time,
+    so commands that do not talk to the backend do not pay for its import.
+    """
+
     backends: dict[
         SupportedBackend,
-        tuple[type[InstanceClientInterface], type[IssueClientInterface]],
+        tuple[
+            type[InstanceClientInterface] | str,
+            type[IssueClientInterface] | str,
+        ],
     ] = {}
 
     def __init__(self, config: GenericConfigParser):
         self.config = config
+        self._instance_clients: dict[str, InstanceClientInterface] = {}
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
 
     @classmethod
     def register_backend(
         cls,
         backend: SupportedBackend,
-        instance_client_class: type[InstanceClientInterface],
-        project_client_class: type[IssueClientInterface],
+        instance_client_class: type[InstanceClientInterface] | str,
+        project_client_class: type[IssueClientInterface] | str,
     ) -> None:
+        """
+        Register client classes of a backend.
+
+        Args:
+            backend: Backend the classes are used for
+            instance_client_class: Instance client class or its import path
+                in the `module:ClassName` format
+            project_client_class: Project client class or its import path
+                in the `module:ClassName` format
+        """
         cls.backends[backend] = (instance_client_class, project_client_class)
 
+    @classmethod
+    def get_backend(
+        cls, backend: SupportedBackend
+    ) -> tuple[type[InstanceClientInterface], type[IssueClientInterface]]:
+        """
+        Get client classes of a registered backend importing them if needed.
+
+        Returns: Instance client class and project client class
+        """
+        instance_client_class, project_client_class = cls.backends[backend]
+        classes = (
+            _import_class(instance_client_class)
+            if isinstance(instance_client_class, str)
+            else instance_client_class,
+            _import_class(project_client_class)
+            if isinstance(project_client_class, str)
+            else project_client_class,
+        )
+        cls.backends[backend] = classes
+        return classes
+
     @classmethod
     def clear_backends(cls) -> None:
         cls.backends.clear()
@@ -30,25 +94,31 @@ class InstanceManager:
         Get an instance client for a given instance name.
 
         Converts the instance config to the appropriate config class
-         and creates an instance client.
+         and creates an instance client. The client is created only once
+         per instance name, subsequent calls return the same object.
         Args:
             instance: Instance name
 
         Returns: Instance of an instance client
         """
-        instance_config = self.config.get_instance_config(instance)
-        client_class = self.backends[instance_config.backend][0]
-        instance_config = client_class.instance_config_class(
-            **instance_config.raw_config, raw_config=instance_config.raw_config
-        )
-        return client_class.instance_from_config(instance_config)
+        if instance not in self._instance_clients:
+            instance_config = self.config.get_instance_config(instance)
+            client_class = self.get_backend(instance_config.backend)[0]
+            instance_config = client_class.instance_config_class(
+                **instance_config.raw_config, raw_config=instance_config.raw_config
+            )
+            self._instance_clients[instance] = client_class.instance_from_config(
+                instance_config
+            )
+        return self._instance_clients[instance]
 
     def get_project_client(self, project: str) -> IssueClientInterface:
         """
         Get a project client for a given project name.
 
         Converts the project config to the appropriate config class
-        and creates a project client.
+        and creates a project client sharing the connection
+        of the project's instance client.
         Args:
             project: Project name
 
@@ -57,13 +127,30 @@ class InstanceManager:
         """
         project_config = self.config.get_project_config(project)
         instance_config = self.config.get_instance_config(project_config.instance)
-        instance_client_class, project_client_class = self.backends[
+        instance_client_class, project_client_class = self.get_backend(
             instance_config.backend
-        ]
+        )
         instance_config = instance_client_class.instance_config_class(
             **instance_config.raw_config, raw_config=instance_config.raw_config
         )
         project_config = project_client_class.project_config_class(
             **project_config.raw_config, raw_config=project_config.raw_config
         )
-        return project_client_class.from_config(instance_config, project_config)
+        return project_client_class.from_instance_client(
+            self.get_instance_client(project_config.instance),
+            instance_config,
+            project_config,
+        )
+
+    def close(self) -> None:
+        """
+        Close all instance clients created by the manager.
+        """
+        while self._instance_clients:
+            _, client = self._instance_clients.popitem()
+            client.close()
+
+
+def _import_class(path: str) -> Any:
+    module_name, _, class_name = path.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)
@@ -0,0 +1,290 @@
+"""
+Counters, gauges and histograms of issx exposed in the Prometheus text format.
+
+Metrics are recorded in `REGISTRY` by the services and, when enabled,
+by the clients. They can be written to a file read by the textfile collector
+of the node exporter or served over HTTP with `start_http_server`.
+"""
+
+import abc
+import math
+import os
+import tempfile
+import threading
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, ClassVar, TypeVar
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = tuple[str, ...]
+
+
+class Metric(abc.ABC):
+    """
+    Base class of metrics with a fixed set of label names
+    """
+
+    type: ClassVar[str]
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> Iterator[str]:
+        """
+        :return: Lines of the metric in the Prometheus text format
+        """
+        yield f"# HELP {self.name} {_escape(self.documentation)}"
+        yield f"# TYPE {self.name} {self.type}"
+        for name, labels, value in self.samples():
+            yield f"{name}{_format_labels(labels)} {_format_value(value)}"
+
+    @abc.abstractmethod
+    def samples(self) -> Iterator[tuple[str, dict[str, str], float]]:
+        """
+        :return: Name, labels and value of every sample of the metric
+        """
+        pass
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        pass
+
+    def _get_label_values(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} expects labels {list(self.labelnames)},"
+                f" got {list(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class _ValueMetric(Metric):
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._get_label_values(labels), 0.0)
+
+    def samples(self) -> Iterator[tuple[str, dict[str, str], float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name, dict(zip(self.labelnames, key, strict=True)), value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def _add(self, amount: float, labels: dict[str, str]) -> None:
+        key = self._get_label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Counter(_ValueMetric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only be increased")
+        self._add(amount, labels)
+
+
+class Gauge(_ValueMetric):
+    type = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        self._add(amount, labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._get_label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # counts of the buckets, the sum and the count of the observed values
+        self._values: dict[LabelValues, tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._get_label_values(labels)
+        with self._lock:
+            counts, total, count = self._values.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def get_count(self, **labels: str) -> int:
+        values = self._values.get(self._get_label_values(labels))
+        return values[2] if values is not None else 0
+
+    def samples(self) -> Iterator[tuple[str, dict[str, str], float]]:
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in self._values.items()
+            )
+        for key, (counts, total, count) in values:
+            labels = dict(zip(self.labelnames, key, strict=True))
+            for bound, bucket_count in zip(self.buckets, counts, strict=True):
+                yield (
+                    f"{self.name}_bucket",
+                    {**labels, "le": _format_value(bound)},
+                    bucket_count,
+                )
+            yield f"{self.name}_bucket", {**labels, "le": "+Inf"}, count
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+TMetric = TypeVar("TMetric", bound=Metric)
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        :return: All metrics in the Prometheus text format
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return "".join(f"{line}\n" for metric in metrics for line in metric.render())
+
+    def write_textfile(self, path: Path) -> None:
+        """
+        Write the metrics to a file read by the textfile collector.
+        The file is replaced atomically, so the collector never reads
+        a partially written file.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=path.parent, prefix=f".{path.name}.", delete=False
+        ) as f:
+            f.write(self.render())
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, path)
+
+    def clear(self) -> None:
+        """
+        Reset the values of all metrics
+        """
+        with self._lock:
+            for metric in self._metrics.values():
+                metric.clear()
+
+    def _register(self, metric: TMetric) -> TMetric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+
+REGISTRY = MetricsRegistry()
+
+
+def start_http_server(
+    port: int, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY
+) -> "ThreadingHTTPServer":
+    """
+    Serve the metrics on `/metrics` in a background thread.
+
+    :param port: Port to listen on, 0 for a random free port
+    :return: The running server, call its `shutdown` method to stop it
+    """
+    # imported here, as it is needed only by long-running processes
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            content = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    items = ",".join(
+        f'{name}="{_escape_label_value(value)}"' for name, value in labels.items()
+    )
+    return f"{{{items}}}"
+
+
+def _escape_label_value(value: str) -> str:
+    return _escape(value).replace('"', r"\"")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
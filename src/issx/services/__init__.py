@@ -0,0 +1,48 @@
+__all__ = [
+    "AttachmentTransferService",
+    "CopyIssueService",
+    "CopyPlan",
+    "CopyPlanner",
+    "CopyResult",
+    "FanOutCopyService",
+    "IssueMapping",
+    "IssueMappingStore",
+    "IssueTitleIndex",
+    "JobDoesNotExistError",
+    "JobJournal",
+    "JobStore",
+    "NoteCopyService",
+    "PlanAction",
+    "PlanConflictError",
+    "ProjectRef",
+    "SyncReport",
+    "SyncService",
+    "SyncStateStore",
+    "TargetJournal",
+    "TitleReservations",
+]
+
+from issx.services.attachments import AttachmentTransferService
+from issx.services.copying import (
+    CopyIssueService,
+    CopyResult,
+    FanOutCopyService,
+    IssueTitleIndex,
+    TitleReservations,
+)
+from issx.services.jobs import (
+    JobDoesNotExistError,
+    JobJournal,
+    JobStore,
+    TargetJournal,
+)
+from issx.services.mappings import IssueMapping, IssueMappingStore, ProjectRef
+from issx.services.notes import NoteCopyService
+from issx.services.planning import (
+    CopyPlan,
+    CopyPlanner,
+    PlanAction,
+    PlanConflictError,
+)
+from issx.services.state import SyncStateStore
+from issx.services.sync import SyncReport, SyncService
@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import tempfile
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import BinaryIO, cast
+
+from attr import Factory, define
+
+from issx.clients.exceptions import AttachmentDoesNotExistError
+from issx.clients.interfaces import IssueClientInterface
+from issx.domain.issues import Attachment, Issue, UploadedAttachment
+from issx.metrics import REGISTRY
+
+ATTACHMENTS_TRANSFERRED = REGISTRY.counter(
+    "issx_attachments_transferred_total",
+    "Number of files referenced by copied issues, by the way they were handled",
+    ["result"],
+)
+ATTACHMENT_UPLOADED_BYTES = REGISTRY.counter(
+    "issx_attachment_uploaded_bytes_total",
+    "Number of bytes of files uploaded to the target projects",
+)
+
+
+@define
+class TransferredText:
+    """
+    Text with the references to the source files replaced with the links
+    of their copies in the target project
+    """
+
+    text: str
+    uploads: list[UploadedAttachment] = Factory(list)
+    """Uploaded files to attach to the issue created with the text"""
+    missing: list[Attachment] = Factory(list)
+    """Referenced files that do not exist, their references are kept"""
+
+
+class ByteBudget:
+    """
+    Limits the total size of files transferred at the same time.
+    A file larger than the whole budget waits until it is the only one.
+    """
+
+    def __init__(self, max_bytes: int):
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be a positive number")
+        self.max_bytes = max_bytes
+        self._available = max_bytes
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def reserve(self, size: int) -> AsyncIterator[None]:
+        size = min(size, self.max_bytes)
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._available >= size)
+            self._available -= size
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._available += size
+                self._condition.notify_all()
+
+
+class AttachmentTransferService:
+    """
+    Copies files referenced by texts of source issues to the target project
+    and rewrites the references to the copies.
+
+    Files are streamed from the source to a temporary file, which stays
+    in memory only while it is small, and uploaded from it. Files with the same
+    content are uploaded only once, as long as the target can link an upload
+    from any issue, which is the case of GitLab. Redmine attaches every upload
+    to a single issue, so there the files are deduplicated only within a text.
+    """
+
+    def __init__(
+        self,
+        source_client: IssueClientInterface,
+        target_client: IssueClientInterface,
+        max_concurrency: int = 4,
+        max_bytes_in_flight: int = 32 * 1024 * 1024,
+        chunk_size: int = 64 * 1024,
+        spool_size: int = 1024 * 1024,
+    ):
+        """
+        :param source_client: Client of the project the texts come from
+        :param target_client: Client of the project to upload the files to
+        :param max_concurrency: Maximum number of files downloaded at the same time
+        :param max_bytes_in_flight: Maximum total size of files uploaded
+        at the same time
+        :param chunk_size: Number of bytes read from a download at a time
+        :param spool_size: Files larger than this are buffered on the disk
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be a positive number")
+        self.source_client = source_client
+        self.target_client = target_client
+        self.chunk_size = chunk_size
+        self.spool_size = spool_size
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._budget = ByteBudget(max_bytes_in_flight)
+        # uploads linkable from any issue by the hash of their content
+        self._uploads: dict[str, UploadedAttachment] = {}
+        self._upload_locks: dict[str, asyncio.Lock] = {}
+
+    async def transfer(self, issue: Issue, text: str) -> TransferredText:
+        """
+        :param issue: The source issue the text was rendered from
+        :param text: The text, e.g. a rendered description
+        :return: The rewritten text and the files to attach to the issue
+        created with it
+        """
+        references = await self.source_client.find_attachments(issue, text)
+        if not references:
+            return TransferredText(text)
+        attachments = list(dict.fromkeys(ref.attachment for ref in references))
+        uploads = await asyncio.gather(*map(self._transfer_file, attachments))
+        uploaded = dict(zip(attachments, uploads, strict=True))
+        parts: list[str] = []
+        position = 0
+        for reference in references:
+            if (upload := uploaded[reference.attachment]) is not None:
+                parts.extend((text[position : reference.start], upload.url))
+                position = reference.end
+        parts.append(text[position:])
+        return TransferredText(
+            "".join(parts),
+            uploads=list(
+                dict.fromkeys(upload for upload in uploads if upload is not None)
+            ),
+            missing=[
+                attachment for attachment, upload in uploaded.items() if upload is None
+            ],
+        )
+
+    async def _transfer_file(self, attachment: Attachment) -> UploadedAttachment | None:
+        with tempfile.SpooledTemporaryFile(max_size=self.spool_size) as spooled:
+            file = cast(BinaryIO, spooled)
+            async with self._semaphore:
+                try:
+                    await self.source_client.download_attachment(
+                        attachment, file, self.chunk_size
+                    )
+                except AttachmentDoesNotExistError:
+                    ATTACHMENTS_TRANSFERRED.inc(result="missing")
+                    return None
+            size = file.tell()
+            file.seek(0)
+            digest = await asyncio.to_thread(self._hash_file, file)
+            async with self._upload_locks.setdefault(digest, asyncio.Lock()):
+                if (upload := self._uploads.get(digest)) is not None:
+                    ATTACHMENTS_TRANSFERRED.inc(result="deduplicated")
+                    return upload
+                file.seek(0)
+                async with self._budget.reserve(size):
+                    upload = await self.target_client.upload_attachment(
+                        attachment.filename, file, attachment.content_type
+                    )
+                ATTACHMENTS_TRANSFERRED.inc(result="uploaded")
+                ATTACHMENT_UPLOADED_BYTES.inc(size)
+                if upload.token is None:
+                    self._uploads[digest] = upload
+                return upload
+
+    def _hash_file(self, file: BinaryIO) -> str:
+        digest = hashlib.sha256()
+        while chunk := file.read(self.chunk_size):
+            digest.update(chunk)
+        return digest.hexdigest()
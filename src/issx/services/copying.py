@@ -0,0 +1,665 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator, Iterable, Iterator, Mapping
+from contextlib import (
+    AbstractAsyncContextManager,
+    asynccontextmanager,
+    contextmanager,
+    nullcontext,
+)
+
+from attr import define
+
+from issx.clients.exceptions import IssueDoesNotExistError
+from issx.clients.interfaces import IssueClientInterface
+from issx.domain.issues import Issue, UploadedAttachment
+from issx.domain.templates import compile_template
+from issx.metrics import REGISTRY
+from issx.services.attachments import AttachmentTransferService
+from issx.services.jobs import TargetJournal
+from issx.services.mappings import IssueMapping
+from issx.services.notes import NoteCopyService
+from issx.services.planning import CopyPlan, PlanAction, PlanConflictError, PlanEntry
+
+ISSUES_COPIED = REGISTRY.counter(
+    "issx_issues_copied_total", "Number of issues created in the target projects"
+)
+DUPLICATES_SKIPPED = REGISTRY.counter(
+    "issx_duplicates_skipped_total",
+    "Number of copied issues found in the target projects instead of being"
+    " created, by the way they were found",
+    ["found_by"],
+)
+COPY_FAILURES = REGISTRY.counter(
+    "issx_copy_failures_total", "Number of issues that failed to be copied"
+)
+COPY_DURATION = REGISTRY.histogram(
+    "issx_copy_duration_seconds", "Duration of copying a single issue"
+)
+
+
+@define
+class CopyResult:
+    """
+    Outcome of copying a single issue as a part of a bulk copy.
+    Exactly one of `issue` and `error` is set.
+    """
+
+    issue_id: int
+    issue: Issue | None = None
+    error: Exception | None = None
+    target: str | None = None
+    """Name of the target project, set by copies to multiple targets"""
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class TitleReservations:
+    """
+    Reservations of the titles of issues being looked up and created,
+    so concurrent copies with the same title wait for each other instead
+    of creating the issue twice.
+    """
+
+    def __init__(self) -> None:
+        # locks of the reserved titles with the numbers of their holders
+        self._reservations: dict[str, tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def reserve(self, title: str) -> AsyncIterator[None]:
+        """
+        Reserve a title while an issue with it is looked up and created.
+        Other reservations of the title wait until the block exits.
+        """
+        lock, holders = self._reservations.get(title, (asyncio.Lock(), 0))
+        self._reservations[title] = (lock, holders + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, holders = self._reservations[title]
+            if holders == 1:
+                del self._reservations[title]
+            else:
+                self._reservations[title] = (lock, holders - 1)
+
+
+class IssueTitleIndex:
+    """
+    In-memory index of the issues of a project by their exact title.
+
+    The index is built lazily on the first lookup by listing all issues
+    of the project once. Afterwards, lookups do not make any requests.
+    Issues created through the owner of the index should be added with `add`
+    to keep the index up to date.
+    """
+
+    def __init__(self, client: IssueClientInterface, page_size: int = 100):
+        self.client = client
+        self.page_size = page_size
+        self._issues: dict[str, Issue] | None = None
+        self._lock = asyncio.Lock()
+        self._reservations = TitleReservations()
+
+    async def find(self, title: str) -> Issue | None:
+        """
+        :param title: The exact title of the issue
+        :return: The first issue of the project with the given title or None
+        """
+        issues = await self._get_issues()
+        return issues.get(title)
+
+    def add(self, issue: Issue) -> None:
+        """
+        Add a newly created issue to the index. It has no effect
+        if the index is not built yet, as the issue will be listed while building it.
+        """
+        if self._issues is not None:
+            self._issues.setdefault(issue.title, issue)
+
+    def reserve(self, title: str) -> AbstractAsyncContextManager[None]:
+        """
+        Reserve a title while an issue with it is looked up and created.
+        Other reservations of the title wait until the block exits, so they find
+        the issue added with `add` instead of creating another one.
+        """
+        return self._reservations.reserve(title)
+
+    async def _get_issues(self) -> dict[str, Issue]:
+        async with self._lock:
+            if self._issues is None:
+                issues: dict[str, Issue] = {}
+                async for issue in self.client.iter_issues(page_size=self.page_size):
+                    issues.setdefault(issue.title, issue)
+                self._issues = issues
+        return self._issues
+
+
+class CopyIssueService:
+    def __init__(
+        self,
+        source_client: IssueClientInterface,
+        target_client: IssueClientInterface,
+        title_index: IssueTitleIndex | None = None,
+        mapping: IssueMapping | None = None,
+        attachments: AttachmentTransferService | None = None,
+        notes: NoteCopyService | None = None,
+        journal: TargetJournal | None = None,
+    ):
+        """
+        :param source_client: Client of the project to copy issues from
+        :param target_client: Client of the project to copy issues to
+        :param title_index: Index of the target project's issues used to find
+        duplicates. If not provided, duplicates are searched with `find_issues`
+        of the target client, except for bulk copies which build the index.
+        :param mapping: Mapping of already copied issues. If provided, issues
+        copied before are found by their source id before searching by title
+        and every copied issue is recorded in it.
+        :param attachments: If provided, files referenced by the rendered
+        descriptions are copied to the target project and the references
+        are rewritten to the copies
+        :param notes: If provided, comments of the source issues are copied
+        to their copies, including the ones found as duplicates, so comments
+        added since the previous copy are copied as well
+        :param journal: Journal of the bulk copy job the service runs. Creations
+        are recorded in it before they are made and copies once their comments
+        are copied. Bulk copies skip the issues it records as copied and look up
+        creations interrupted by a previous run by their titles before repeating
+        them.
+        """
+        self.source_client = source_client
+        self.target_client = target_client
+        self.title_index = title_index
+        self.mapping = mapping
+        self.attachments = attachments
+        self.notes = notes
+        self.journal = journal
+
+    async def copy(
+        self,
+        issue_id: int,
+        title_format: str = "{title}",
+        description_format: str = "{description}",
+        allow_duplicates: bool = False,
+        assign_to_me: bool = False,
+    ) -> Issue:
+        """
+        Copy an issue from the source client to the target client optionally
+        applying a title and description format. If `allow_duplicates` is `False`,
+        the method will return a first issue found with the same title.
+
+        :param issue_id: The ID of the issue to copy
+        :param title_format: The format for the new issue title
+        :param description_format: The format for the new issue description
+        :param allow_duplicates: Whether to allow duplicate issues
+        :param assign_to_me: Whether to assign the new issue to the current user
+        :return: Newly created or existing issue in the target client
+        :raises TemplateError: If any of the formats is invalid
+        """
+        # invalid templates fail before any request is made
+        compile_template(title_format)
+        compile_template(description_format)
+        with _record_copy():
+            if not allow_duplicates and (copied := await self._find_copied(issue_id)):
+                return await self._copy_notes(issue_id, copied)
+            source_issue = await self.source_client.get_issue(issue_id)
+            return await self.copy_issue(
+                source_issue,
+                title_format,
+                description_format,
+                allow_duplicates=allow_duplicates,
+                assign_to_me=assign_to_me,
+            )
+
+    async def copy_issue(
+        self,
+        source_issue: Issue,
+        title_format: str = "{title}",
+        description_format: str = "{description}",
+        allow_duplicates: bool = False,
+        assign_to_me: bool = False,
+        title_index: IssueTitleIndex | None = None,
+    ) -> Issue:
+        """
+        Copy an already fetched source issue to the target client.
+        Accepts the same options as `copy`. Concurrent copies with the same
+        title wait for each other when duplicates are found with a title index,
+        so only one of them creates the issue.
+
+        :param source_issue: The issue to copy
+        :param title_index: Index to find duplicates with instead of the index
+        of the service, e.g. the one built for a bulk copy
+        :return: Newly created or existing issue in the target client
+        """
+        title_index = title_index or self.title_index
+        target_title = self.prepare_string(source_issue, title_format)
+        async with (
+            title_index.reserve(target_title)
+            if title_index is not None and not allow_duplicates
+            else nullcontext()
+        ):
+            counterpart = await self._recover(source_issue.id, title_index)
+            if counterpart is None and not allow_duplicates:
+                counterpart = await self._find_copied(source_issue.id)
+            if counterpart is None and not allow_duplicates:
+                counterpart = await self._find_duplicate(target_title, title_index)
+            if counterpart is not None:
+                self._record_counterpart(source_issue.id, counterpart)
+            else:
+                counterpart = await self._create_copy(
+                    source_issue,
+                    target_title,
+                    description_format,
+                    assign_to_me,
+                    title_index,
+                )
+        return await self._finish_copy(source_issue.id, counterpart)
+
+    async def _create_copy(
+        self,
+        source_issue: Issue,
+        target_title: str,
+        description_format: str,
+        assign_to_me: bool,
+        title_index: IssueTitleIndex | None,
+    ) -> Issue:
+        description = self.prepare_string(source_issue, description_format)
+        uploads: list[UploadedAttachment] = []
+        if self.attachments is not None:
+            transferred = await self.attachments.transfer(source_issue, description)
+            description, uploads = transferred.text, transferred.uploads
+        if self.journal is not None:
+            await self.journal.start(source_issue.id, target_title)
+        new_issue = await self.target_client.create_issue(
+            title=target_title,
+            description=description,
+            assign_to_me=assign_to_me,
+            attachments=uploads,
+        )
+        ISSUES_COPIED.inc()
+        self._record_counterpart(source_issue.id, new_issue)
+        if title_index is not None:
+            title_index.add(new_issue)
+        return new_issue
+
+    async def copy_many(
+        self,
+        issue_ids: Iterable[int],
+        title_format: str = "{title}",
+        description_format: str = "{description}",
+        allow_duplicates: bool = False,
+        assign_to_me: bool = False,
+        max_concurrency: int = 10,
+        source_issues: Mapping[int, Issue] | None = None,
+    ) -> AsyncIterator[CopyResult]:
+        """
+        Copy multiple issues concurrently. Results are yielded as soon as
+        the particular copy finishes, so their order may differ from `issue_ids`.
+        A failing copy does not stop the others, its error is reported
+        in the yielded result instead. Repeated ids are copied only once.
+        Duplicates are found with a title index of the target project,
+        so no search requests are made for particular issues. Source issues
+        are fetched upfront with `get_issues`, in batches if the client supports it.
+        Issues recorded as copied in the journal are reported with their copies
+        without making any requests, except for copying their new comments.
+
+        :param issue_ids: The IDs of the issues to copy
+        :param title_format: The format for the new issue titles
+        :param description_format: The format for the new issue descriptions
+        :param allow_duplicates: Whether to allow duplicate issues
+        :param assign_to_me: Whether to assign the new issues to the current user
+        :param max_concurrency: Maximum number of copies in flight at the same time
+        :param source_issues: Source issues fetched beforehand by their ids,
+        e.g. when they are copied to multiple targets. Ids missing in it
+        are reported as not existing.
+        :return: Async iterator of copy results
+        :raises TemplateError: If any of the formats is invalid
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be a positive number")
+        compile_template(title_format)
+        compile_template(description_format)
+        title_index = self.title_index
+        if not allow_duplicates and title_index is None:
+            title_index = IssueTitleIndex(self.target_client)
+        issue_ids = list(dict.fromkeys(issue_ids))
+        if source_issues is None:
+            try:
+                source_issues = await self.source_client.get_issues(
+                    self.get_pending(issue_ids)
+                )
+            except Exception as e:
+                for result in self.report_failure(issue_ids, e):
+                    yield result
+                return
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def copy_one(issue_id: int) -> CopyResult:
+            async with semaphore:
+                try:
+                    issue = await self._copy_fetched(
+                        issue_id,
+                        source_issues.get(issue_id),
+                        title_format,
+                        description_format,
+                        allow_duplicates=allow_duplicates,
+                        assign_to_me=assign_to_me,
+                        title_index=title_index,
+                    )
+                except Exception as e:
+                    return CopyResult(issue_id, error=e)
+                return CopyResult(issue_id, issue=issue)
+
+        tasks = [asyncio.ensure_future(copy_one(issue_id)) for issue_id in issue_ids]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def apply_plan(
+        self, plan: CopyPlan, max_concurrency: int = 10
+    ) -> AsyncIterator[CopyResult]:
+        """
+        Execute a plan made by `CopyPlanner` without fetching the source issues
+        or searching the target project again. Issues are created with the titles
+        and descriptions rendered in the plan and the counterparts of the skipped
+        issues are returned as they were when planning. Conflicts are reported
+        as failed copies with `PlanConflictError`. Results are yielded
+        as in `copy_many`.
+
+        Issues already copied according to the mapping, e.g. when the plan
+        is applied again, are not created again.
+
+        :param plan: The plan to execute
+        :param max_concurrency: Maximum number of copies in flight at the same time
+        :return: Async iterator of copy results
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be a positive number")
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def apply_one(entry: PlanEntry) -> CopyResult:
+            async with semaphore:
+                try:
+                    with _record_copy():
+                        issue = await self._apply_entry(entry, plan.assign_to_me)
+                except Exception as e:
+                    return CopyResult(entry.issue_id, error=e)
+                return CopyResult(entry.issue_id, issue=issue)
+
+        tasks = [asyncio.ensure_future(apply_one(entry)) for entry in plan.entries]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _apply_entry(self, entry: PlanEntry, assign_to_me: bool) -> Issue:
+        if entry.action == PlanAction.conflict:
+            raise PlanConflictError(entry.reason)
+        if entry.action == PlanAction.skip and entry.target is not None:
+            DUPLICATES_SKIPPED.inc(found_by=entry.found_by or "title")
+            if self.mapping is not None:
+                self.mapping.add(entry.issue_id, entry.target.id)
+            return entry.target
+        if copied := await self._find_copied(entry.issue_id):
+            return copied
+        new_issue = await self.target_client.create_issue(
+            title=entry.title or "",
+            description=entry.description or "",
+            assign_to_me=assign_to_me,
+        )
+        ISSUES_COPIED.inc()
+        if self.mapping is not None:
+            self.mapping.add(entry.issue_id, new_issue.id)
+        return await self._copy_notes(entry.issue_id, new_issue)
+
+    async def _copy_fetched(
+        self,
+        issue_id: int,
+        source_issue: Issue | None,
+        title_format: str,
+        description_format: str,
+        allow_duplicates: bool,
+        assign_to_me: bool,
+        title_index: IssueTitleIndex | None,
+    ) -> Issue:
+        """
+        Copy a source issue fetched upfront, `source_issue` is None
+        if it has not been found
+        """
+        if copied := self.get_journaled(issue_id):
+            # comments added since the previous run are copied as well
+            return await self._copy_notes(issue_id, copied)
+        with _record_copy():
+            if source_issue is not None:
+                return await self.copy_issue(
+                    source_issue,
+                    title_format,
+                    description_format,
+                    allow_duplicates=allow_duplicates,
+                    assign_to_me=assign_to_me,
+                    title_index=title_index,
+                )
+            # the source issue may have been removed after being copied
+            if not allow_duplicates and (copied := await self._find_copied(issue_id)):
+                return copied
+            raise IssueDoesNotExistError(issue_id)
+
+    def get_journaled(self, issue_id: int) -> Issue | None:
+        """
+        :return: The copy of the issue recorded in the journal or None
+        """
+        return self.journal.get_copied(issue_id) if self.journal is not None else None
+
+    def get_pending(self, issue_ids: Iterable[int]) -> list[int]:
+        """
+        :return: IDs of the issues not recorded as copied in the journal
+        """
+        return [issue_id for issue_id in issue_ids if not self.get_journaled(issue_id)]
+
+    def report_failure(
+        self, issue_ids: Iterable[int], error: Exception
+    ) -> Iterator[CopyResult]:
+        """
+        Report copies failed before they started, e.g. when the source issues
+        cannot be fetched. Issues recorded as copied in the journal are reported
+        with their copies instead.
+        """
+        for issue_id in issue_ids:
+            if copied := self.get_journaled(issue_id):
+                yield CopyResult(issue_id, issue=copied)
+            else:
+                COPY_FAILURES.inc()
+                yield CopyResult(issue_id, error=error)
+
+    def _record_counterpart(self, source_id: int, target_issue: Issue) -> None:
+        if self.mapping is not None:
+            self.mapping.add(source_id, target_issue.id)
+
+    async def _finish_copy(self, source_id: int, target_issue: Issue) -> Issue:
+        """
+        Copy the comments and only then journal the copy, so an interrupted
+        copy of the comments is repeated when the job is resumed
+        """
+        await self._copy_notes(source_id, target_issue)
+        if self.journal is not None:
+            await self.journal.complete(source_id, target_issue)
+        return target_issue
+
+    async def _recover(
+        self, source_id: int, title_index: IssueTitleIndex | None
+    ) -> Issue | None:
+        """
+        Find the copy of an issue whose creation was started by an interrupted
+        run of the job, so it is not created twice. The request may or may not
+        have reached the target project, so its issues are searched by the title
+        of the copy. With `allow_duplicates`, an issue that had the same title
+        before the job started is taken for the copy as well.
+        """
+        if self.journal is None or (
+            (title := self.journal.get_in_flight(source_id)) is None
+        ):
+            return None
+        return await self._find_duplicate(title, title_index)
+
+    async def _copy_notes(self, source_id: int, target_issue: Issue) -> Issue:
+        if self.notes is not None:
+            await self.notes.copy(source_id, target_issue.id)
+        return target_issue
+
+    async def _find_copied(self, source_id: int) -> Issue | None:
+        if (
+            self.mapping is None
+            or (target_id := self.mapping.get_target_id(source_id)) is None
+        ):
+            return None
+        try:
+            issue = await self.target_client.get_issue(target_id)
+        except IssueDoesNotExistError:
+            # the counterpart was removed from the target project
+            self.mapping.remove(source_id)
+            return None
+        DUPLICATES_SKIPPED.inc(found_by="mapping")
+        return issue
+
+    async def _find_duplicate(
+        self, title: str, title_index: IssueTitleIndex | None
+    ) -> Issue | None:
+        if title_index is not None:
+            duplicate = await title_index.find(title)
+        else:
+            issues = await self.target_client.find_issues(title)
+            duplicate = issues[0] if issues else None
+        if duplicate is not None:
+            DUPLICATES_SKIPPED.inc(found_by="title")
+        return duplicate
+
+    @staticmethod
+    def prepare_string(issue: Issue, template: str) -> str:
+        """
+        :param issue: Issue object from which to create the new string
+        :param template: Template of the new string, see `Template`
+        for the syntax. It is compiled only once and reused for other issues.
+        :return: Rendered template
+        """
+        return compile_template(template).render(issue)
+
+
+class FanOutCopyService:
+    """
+    Copies issues of a source project to multiple target projects.
+
+    Every source issue is fetched once and copied to all targets concurrently.
+    Each target has its own `CopyIssueService` and concurrency limit,
+    so a slow or failing target does not hold back the copies to the others.
+    """
+
+    def __init__(
+        self,
+        source_client: IssueClientInterface,
+        targets: Mapping[str, CopyIssueService],
+    ):
+        """
+        :param source_client: Client of the project to copy issues from
+        :param targets: Services copying to the target projects by the names
+        of the targets. Their source clients are not used.
+        """
+        self.source_client = source_client
+        self.targets = targets
+
+    async def copy_many(
+        self,
+        issue_ids: Iterable[int],
+        title_format: str = "{title}",
+        description_format: str = "{description}",
+        allow_duplicates: bool = False,
+        assign_to_me: bool = False,
+        max_concurrency: int = 10,
+        title_formats: Mapping[str, str] | None = None,
+    ) -> AsyncIterator[CopyResult]:
+        """
+        Copy multiple issues to all targets. Results are yielded as soon as
+        the particular copy finishes and their `target` is set to the name
+        of the target. See `CopyIssueService.copy_many` for the other details.
+
+        :param max_concurrency: Maximum number of copies in flight to a single target
+        :param title_formats: Title formats of particular targets by their names
+        overriding `title_format`
+        :return: Async iterator of copy results of every issue and target
+        :raises TemplateError: If any of the formats is invalid
+        """
+        title_formats = {
+            name: (title_formats or {}).get(name, title_format) for name in self.targets
+        }
+        for template in (*title_formats.values(), description_format):
+            compile_template(template)
+        issue_ids = list(dict.fromkeys(issue_ids))
+        # issues copied to all targets by a previous run of the job are not fetched
+        pending_ids = {
+            issue_id
+            for service in self.targets.values()
+            for issue_id in service.get_pending(issue_ids)
+        }
+        try:
+            source_issues = await self.source_client.get_issues(
+                [issue_id for issue_id in issue_ids if issue_id in pending_ids]
+            )
+        except Exception as e:
+            for name, service in self.targets.items():
+                for failed in service.report_failure(issue_ids, e):
+                    failed.target = name
+                    yield failed
+            return
+        # None marks that all copies to a target have finished
+        results: asyncio.Queue[CopyResult | None] = asyncio.Queue()
+
+        async def copy_to(name: str, service: CopyIssueService) -> None:
+            try:
+                async for result in service.copy_many(
+                    issue_ids,
+                    title_formats[name],
+                    description_format,
+                    allow_duplicates=allow_duplicates,
+                    assign_to_me=assign_to_me,
+                    max_concurrency=max_concurrency,
+                    source_issues=source_issues,
+                ):
+                    result.target = name
+                    results.put_nowait(result)
+            finally:
+                results.put_nowait(None)
+
+        tasks = [
+            asyncio.ensure_future(copy_to(name, service))
+            for name, service in self.targets.items()
+        ]
+        try:
+            running = len(tasks)
+            while running:
+                if (result := await results.get()) is None:
+                    running -= 1
+                else:
+                    yield result
+            # errors of the services are not reported in the results
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+@contextmanager
+def _record_copy() -> Iterator[None]:
+    started_at = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        COPY_FAILURES.inc()
+        raise
+    finally:
+        COPY_DURATION.observe(time.perf_counter() - started_at)
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import os
+import re
+import secrets
+from datetime import UTC, datetime
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+from attr import define
+
+from issx.domain.issues import Issue, issue_from_dict, issue_to_dict
+from issx.storage import get_data_dir
+
+JOURNAL_VERSION = 1
+JOB_ID_PATTERN = re.compile(r"[\w.-]+")
+
+
+class JobDoesNotExistError(LookupError):
+    def __init__(self, job_id: str):
+        super().__init__(f"Job {job_id} does not exist")
+        self.job_id = job_id
+
+
+class JobStore:
+    """
+    Directory of the journals of bulk copy jobs, one file per job.
+    """
+
+    def __init__(self, directory: Path | None = None):
+        """
+        :param directory: Directory of the journals. Defaults to `jobs`
+        in the issx data directory.
+        """
+        self.directory = directory or get_data_dir() / "jobs"
+
+    @staticmethod
+    def new_job_id() -> str:
+        """
+        :return: Unique ID of a new job, starting with its creation time
+        """
+        return f"{datetime.now():%Y%m%d-%H%M%S}-{secrets.token_hex(2)}"
+
+    def open(self, job_id: str, header: dict[str, Any] | None = None) -> "JobJournal":
+        """
+        Open the journal of a job, creating it if the job is new.
+
+        :param job_id: ID of the job
+        :param header: Description of the job, i.e. its projects, issue ids
+        and options. A new job is created with it, an existing one
+        has to have the same.
+        :return: The journal with the records of the previous runs loaded
+        :raises JobDoesNotExistError: If the job does not exist
+        and no header is provided
+        :raises ValueError: If the job was started with a different header
+        """
+        path = self._get_path(job_id)
+        if header is not None and not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            record = {
+                "event": "planned",
+                "version": JOURNAL_VERSION,
+                "created_at": datetime.now(UTC).isoformat(),
+                "job": header,
+            }
+            with path.open("x", encoding="utf-8") as file:
+                file.write(json.dumps(record) + "\n")
+        elif not path.exists():
+            raise JobDoesNotExistError(job_id)
+        journal = JobJournal(path)
+        if header is not None and journal.header != header:
+            journal.close()
+            raise ValueError(f"Job {job_id} was started with different options")
+        return journal
+
+    def read_header(self, job_id: str) -> dict[str, Any]:
+        """
+        :return: Description of the job it was created with
+        :raises JobDoesNotExistError: If the job does not exist
+        """
+        try:
+            with self._get_path(job_id).open(encoding="utf-8") as file:
+                return _read_planned(json.loads(file.readline()))
+        except FileNotFoundError:
+            raise JobDoesNotExistError(job_id) from None
+
+    def _get_path(self, job_id: str) -> Path:
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            raise ValueError(f"Invalid job ID: {job_id!r}")
+        return self.directory / f"{job_id}.jsonl"
+
+
+class JobJournal:
+    """
+    Append-only journal of a bulk copy job with a JSON record per line.
+
+    The first record describes the planned job. Then, the creation
+    of every copy is recorded as `started` with the title of the copy before
+    the request is sent, and as `copied` with the copy once it is known,
+    including the copies found in the target project instead of being created.
+    Every record is flushed to the disk before the job continues, so after
+    a crash the journal tells which issues have been copied and which
+    creations may or may not have reached the target project.
+
+    The records are loaded into dictionaries when the journal is opened,
+    so resuming the job checks the progress of an issue without any requests.
+    """
+
+    def __init__(self, path: Path):
+        """
+        :param path: Path to the journal file created by `JobStore`
+        """
+        self.path = path
+        self.header: dict[str, Any] = {}
+        self._copied: dict[tuple[str, int], Issue] = {}
+        self._in_flight: dict[tuple[str, int], str] = {}
+        self._load()
+        self._file = path.open("a", encoding="utf-8")
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def for_target(self, target: str) -> "TargetJournal":
+        """
+        :param target: Name of a target project of the job
+        :return: View of the journal limited to the copies to the target
+        """
+        return TargetJournal(self, target)
+
+    def get_copied(self, target: str, issue_id: int) -> Issue | None:
+        """
+        :return: The copy of the issue in the target project or None
+        if it has not been copied by the job
+        """
+        return self._copied.get((target, issue_id))
+
+    def get_in_flight(self, target: str, issue_id: int) -> str | None:
+        """
+        :return: The title of the copy whose creation has been started
+        but not recorded as finished or None
+        """
+        return self._in_flight.get((target, issue_id))
+
+    async def start(self, target: str, issue_id: int, title: str) -> None:
+        """
+        Record that the copy of the issue is about to be created.
+        It returns once the record is on the disk.
+        """
+        self._in_flight[target, issue_id] = title
+        await self._append(
+            {"event": "started", "target": target, "issue_id": issue_id, "title": title}
+        )
+
+    async def complete(self, target: str, issue_id: int, issue: Issue) -> None:
+        """
+        Record the copy of the issue, either created or found.
+        It returns once the record is on the disk.
+        """
+        self._in_flight.pop((target, issue_id), None)
+        self._copied[target, issue_id] = issue
+        await self._append(
+            {
+                "event": "copied",
+                "target": target,
+                "issue_id": issue_id,
+                "issue": issue_to_dict(issue),
+            }
+        )
+
+    def close(self) -> None:
+        self._file.close()
+
+    async def _append(self, record: dict[str, Any]) -> None:
+        # records are written whole on the event loop, so they do not interleave,
+        # and only waiting for the disk is left to a thread
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        await asyncio.to_thread(os.fsync, self._file.fileno())
+
+    def _load(self) -> None:
+        with self.path.open("rb") as file:
+            lines = file.readlines()
+        valid_size = 0
+        for number, line in enumerate(lines):
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("Incomplete record")
+                record = json.loads(line)
+            except ValueError:
+                if number < len(lines) - 1:
+                    raise ValueError(f"{self.path}:{number + 1} is corrupted") from None
+                # the last record was being written when the job was interrupted
+                with self.path.open("r+b") as file:
+                    file.truncate(valid_size)
+                break
+            valid_size += len(line)
+            if number == 0:
+                self.header = _read_planned(record)
+            else:
+                self._replay(record)
+
+    def _replay(self, record: dict[str, Any]) -> None:
+        key = (record["target"], record["issue_id"])
+        if record["event"] == "started":
+            self._in_flight[key] = record["title"]
+        elif record["event"] == "copied":
+            self._in_flight.pop(key, None)
+            self._copied[key] = issue_from_dict(record["issue"])
+
+
+@define
+class TargetJournal:
+    """
+    Records of a job journal about the copies to a single target project
+    """
+
+    journal: JobJournal
+    target: str
+
+    def get_copied(self, issue_id: int) -> Issue | None:
+        return self.journal.get_copied(self.target, issue_id)
+
+    def get_in_flight(self, issue_id: int) -> str | None:
+        return self.journal.get_in_flight(self.target, issue_id)
+
+    async def start(self, issue_id: int, title: str) -> None:
+        await self.journal.start(self.target, issue_id, title)
+
+    async def complete(self, issue_id: int, issue: Issue) -> None:
+        await self.journal.complete(self.target, issue_id, issue)
+
+
+def _read_planned(record: dict[str, Any]) -> dict[str, Any]:
+    if record.get("event") != "planned" or record.get("version") != JOURNAL_VERSION:
+        raise ValueError("Unsupported job journal")
+    header: dict[str, Any] = record["job"]
+    return header
@@ -0,0 +1,159 @@
+import json
+from collections.abc import Iterable
+from pathlib import Path
+from typing import TextIO
+
+from attr import define
+
+from issx.storage import connect, get_data_dir
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issue_mappings (
+    source_instance TEXT NOT NULL,
+    source_project TEXT NOT NULL,
+    source_id INTEGER NOT NULL,
+    target_instance TEXT NOT NULL,
+    target_project TEXT NOT NULL,
+    target_id INTEGER NOT NULL,
+    PRIMARY KEY (
+        source_instance, source_project, source_id, target_instance, target_project
+    )
+);
+"""
+KEY_CONDITION = (
+    "source_instance = ? AND source_project = ? AND source_id = ?"
+    " AND target_instance = ? AND target_project = ?"
+)
+
+
+@define(frozen=True)
+class ProjectRef:
+    """
+    Identifies a project independently of its name in the config file
+    """
+
+    instance: str
+    project: str
+
+    def __str__(self) -> str:
+        return f"{self.instance}/{self.project}"
+
+
+class IssueMappingStore:
+    """
+    On-disk store of issues copied between projects.
+
+    Every entry maps a source issue to its counterpart in a target project,
+    so the counterpart can be found without searching the target project.
+    """
+
+    def __init__(self, path: Path | None = None):
+        """
+        :param path: Path to the database file. Defaults to `mappings.sqlite3`
+        in the issx data directory.
+        """
+        self.path = path or get_data_dir() / "mappings.sqlite3"
+        self._connection = connect(self.path, SCHEMA, SCHEMA_VERSION, disposable=False)
+
+    def get(self, source: ProjectRef, source_id: int, target: ProjectRef) -> int | None:
+        """
+        :return: ID of the counterpart of the source issue in the target project
+        or None if the issue was not copied there
+        """
+        row = self._connection.execute(
+            f"SELECT target_id FROM issue_mappings WHERE {KEY_CONDITION}",
+            _key(source, source_id, target),
+        ).fetchone()
+        return row["target_id"] if row else None
+
+    def add(
+        self, source: ProjectRef, source_id: int, target: ProjectRef, target_id: int
+    ) -> None:
+        """
+        Record the counterpart of the source issue replacing the previous one.
+        """
+        self.add_many([(source, source_id, target, target_id)])
+
+    def add_many(
+        self, mappings: Iterable[tuple[ProjectRef, int, ProjectRef, int]]
+    ) -> int:
+        """
+        Record multiple counterparts at once.
+
+        :return: Number of recorded mappings
+        """
+        with self._connection:
+            cursor = self._connection.executemany(
+                "INSERT OR REPLACE INTO issue_mappings VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (*_key(source, source_id, target), target_id)
+                    for source, source_id, target, target_id in mappings
+                ),
+            )
+        return cursor.rowcount
+
+    def remove(self, source: ProjectRef, source_id: int, target: ProjectRef) -> None:
+        with self._connection:
+            self._connection.execute(
+                f"DELETE FROM issue_mappings WHERE {KEY_CONDITION}",
+                _key(source, source_id, target),
+            )
+
+    def export(self, file: TextIO) -> int:
+        """
+        Write all mappings to a file as JSON lines.
+
+        :return: Number of exported mappings
+        """
+        count = 0
+        for row in self._connection.execute("SELECT * FROM issue_mappings"):
+            file.write(json.dumps(dict(row)) + "\n")
+            count += 1
+        return count
+
+    def import_(self, file: TextIO) -> int:
+        """
+        Read mappings from a file written by `export`. Existing mappings
+        of the same source issues and target projects are replaced.
+
+        :return: Number of imported mappings
+        """
+        return self.add_many(
+            (
+                ProjectRef(row["source_instance"], row["source_project"]),
+                int(row["source_id"]),
+                ProjectRef(row["target_instance"], row["target_project"]),
+                int(row["target_id"]),
+            )
+            for row in map(json.loads, filter(str.strip, file))
+        )
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+@define
+class IssueMapping:
+    """
+    Mappings between the issues of one source and one target project
+    """
+
+    store: IssueMappingStore
+    source: ProjectRef
+    target: ProjectRef
+
+    def get_target_id(self, source_id: int) -> int | None:
+        return self.store.get(self.source, source_id, self.target)
+
+    def add(self, source_id: int, target_id: int) -> None:
+        self.store.add(self.source, source_id, self.target, target_id)
+
+    def remove(self, source_id: int) -> None:
+        self.store.remove(self.source, source_id, self.target)
+
+
+def _key(
+    source: ProjectRef, source_id: int, target: ProjectRef
+) -> tuple[str, str, int, str, str]:
+    return (source.instance, source.project, source_id, target.instance, target.project)
@@ -0,0 +1,125 @@
+import asyncio
+import re
+
+from attr import define
+
+from issx.clients.interfaces import IssueClientInterface
+from issx.domain.issues import Note
+from issx.metrics import REGISTRY
+
+NOTES_COPIED = REGISTRY.counter(
+    "issx_notes_copied_total",
+    "Number of comments of copied issues, by the way they were handled",
+    ["result"],
+)
+
+# appended to every copied comment, hidden in rendered Markdown
+NOTE_MARKER = "<!-- issx:note {} -->"
+MARKER_PATTERN = re.compile(r"<!-- issx:note (\d+) -->")
+
+
+@define
+class NoteCopyResult:
+    created: int = 0
+    skipped: int = 0
+    """Number of comments copied before, found by their markers"""
+
+
+class NoteCopyService:
+    """
+    Copies comments of source issues to their copies in the target project.
+
+    Every copied comment ends with a marker of the id of its source comment,
+    so a repeated copy finds the comments copied before by listing the target
+    issue once and creates only the missing ones. The comments of the source
+    issue are fetched page by page while they are being copied.
+    """
+
+    def __init__(
+        self,
+        source_client: IssueClientInterface,
+        target_client: IssueClientInterface,
+        max_concurrency: int = 4,
+        page_size: int = 100,
+        preserve_order: bool = True,
+    ):
+        """
+        :param source_client: Client of the project to copy comments from
+        :param target_client: Client of the project to copy comments to
+        :param max_concurrency: Maximum number of comments created at the same
+        time when the order does not have to be preserved
+        :param page_size: Number of comments fetched in a single request
+        :param preserve_order: Whether to create the comments one by one, so
+        the trackers, which order comments by their creation, show them
+        in the original order
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be a positive number")
+        self.source_client = source_client
+        self.target_client = target_client
+        self.max_concurrency = 1 if preserve_order else max_concurrency
+        self.page_size = page_size
+
+    async def copy(self, source_id: int, target_id: int) -> NoteCopyResult:
+        """
+        :param source_id: The ID of the issue to copy the comments from
+        :param target_id: The ID of the copy of the issue
+        :return: Numbers of the created and skipped comments
+        """
+        result = NoteCopyResult()
+        # the first page of the source is fetched while the target is listed
+        copied = asyncio.ensure_future(self._get_copied(target_id))
+        pending: set[asyncio.Future[None]] = set()
+        try:
+            async for note in self.source_client.iter_notes(source_id, self.page_size):
+                if note.id in await copied:
+                    result.skipped += 1
+                    continue
+                if len(pending) >= self.max_concurrency:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for finished in done:
+                        finished.result()
+                pending.add(
+                    asyncio.ensure_future(
+                        self.target_client.create_note(
+                            target_id, self.prepare_body(note)
+                        )
+                    )
+                )
+                result.created += 1
+            await asyncio.gather(*pending)
+        finally:
+            copied.cancel()
+            for task in pending:
+                task.cancel()
+        NOTES_COPIED.inc(result.created, result="created")
+        NOTES_COPIED.inc(result.skipped, result="skipped")
+        return result
+
+    async def _get_copied(self, target_id: int) -> set[int]:
+        """
+        :return: IDs of the source comments copied to the target issue before
+        """
+        copied = set()
+        async for note in self.target_client.iter_notes(target_id, self.page_size):
+            # a copy of a copied comment carries the markers of both
+            if markers := MARKER_PATTERN.findall(note.body):
+                copied.add(int(markers[-1]))
+        return copied
+
+    @staticmethod
+    def prepare_body(note: Note) -> str:
+        """
+        :param note: The source comment
+        :return: Text of the copied comment with its author, date and marker
+        """
+        parts = []
+        if note.author is not None:
+            posted = f"Posted by {note.author}"
+            if note.created_at is not None:
+                posted += f" on {note.created_at:%Y-%m-%d}"
+            parts.append(f"_{posted}_")
+        parts.extend((note.body, NOTE_MARKER.format(note.id)))
+        return "\n\n".join(parts)
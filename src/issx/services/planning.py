@@ -0,0 +1,337 @@
+import asyncio
+import json
+import math
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from enum import StrEnum
+from typing import Any, TextIO
+
+from attr import Factory, define
+
+from issx.clients.instrumentation import CallProfiler, scoped_call_hook
+from issx.clients.interfaces import IssueClientInterface
+from issx.domain.issues import Issue, issue_from_dict, issue_to_dict
+from issx.domain.templates import compile_template
+from issx.services.mappings import IssueMapping
+
+PLAN_VERSION = 1
+
+
+class PlanAction(StrEnum):
+    create = "create"
+    skip = "skip"
+    """The issue has been copied before, its counterpart is reused"""
+    conflict = "conflict"
+    """The issue cannot be copied safely, it is left out of the execution"""
+
+
+class PlanConflictError(Exception):
+    """
+    Reported for the issues planned as conflicts when a plan is executed
+    """
+
+
+@define
+class PlanEntry:
+    """
+    Planned copy of a single source issue
+    """
+
+    issue_id: int
+    action: PlanAction
+    title: str | None = None
+    """Rendered title of the copy, None if it could not be rendered"""
+    description: str | None = None
+    """Rendered description of the copy, set only for the issues to create"""
+    target: Issue | None = None
+    """Counterpart of the issue in the target project for the skipped issues"""
+    found_by: str | None = None
+    """Way the counterpart was found, `mapping` or `title`"""
+    reason: str | None = None
+    """Reason of a conflict"""
+
+
+@define
+class PlanEstimate:
+    planning_requests: int = 0
+    """Number of requests sent to make the plan"""
+    requests: int = 0
+    """Number of requests expected to execute the plan"""
+    seconds: float = 0.0
+    """Expected duration of the execution"""
+
+
+@define
+class CopyPlan:
+    """
+    Outcome of a bulk copy computed without making any changes. It contains
+    everything needed to execute it, so the execution does not fetch
+    the source issues nor search the target project again.
+    """
+
+    entries: list[PlanEntry] = Factory(list)
+    assign_to_me: bool = False
+    estimate: PlanEstimate = Factory(PlanEstimate)
+    created_at: datetime = Factory(lambda: datetime.now(UTC))
+    source: str | None = None
+    target: str | None = None
+    """Names of the projects in the config file, set by the command runner"""
+
+    @property
+    def issue_ids(self) -> list[int]:
+        return [entry.issue_id for entry in self.entries]
+
+    def get_entries(self, action: PlanAction) -> list[PlanEntry]:
+        return [entry for entry in self.entries if entry.action == action]
+
+    def write(self, file: TextIO) -> None:
+        """
+        Write the plan to a file as JSON.
+        """
+        json.dump(plan_to_dict(self), file, indent=2)
+        file.write("\n")
+
+    @classmethod
+    def read(cls, file: TextIO) -> "CopyPlan":
+        """
+        Read a plan from a file written by `write`.
+        """
+        return plan_from_dict(json.load(file))
+
+
+class CopyPlanner:
+    """
+    Plans a bulk copy without making any changes in the target project.
+
+    The source issues are fetched in batches and all issues of the target
+    project are listed once, concurrently, so planning costs the same
+    requests as finding duplicates in `CopyIssueService.copy_many`
+    regardless of the number of issues. The listing serves both
+    as the index of the titles and to check that the counterparts known
+    from the mapping still exist.
+    """
+
+    def __init__(
+        self,
+        source_client: IssueClientInterface,
+        target_client: IssueClientInterface,
+        mapping: IssueMapping | None = None,
+        page_size: int = 100,
+    ):
+        """
+        :param source_client: Client of the project to copy issues from
+        :param target_client: Client of the project to copy issues to
+        :param mapping: Mapping of already copied issues, only read
+        :param page_size: Number of target issues listed in a single request
+        """
+        self.source_client = source_client
+        self.target_client = target_client
+        self.mapping = mapping
+        self.page_size = page_size
+
+    async def plan(
+        self,
+        issue_ids: Iterable[int],
+        title_format: str = "{title}",
+        description_format: str = "{description}",
+        allow_duplicates: bool = False,
+        assign_to_me: bool = False,
+        max_concurrency: int = 10,
+        rate_limit: float | None = None,
+        rate_limit_burst: int = 1,
+    ) -> CopyPlan:
+        """
+        Plan copying the issues with the options of `CopyIssueService.copy_many`.
+
+        Issues are planned as conflicts if they do not exist, their templates
+        fail to render, multiple issues of the target project have their title
+        or another planned copy has the same title.
+
+        :param max_concurrency: Number of copies executed at the same time,
+        used to estimate the duration
+        :param rate_limit: Requests per second allowed by the target instance
+        or None for no limit, used to estimate the duration
+        :param rate_limit_burst: Number of requests allowed at once
+        :return: The plan with the entries in the order of `issue_ids`
+        :raises TemplateError: If any of the formats is invalid
+        """
+        title_template = compile_template(title_format)
+        description_template = compile_template(description_format)
+        issue_ids = list(dict.fromkeys(issue_ids))
+        # requests of the clients are measured to estimate the execution,
+        # calls of other tasks running at the same time are not
+        profiler = CallProfiler()
+        with scoped_call_hook(profiler):
+            source_issues, target_issues = await asyncio.gather(
+                self.source_client.get_issues(issue_ids),
+                self._list_target_issues(allow_duplicates),
+            )
+        by_id = {issue.id: issue for issue in target_issues}
+        by_title: dict[str, list[Issue]] = {}
+        for issue in target_issues:
+            by_title.setdefault(issue.title, []).append(issue)
+        plan = CopyPlan(assign_to_me=assign_to_me)
+        planned_titles: dict[str, int] = {}
+        for issue_id in issue_ids:
+            entry = self._plan_counterpart(issue_id, by_id, allow_duplicates)
+            if entry is None and (source_issue := source_issues.get(issue_id)):
+                try:
+                    title = title_template.render(source_issue)
+                    description = description_template.render(source_issue)
+                except Exception as e:
+                    entry = PlanEntry(
+                        issue_id,
+                        PlanAction.conflict,
+                        reason=f"Cannot render the templates: {e!r}",
+                    )
+                else:
+                    entry = self._plan_title(
+                        issue_id,
+                        title,
+                        description,
+                        by_title,
+                        planned_titles,
+                        allow_duplicates,
+                    )
+            elif entry is None:
+                entry = PlanEntry(
+                    issue_id,
+                    PlanAction.conflict,
+                    reason="The source issue does not exist",
+                )
+            plan.entries.append(entry)
+        plan.estimate = self._estimate(
+            plan, profiler, max_concurrency, rate_limit, rate_limit_burst
+        )
+        return plan
+
+    async def _list_target_issues(self, allow_duplicates: bool) -> list[Issue]:
+        if allow_duplicates:
+            return []
+        return [issue async for issue in self.target_client.iter_issues(self.page_size)]
+
+    def _plan_counterpart(
+        self, issue_id: int, by_id: dict[int, Issue], allow_duplicates: bool
+    ) -> PlanEntry | None:
+        if allow_duplicates or self.mapping is None:
+            return None
+        target_id = self.mapping.get_target_id(issue_id)
+        # counterparts removed from the target project are copied again
+        if target_id is None or (target := by_id.get(target_id)) is None:
+            return None
+        return PlanEntry(
+            issue_id,
+            PlanAction.skip,
+            title=target.title,
+            target=target,
+            found_by="mapping",
+        )
+
+    @staticmethod
+    def _plan_title(
+        issue_id: int,
+        title: str,
+        description: str,
+        by_title: dict[str, list[Issue]],
+        planned_titles: dict[str, int],
+        allow_duplicates: bool,
+    ) -> PlanEntry:
+        if allow_duplicates:
+            return PlanEntry(issue_id, PlanAction.create, title, description)
+        if len(matches := by_title.get(title, [])) > 1:
+            return PlanEntry(
+                issue_id,
+                PlanAction.conflict,
+                title,
+                reason=f"{len(matches)} issues of the target project have the title",
+            )
+        if matches:
+            return PlanEntry(
+                issue_id, PlanAction.skip, title, target=matches[0], found_by="title"
+            )
+        if (other_id := planned_titles.setdefault(title, issue_id)) != issue_id:
+            return PlanEntry(
+                issue_id,
+                PlanAction.conflict,
+                title,
+                reason=f"Issue {other_id} is planned to be copied with the same title",
+            )
+        return PlanEntry(issue_id, PlanAction.create, title, description)
+
+    @staticmethod
+    def _estimate(
+        plan: CopyPlan,
+        profiler: CallProfiler,
+        max_concurrency: int,
+        rate_limit: float | None,
+        rate_limit_burst: int,
+    ) -> PlanEstimate:
+        # every copy is a single request creating the issue
+        requests = len(plan.get_entries(PlanAction.create))
+        calls = [event for event in profiler.events if event.requests]
+        latency = sum(event.duration for event in calls) / len(calls) if calls else 0
+        seconds = math.ceil(requests / max_concurrency) * latency
+        if rate_limit is not None:
+            seconds = max(seconds, max(requests - rate_limit_burst, 0) / rate_limit)
+        return PlanEstimate(
+            planning_requests=sum(event.requests for event in profiler.events),
+            requests=requests,
+            seconds=seconds,
+        )
+
+
+def plan_to_dict(plan: CopyPlan) -> dict[str, Any]:
+    """
+    Convert a plan to a dictionary that can be serialized to JSON.
+    """
+    return {
+        "version": PLAN_VERSION,
+        "source": plan.source,
+        "target": plan.target,
+        "assign_to_me": plan.assign_to_me,
+        "created_at": plan.created_at.isoformat(),
+        "estimate": {
+            "planning_requests": plan.estimate.planning_requests,
+            "requests": plan.estimate.requests,
+            "seconds": plan.estimate.seconds,
+        },
+        "entries": [
+            {
+                "issue_id": entry.issue_id,
+                "action": entry.action.value,
+                "title": entry.title,
+                "description": entry.description,
+                "target": issue_to_dict(entry.target) if entry.target else None,
+                "found_by": entry.found_by,
+                "reason": entry.reason,
+            }
+            for entry in plan.entries
+        ],
+    }
+
+
+def plan_from_dict(data: dict[str, Any]) -> CopyPlan:
+    """
+    Create a plan from a dictionary returned by `plan_to_dict`.
+    """
+    if data.get("version") != PLAN_VERSION:
+        raise ValueError(f"Unsupported plan version: {data.get('version')!r}")
+    return CopyPlan(
+        entries=[
+            PlanEntry(
+                entry["issue_id"],
+                PlanAction(entry["action"]),
+                title=entry["title"],
+                description=entry["description"],
+                target=issue_from_dict(entry["target"]) if entry["target"] else None,
+                found_by=entry["found_by"],
+                reason=entry["reason"],
+            )
+            for entry in data["entries"]
+        ],
+        assign_to_me=data["assign_to_me"],
+        estimate=PlanEstimate(**data["estimate"]),
+        created_at=datetime.fromisoformat(data["created_at"]),
+        source=data["source"],
+        target=data["target"],
+    )
@@ -0,0 +1,58 @@
+from datetime import datetime
+from pathlib import Path
+
+from issx.storage import connect, get_data_dir
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_cursors (
+    sync_key TEXT PRIMARY KEY,
+    updated_after TEXT NOT NULL
+);
+"""
+
+
+class SyncStateStore:
+    """
+    On-disk store of the high-water marks of synchronized project pairs.
+
+    A high-water mark is the update time of the most recently updated
+    source issue that has been synchronized. The next synchronization
+    fetches only issues updated since then.
+    """
+
+    def __init__(self, path: Path | None = None):
+        """
+        :param path: Path to the database file. Defaults to `sync.sqlite3`
+        in the issx data directory.
+        """
+        self.path = path or get_data_dir() / "sync.sqlite3"
+        self._connection = connect(self.path, SCHEMA, SCHEMA_VERSION)
+
+    def get_cursor(self, sync_key: str) -> datetime | None:
+        """
+        :param sync_key: Identifier of the synchronized project pair
+        :return: The high-water mark or None if the pair was never synchronized
+        """
+        row = self._connection.execute(
+            "SELECT updated_after FROM sync_cursors WHERE sync_key = ?", (sync_key,)
+        ).fetchone()
+        return datetime.fromisoformat(row["updated_after"]) if row else None
+
+    def set_cursor(self, sync_key: str, updated_after: datetime) -> None:
+        with self._connection:
+            self._connection.execute(
+                "INSERT INTO sync_cursors (sync_key, updated_after) VALUES (?, ?)"
+                " ON CONFLICT (sync_key) DO UPDATE"
+                " SET updated_after = excluded.updated_after",
+                (sync_key, updated_after.isoformat()),
+            )
+
+    def reset_cursor(self, sync_key: str) -> None:
+        with self._connection:
+            self._connection.execute(
+                "DELETE FROM sync_cursors WHERE sync_key = ?", (sync_key,)
+            )
+
+    def close(self) -> None:
+        self._connection.close()
@@ -0,0 +1,265 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+
+from attr import Factory, define
+
+from issx.clients.interfaces import IssueClientInterface
+from issx.clients.paging import MAX_PAGE_SIZE
+from issx.domain.issues import Issue
+from issx.domain.templates import compile_template
+from issx.metrics import REGISTRY
+from issx.services.copying import CopyIssueService, TitleReservations
+from issx.services.mappings import IssueMapping
+from issx.services.state import SyncStateStore
+
+SYNCED_ISSUES = REGISTRY.counter(
+    "issx_synced_issues_total",
+    "Number of source issues processed by synchronizations, by their result",
+    ["result"],
+)
+LAST_SYNC = REGISTRY.gauge(
+    "issx_last_sync_timestamp_seconds",
+    "Unix time of the end of the last synchronization",
+)
+
+
+@define
+class SyncReport:
+    """
+    Summary of a single synchronization run
+    """
+
+    created: list[Issue] = Factory(list)
+    updated: list[Issue] = Factory(list)
+    unchanged: list[Issue] = Factory(list)
+    errors: dict[int, Exception] = Factory(dict)
+    updated_after: datetime | None = None
+    cursor: datetime | None = None
+
+    @property
+    def processed(self) -> int:
+        return (
+            len(self.created)
+            + len(self.updated)
+            + len(self.unchanged)
+            + len(self.errors)
+        )
+
+
+class SyncService:
+    """
+    Keeps the issues of a target project in sync with the issues of a source project.
+
+    Every run fetches only the source issues updated since the previous run
+    and creates or updates their counterparts in the target project.
+    Counterparts recorded in the `mapping` of copied issues are fetched by
+    their ids in batches, the others are searched by the title rendered with
+    `title_format`. The target project is never listed as a whole, so a run
+    costs requests proportional to the number of changed issues.
+    """
+
+    def __init__(
+        self,
+        source_client: IssueClientInterface,
+        target_client: IssueClientInterface,
+        state_store: SyncStateStore,
+        sync_key: str,
+        mapping: IssueMapping | None = None,
+    ):
+        """
+        :param source_client: Client of the project to sync issues from
+        :param target_client: Client of the project to sync issues to
+        :param state_store: Store of the high-water marks
+        :param sync_key: Identifier of the project pair in the `state_store`
+        :param mapping: Mapping of issues copied between the projects
+        """
+        self.source_client = source_client
+        self.target_client = target_client
+        self.state_store = state_store
+        self.sync_key = sync_key
+        self.mapping = mapping
+
+    async def sync(
+        self,
+        title_format: str = "{title}",
+        description_format: str = "{description}",
+        full: bool = False,
+        max_concurrency: int = 10,
+    ) -> SyncReport:
+        """
+        Synchronize issues changed since the previous run.
+
+        The high-water mark is advanced only up to the first failed issue,
+        so failed issues are retried by the next run.
+
+        :param title_format: The format for the target issue titles
+        :param description_format: The format for the target issue descriptions
+        :param full: Whether to ignore the high-water mark and sync all issues
+        :param max_concurrency: Maximum number of issues processed at the same time
+        :return: Report of the run
+        :raises TemplateError: If any of the formats is invalid
+        """
+        compile_template(title_format)
+        compile_template(description_format)
+        updated_after = None if full else self.state_store.get_cursor(self.sync_key)
+        report = SyncReport(updated_after=updated_after)
+        reservations = TitleReservations()
+        copy_service = CopyIssueService(
+            self.source_client, self.target_client, mapping=self.mapping
+        )
+        semaphore = asyncio.Semaphore(max_concurrency)
+        synced_at: list[datetime] = []
+        failed_at: list[datetime] = []
+
+        async def sync_one(source_issue: Issue, counterpart: Issue | None) -> None:
+            try:
+                await self._sync_issue(
+                    copy_service,
+                    reservations,
+                    source_issue,
+                    counterpart,
+                    title_format,
+                    description_format,
+                    report,
+                )
+            except Exception as e:
+                report.errors[source_issue.id] = e
+                if source_issue.updated_at is not None:
+                    failed_at.append(_as_utc(source_issue.updated_at))
+            else:
+                if source_issue.updated_at is not None:
+                    synced_at.append(_as_utc(source_issue.updated_at))
+            finally:
+                semaphore.release()
+
+        tasks: set[asyncio.Task[None]] = set()
+        try:
+            async for batch in _batched(
+                self.source_client.iter_issues(updated_after=updated_after),
+                MAX_PAGE_SIZE,
+            ):
+                counterparts = await self._get_counterparts(batch)
+                for source_issue in batch:
+                    await semaphore.acquire()
+                    task = asyncio.create_task(
+                        sync_one(source_issue, counterparts.get(source_issue.id))
+                    )
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        report.cursor = min(failed_at) if failed_at else max(synced_at, default=None)
+        if report.cursor is not None:
+            self.state_store.set_cursor(self.sync_key, report.cursor)
+        _record_metrics(report)
+        return report
+
+    async def _get_counterparts(self, source_issues: list[Issue]) -> dict[int, Issue]:
+        """
+        Fetch the mapped counterparts of the source issues in a single batch.
+
+        :return: The counterparts by the IDs of their source issues. Issues
+        without a mapping are missing, as well as the ones whose counterparts
+        were removed from the target project, and their mappings are removed.
+        """
+        if self.mapping is None:
+            return {}
+        target_ids = {
+            source_issue.id: target_id
+            for source_issue in source_issues
+            if (target_id := self.mapping.get_target_id(source_issue.id))
+        }
+        if not target_ids:
+            return {}
+        target_issues = await self.target_client.get_issues(target_ids.values())
+        counterparts = {}
+        for source_id, target_id in target_ids.items():
+            if (target_issue := target_issues.get(target_id)) is not None:
+                counterparts[source_id] = target_issue
+            else:
+                self.mapping.remove(source_id)
+        return counterparts
+
+    async def _sync_issue(
+        self,
+        copy_service: CopyIssueService,
+        reservations: TitleReservations,
+        source_issue: Issue,
+        counterpart: Issue | None,
+        title_format: str,
+        description_format: str,
+        report: SyncReport,
+    ) -> None:
+        title = copy_service.prepare_string(source_issue, title_format)
+        description = copy_service.prepare_string(source_issue, description_format)
+        if counterpart is not None:
+            await self._update(counterpart, title, description, report)
+            return
+        # other source issues with the same title wait until it is created
+        async with reservations.reserve(title):
+            target_issues = await self.target_client.find_issues(title)
+            if not target_issues:
+                # the title has just been searched, there is no need to look it up
+                report.created.append(
+                    await copy_service.copy_issue(
+                        source_issue,
+                        title_format,
+                        description_format,
+                        allow_duplicates=True,
+                    )
+                )
+                return
+        target_issue = target_issues[0]
+        if self.mapping is not None:
+            self.mapping.add(source_issue.id, target_issue.id)
+        await self._update(target_issue, title, description, report)
+
+    async def _update(
+        self, target_issue: Issue, title: str, description: str, report: SyncReport
+    ) -> None:
+        """
+        Update the target issue unless it already has the title and description
+        """
+        if (target_issue.title, target_issue.description) == (title, description):
+            report.unchanged.append(target_issue)
+        else:
+            report.updated.append(
+                await self.target_client.update_issue(
+                    target_issue.id, title, description
+                )
+            )
+
+
+async def _batched(
+    issues: AsyncIterator[Issue], size: int
+) -> AsyncIterator[list[Issue]]:
+    batch: list[Issue] = []
+    async for issue in issues:
+        batch.append(issue)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _record_metrics(report: SyncReport) -> None:
+    for result, issues in (
+        ("created", report.created),
+        ("updated", report.updated),
+        ("unchanged", report.unchanged),
+        ("failed", report.errors),
+    ):
+        SYNCED_ISSUES.inc(len(issues), result=result)
+    LAST_SYNC.set(time.time())
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value.astimezone(UTC)
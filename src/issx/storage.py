@@ -0,0 +1,65 @@
+import os
+import sqlite3
+from pathlib import Path
+
+
+def get_data_dir() -> Path:
+    """
+    Get the directory where issx keeps its local data, e.g. caches and state
+    of the synchronization. It can be overridden with the `ISSX_DATA_DIR`
+    environment variable and defaults to `$XDG_CACHE_HOME/issx`.
+
+    Returns: Path to the data directory. It may not exist yet.
+    """
+    if data_dir := os.environ.get("ISSX_DATA_DIR"):
+        return Path(data_dir).expanduser()
+    cache_home = os.environ.get("XDG_CACHE_HOME") or "~/.cache"
+    return Path(cache_home).expanduser() / "issx"
+
+
+def connect(
+    path: Path,
+    schema: str,
+    schema_version: int,
+    disposable: bool = True,
+    check_same_thread: bool = True,
+) -> sqlite3.Connection:
+    """
+    Open a SQLite database creating its parent directory if needed.
+
+    The schema is created when the database is new. When the database was created
+    with a different schema version, all data of a disposable database is dropped
+    and the schema is recreated. Databases with data that cannot be rebuilt
+    are never dropped, an error is raised instead.
+
+    Args:
+        path: Path to the database file
+        schema: SQL script creating the tables if they do not exist
+        schema_version: Version of the schema, increase it on every change
+        disposable: Whether the database stores only data that can be rebuilt,
+            e.g. cached responses
+        check_same_thread: Whether the connection can be used only by the thread
+            that opened it. Other threads have to serialize their access.
+
+    Returns: Open connection to the database
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path, check_same_thread=check_same_thread)
+    connection.row_factory = sqlite3.Row
+    (version,) = connection.execute("PRAGMA user_version").fetchone()
+    if version not in (0, schema_version) and not disposable:
+        connection.close()
+        raise RuntimeError(
+            f"{path} was created with schema version {version},"
+            f" expected {schema_version}"
+        )
+    if version != schema_version:
+        tables = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        ).fetchall()
+        for (table,) in tables:
+            connection.execute(f'DROP TABLE IF EXISTS "{table}"')
+        connection.execute(f"PRAGMA user_version = {int(schema_version)}")
+    connection.executescript(schema)
+    connection.commit()
+    return connection
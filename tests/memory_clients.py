@@ -1,7 +1,22 @@
-from issx.clients.exceptions import IssueDoesNotExistError
+import re
+from collections.abc import AsyncIterator, Sequence
+from datetime import UTC, datetime
+from typing import BinaryIO
+
+import attr
+
+from issx.clients.exceptions import AttachmentDoesNotExistError, IssueDoesNotExistError
 from issx.clients.interfaces import IssueClientInterface
 from issx.domain.config import InstanceConfig, ProjectFlatConfig
-from issx.domain.issues import Issue
+from issx.domain.issues import (
+    Attachment,
+    AttachmentReference,
+    Issue,
+    Note,
+    UploadedAttachment,
+)
+
+FILE_PATTERN = re.compile(r"/files/\d+/[^\s()]+")
 
 
 class InMemoryIssueClient(IssueClientInterface):
@@ -20,17 +35,27 @@ class InMemoryIssueClient(IssueClientInterface):
             {issue.id: issue for issue in initial_issues} if initial_issues else {}
         )
         self._current_id = max(self.issues.keys(), default=0) + 1
+        self.files: dict[str, bytes] = {}
+        self.notes: dict[int, list[Note]] = {}
+        self._current_note_id = 1
         self._base_url = base_url
         self.instance_config = instance_config
         self.project_config = project_config
 
+    async def validate_project(self) -> None:
+        pass
+
     async def get_issue(self, issue_id: int) -> Issue:
         if issue := self.issues.get(issue_id):
             return issue
         raise IssueDoesNotExistError(issue_id)
 
     async def create_issue(
-        self, title: str, description: str, assign_to_me: bool = False
+        self,
+        title: str,
+        description: str,
+        assign_to_me: bool = False,
+        attachments: Sequence[UploadedAttachment] = (),
     ) -> Issue:
         issue = Issue(
             id=self._current_id,
@@ -38,14 +63,77 @@ class InMemoryIssueClient(IssueClientInterface):
             description=description,
             web_url=f"{self._base_url}/issue/{self._current_id}",
             reference=f"#{self._current_id}",
+            updated_at=datetime.now(UTC),
         )
         self.issues[self._current_id] = issue
         self._current_id += 1
         return issue
 
+    async def update_issue(self, issue_id: int, title: str, description: str) -> Issue:
+        issue = await self.get_issue(issue_id)
+        self.issues[issue_id] = issue = attr.evolve(
+            issue, title=title, description=description, updated_at=datetime.now(UTC)
+        )
+        return issue
+
+    async def find_attachments(
+        self, issue: Issue, text: str
+    ) -> list[AttachmentReference]:
+        return [
+            AttachmentReference(
+                Attachment(filename=match[0].rpartition("/")[2], url=match[0]),
+                start=match.start(),
+                end=match.end(),
+            )
+            for match in FILE_PATTERN.finditer(text)
+        ]
+
+    async def download_attachment(
+        self, attachment: Attachment, file: BinaryIO, chunk_size: int = 64 * 1024
+    ) -> None:
+        if (content := self.files.get(attachment.url)) is None:
+            raise AttachmentDoesNotExistError(attachment.url)
+        for start in range(0, len(content), chunk_size):
+            file.write(content[start : start + chunk_size])
+
+    async def upload_attachment(
+        self, filename: str, file: BinaryIO, content_type: str | None = None
+    ) -> UploadedAttachment:
+        url = f"/files/{len(self.files) + 1}/{filename}"
+        self.files[url] = file.read()
+        return UploadedAttachment(filename=filename, url=url, content_type=content_type)
+
+    async def iter_notes(
+        self, issue_id: int, page_size: int = 100
+    ) -> AsyncIterator[Note]:
+        await self.get_issue(issue_id)
+        for note in list(self.notes.get(issue_id, ())):
+            yield note
+
+    async def create_note(self, issue_id: int, body: str) -> None:
+        await self.get_issue(issue_id)
+        self.notes.setdefault(issue_id, []).append(
+            Note(id=self._current_note_id, body=body, created_at=datetime.now(UTC))
+        )
+        self._current_note_id += 1
+
     async def find_issues(self, title: str) -> list[Issue]:
         return [issue for issue in self.issues.values() if issue.title == title]
 
+    async def iter_issues(
+        self,
+        page_size: int = 100,
+        updated_after: datetime | None = None,
+        search: str | None = None,
+    ) -> AsyncIterator[Issue]:
+        for issue in list(self.issues.values()):
+            if search is not None and search not in issue.title:
+                continue
+            if updated_after is None or (
+                issue.updated_at is not None and issue.updated_at >= updated_after
+            ):
+                yield issue
+
     @classmethod
     def from_config(
         cls, instance_config: InstanceConfig, project_config: ProjectFlatConfig
@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+from benchmarks.__main__ import main
+from benchmarks.scenarios import SCENARIOS, SERVERS, BenchmarkOptions
+
+
+class TestBenchmarks:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("backend", list(SERVERS))
+    @pytest.mark.parametrize("scenario", ["copy_latency", "bulk_copy", "find_dedup"])
+    async def test_scenario_runs_against_fake_server(self, scenario, backend):
+        metrics = await SCENARIOS[scenario](
+            backend, BenchmarkOptions(issues=3, samples=2, concurrency=2)
+        )
+
+        assert metrics
+        assert all(value >= 0 for value in metrics.values())
+
+    def test_results_can_be_compared(self, tmp_path, capsys):
+        output = tmp_path / "results.json"
+        main(
+            ["run", "--scenario", "bulk_copy", "--issues", "3", "--output", str(output)]
+        )
+
+        results = json.loads(output.read_text())
+        main(["compare", str(output), str(output)])
+
+        assert [result["backend"] for result in results["results"]] == list(SERVERS)
+        assert "bulk_copy[gitlab].requests" in capsys.readouterr().out
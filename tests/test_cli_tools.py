@@ -1,7 +1,15 @@
+import subprocess
+import sys
 from unittest import mock
 
+import pytest
 from attr import define
-from issx.cli_utils import RichConfigReader
+from issx.cli_utils import (
+    RichConfigReader,
+    parse_import_times,
+    parse_issue_ids,
+    read_issue_ids,
+)
 from issx.domain.config import BaseConfig
 from rich.prompt import Prompt
 
@@ -19,3 +27,46 @@ class TestRichConfigReader:
         config = RichConfigReader().read(TestConfig)
         assert config.name == "name"
         assert config.age == 12
+
+
+class TestParseIssueIds:
+    def test_parses_ids_and_ranges(self):
+        assert parse_issue_ids("1, 2,5-7,") == [1, 2, 5, 6, 7]
+
+    @pytest.mark.parametrize("spec", ["a", "1-b", "7-5"])
+    def test_raises_error_for_invalid_spec(self, spec):
+        with pytest.raises(ValueError):
+            parse_issue_ids(spec)
+
+    def test_reads_ids_from_file(self, tmp_path):
+        path = tmp_path / "ids.txt"
+        path.write_text("# comment\n1,2\n\n4-5\n")
+
+        assert read_issue_ids(path) == [1, 2, 4, 5]
+
+
+class TestImportTime:
+    def test_parse_import_times_sums_self_time_by_package(self):
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       100 |        100 |   rich.text\n"
+            "import time:        50 |        150 | rich\n"
+            "import time:        10 |         10 | json\n"
+        )
+
+        assert parse_import_times(output) == {"rich": 150, "json": 10}
+
+    def test_cli_does_not_import_backends(self):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, issx.cli;"
+                " print(sorted({'gitlab', 'redminelib'} & set(sys.modules)))",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        assert result.stdout.strip() == "[]"
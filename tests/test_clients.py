@@ -1,19 +1,59 @@
 import abc
 import asyncio
+import io
+import json
 import os
+import threading
+import time
 import uuid
 from abc import abstractmethod
 from collections.abc import AsyncGenerator
+from datetime import UTC, datetime, timedelta
+from unittest import mock
 
+import attr
 import pytest
 import pytest_asyncio
-from gitlab import Gitlab
+import requests
+from benchmarks.fake_servers import FakeGitlabServer, FakeRedmineServer
+from gitlab import Gitlab, GitlabHttpError
 from issx.clients import GitlabClient
-from issx.clients.exceptions import IssueDoesNotExistError
+from issx.clients.cache import CachedIssueClient, IssueCache
+from issx.clients.exceptions import (
+    AttachmentDoesNotExistError,
+    IssueDoesNotExistError,
+    ProjectDoesNotExistError,
+)
+from issx.clients.executors import BlockingExecutor
+from issx.clients.gitlab import GitlabInstanceClient
+from issx.clients.http import (
+    ConditionalRequestAdapter,
+    RateLimitedAdapter,
+    TokenBucket,
+)
+from issx.clients.http_cache import ResponseStore, StoredResponse
+from issx.clients.instrumentation import (
+    API_CALLS,
+    API_THROTTLED,
+    CallEvent,
+    CallProfiler,
+    add_call_hook,
+    record_metrics,
+    record_response,
+    remove_call_hook,
+    scoped_call_hook,
+    track_call,
+)
 from issx.clients.interfaces import IssueClientInterface
+from issx.clients.paging import paginate
 from issx.clients.redmine import RedmineClient
-from issx.domain.issues import Issue
+from issx.clients.users import CurrentUserCache
+from issx.domain import SupportedBackend
+from issx.domain.config import RemoteInstanceConfig
+from issx.domain.issues import Attachment, Issue
 from redminelib import Redmine
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
 
 from tests.memory_clients import InMemoryIssueClient
 
@@ -77,6 +117,50 @@ class BaseTestIssueClientInterface(abc.ABC):
         assert issues[0].title == title1
         assert issues[0].id == issue1_task.result().id
 
+    @pytest.mark.asyncio
+    async def test_update_issue_changes_title_and_description(
+        self, issue_client, existing_issue
+    ):
+        issue = await issue_client.update_issue(
+            existing_issue.id, "New title", "New description"
+        )
+
+        assert issue.id == existing_issue.id
+        assert (issue.title, issue.description) == ("New title", "New description")
+        assert await issue_client.get_issue(existing_issue.id) == issue
+
+    @pytest.mark.asyncio
+    async def test_iter_issues_returns_issues_updated_after(self, issue_client):
+        issue = await issue_client.create_issue(str(uuid.uuid4()), "Description")
+
+        issues = [
+            issue
+            async for issue in issue_client.iter_issues(
+                updated_after=issue.updated_at + timedelta(seconds=1)
+            )
+        ]
+
+        assert issue.id not in {issue.id for issue in issues}
+
+    @pytest.mark.asyncio
+    async def test_iter_issues_returns_all_issues(self, issue_client):
+        created_issues = [
+            await issue_client.create_issue(str(uuid.uuid4()), "Description")
+            for _ in range(3)
+        ]
+
+        issues = [issue async for issue in issue_client.iter_issues(page_size=2)]
+
+        assert {issue.id for issue in created_issues} <= {issue.id for issue in issues}
+
+    @pytest.mark.asyncio
+    async def test_get_issues_returns_existing_issues(
+        self, issue_client, existing_issue
+    ):
+        issues = await issue_client.get_issues([existing_issue.id, -1])
+
+        assert issues == {existing_issue.id: existing_issue}
+
 
 class TestIssueClientInterface(BaseTestIssueClientInterface):
     pytestmark = pytest.mark.skipif(False, reason="Integration tests disabled")
@@ -171,3 +255,758 @@ class TestGitlabIssueClientInterface(BaseTestIssueClientInterface):
             }
         except KeyError as e:
             pytest.skip(f"Skipping Gitlab tests due to missing configuration {e}")
+
+
+class TestBlockingExecutor:
+    @pytest.mark.asyncio
+    async def test_run_returns_result_of_the_function(self):
+        executor = BlockingExecutor()
+
+        assert await executor.run(int, "12", base=8) == 10
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_overlap(self):
+        executor = BlockingExecutor(max_workers=4)
+        started_at = time.perf_counter()
+
+        await asyncio.gather(*(executor.run(time.sleep, 0.1) for _ in range(4)))
+
+        assert time.perf_counter() - started_at < 0.3
+
+    @pytest.mark.asyncio
+    async def test_max_workers_limits_concurrent_calls(self):
+        executor = BlockingExecutor(max_workers=1)
+        started_at = time.perf_counter()
+
+        await asyncio.gather(*(executor.run(time.sleep, 0.05) for _ in range(3)))
+
+        assert time.perf_counter() - started_at >= 0.15
+        executor.shutdown()
+
+
+class TestPaginate:
+    @pytest.mark.asyncio
+    async def test_yields_items_of_all_pages(self):
+        pages = [[1, 2], [3, 4], [5]]
+        fetch_page = mock.AsyncMock(side_effect=pages)
+
+        assert [item async for item in paginate(fetch_page, page_size=2)] == [
+            1,
+            2,
+            3,
+            4,
+            5,
+        ]
+        assert fetch_page.await_args_list == [mock.call(0), mock.call(1), mock.call(2)]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("prefetch", [True, False])
+    async def test_next_page_is_fetched_while_consuming_current_one(self, prefetch):
+        fetch_page = mock.AsyncMock(side_effect=[[1, 2], [3]])
+        pages = paginate(fetch_page, page_size=2, prefetch=prefetch)
+
+        assert await anext(pages) == 1
+        await asyncio.sleep(0)
+
+        assert fetch_page.await_count == (2 if prefetch else 1)
+        assert [item async for item in pages] == [2, 3]
+
+    @pytest.mark.asyncio
+    async def test_closing_iterator_cancels_prefetched_page(self):
+        next_page = asyncio.Event()
+
+        async def fetch_page(index):
+            if index:
+                await next_page.wait()
+            return [index, index]
+
+        pages = paginate(fetch_page, page_size=2)
+        assert await anext(pages) == 0
+        await asyncio.sleep(0)
+
+        await pages.aclose()
+
+    @pytest.mark.asyncio
+    async def test_gitlab_client_finds_issues_on_all_pages(self):
+        def make_issue(iid, title):
+            return mock.Mock(
+                iid=iid,
+                title=title,
+                references={"full": f"#{iid}"},
+                updated_at="2024-01-01T00:00:00+00:00",
+                state="opened",
+                labels=[],
+                assignees=[],
+                author={"username": "user"},
+                milestone=None,
+                created_at="2024-01-01T00:00:00+00:00",
+                closed_at=None,
+            )
+
+        project = mock.Mock()
+        project.issues.list.side_effect = [
+            [make_issue(iid, "Title 2") for iid in range(1, 100)]
+            + [make_issue(100, "Title")],
+            [make_issue(101, "Title")],
+        ]
+        gitlab = mock.Mock(spec=Gitlab, projects=mock.Mock())
+        gitlab.projects.get.return_value = project
+        client = GitlabClient(gitlab, project_id=1)
+
+        issues = await client.find_issues("Title")
+
+        assert [issue.id for issue in issues] == [100, 101]
+        assert project.issues.list.call_count == 2
+
+
+class TestRateLimitedAdapter:
+    @pytest.fixture
+    def m_sleep(self, monkeypatch):
+        m_sleep = mock.Mock()
+        monkeypatch.setattr(time, "sleep", m_sleep)
+        return m_sleep
+
+    @staticmethod
+    def make_response(status_code, **headers):
+        response = Response()
+        response.status_code = status_code
+        response.headers.update(headers)
+        response.raw = io.BytesIO()
+        return response
+
+    @staticmethod
+    def make_request(method):
+        request = PreparedRequest()
+        request.prepare(method=method, url="https://example.com")
+        return request
+
+    def test_throttled_request_is_retried_after_requested_delay(
+        self, m_sleep, monkeypatch
+    ):
+        responses = [
+            self.make_response(429, **{"Retry-After": "2"}),
+            self.make_response(201),
+        ]
+        monkeypatch.setattr(HTTPAdapter, "send", mock.Mock(side_effect=responses))
+        adapter = RateLimitedAdapter(TokenBucket())
+
+        response = adapter.send(self.make_request("POST"))
+
+        assert response.status_code == 201
+        assert m_sleep.call_args.args[0] == pytest.approx(2, abs=0.1)
+
+    def test_transient_error_is_retried_only_for_idempotent_requests(
+        self, m_sleep, monkeypatch
+    ):
+        m_send = mock.Mock(return_value=self.make_response(503))
+        monkeypatch.setattr(HTTPAdapter, "send", m_send)
+        adapter = RateLimitedAdapter(TokenBucket(), retries=2)
+
+        assert adapter.send(self.make_request("POST")).status_code == 503
+        assert m_send.call_count == 1
+
+        assert adapter.send(self.make_request("GET")).status_code == 503
+        assert m_send.call_count == 4
+
+    def test_exhausted_rate_limit_pauses_requests(self, monkeypatch):
+        response = self.make_response(
+            200, **{"RateLimit-Remaining": "0", "RateLimit-Reset": "5"}
+        )
+        monkeypatch.setattr(HTTPAdapter, "send", mock.Mock(return_value=response))
+        bucket = TokenBucket()
+
+        RateLimitedAdapter(bucket).send(self.make_request("GET"))
+
+        assert bucket._paused_until - time.monotonic() == pytest.approx(5, abs=0.1)
+
+    def test_throttled_gitlab_request_is_retried_only_by_adapter(self, m_sleep):
+        with FakeGitlabServer(rate_limit=0) as server:
+            server.add_project(1)
+            instance_client = GitlabInstanceClient.instance_from_config(
+                RemoteInstanceConfig(
+                    backend=SupportedBackend.gitlab,
+                    url=server.url,
+                    token="token",
+                    max_retries=2,
+                )
+            )
+
+            with pytest.raises(GitlabHttpError) as exc_info:
+                instance_client.client.http_get("/projects/1/issues/1")
+
+        assert exc_info.value.response_code == 429
+        assert server.request_count == 3
+
+    def test_token_bucket_paces_requests(self, m_sleep):
+        bucket = TokenBucket(rate=10, capacity=2)
+
+        delays = [bucket.acquire() for _ in range(4)]
+
+        assert delays[:2] == [0, 0]
+        assert delays[2] == pytest.approx(0.1, abs=0.01)
+        assert delays[3] == pytest.approx(0.2, abs=0.01)
+
+
+class TestConditionalRequestAdapter:
+    @pytest.fixture
+    def server(self):
+        with FakeGitlabServer() as server:
+            server.add_project(1)
+            yield server
+
+    @pytest.fixture
+    def make_client(self, server, tmp_path):
+        clients = []
+
+        def make_client(token="token"):
+            client = GitlabClient(Gitlab(server.url, private_token=token), 1)
+            adapter = ConditionalRequestAdapter(
+                TokenBucket(), ResponseStore(tmp_path / "responses.sqlite3")
+            )
+            client.client.session.mount("http://", adapter)
+            clients.append(client)
+            return client
+
+        yield make_client
+        for client in clients:
+            client.close()
+
+    @pytest.mark.asyncio
+    async def test_unchanged_resources_are_revalidated_in_next_run(
+        self, server, make_client
+    ):
+        iid = server.add_issue(1, "Title")["iid"]
+        issue = await make_client().get_issue(iid)
+
+        assert await make_client().get_issue(iid) == issue
+        assert server.not_modified == 1
+
+    @pytest.mark.asyncio
+    async def test_changed_resource_is_downloaded(self, server, make_client):
+        iid = server.add_issue(1, "Title")["iid"]
+        client = make_client()
+        await client.get_issue(iid)
+        server.projects[1][iid]["title"] = "New title"
+
+        issue = await client.get_issue(iid)
+
+        assert issue.title == "New title"
+        assert server.not_modified == 0
+
+    @pytest.mark.asyncio
+    async def test_responses_are_not_shared_between_tokens(self, server, make_client):
+        iid = server.add_issue(1, "Title")["iid"]
+        await make_client("token").get_issue(iid)
+
+        await make_client("other-token").get_issue(iid)
+
+        assert server.not_modified == 0
+
+    def test_revalidations_release_pooled_connections(self, server, tmp_path):
+        iid = server.add_issue(1, "Title")["iid"]
+        adapter = ConditionalRequestAdapter(
+            TokenBucket(),
+            ResponseStore(tmp_path / "responses.sqlite3"),
+            pool_maxsize=1,
+            pool_block=True,
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        url = f"{server.url}/api/v4/projects/1/issues/{iid}"
+
+        def revalidate():
+            for _ in range(4):
+                session.get(url).raise_for_status()
+
+        # a leaked connection blocks the next request forever
+        thread = threading.Thread(target=revalidate, daemon=True)
+        thread.start()
+        thread.join(timeout=5)
+
+        assert not thread.is_alive()
+        assert server.not_modified == 3
+        session.close()
+
+    def test_responses_without_validators_are_not_stored(self, tmp_path):
+        store = ResponseStore(tmp_path / "responses.sqlite3")
+        response = StoredResponse(etag=None, last_modified=None, headers={}, body=b"")
+
+        store.put("key", response)
+        store.put("other-key", attr.evolve(response, etag='"1"'))
+
+        assert store.get("key") is None
+        assert store.get("other-key") == attr.evolve(response, etag='"1"')
+        assert store.stats().entries == 1
+
+
+class TestRemoteIssueClients:
+    @pytest.fixture(params=["gitlab", "redmine"])
+    def server(self, request):
+        server_class = (
+            FakeGitlabServer if request.param == "gitlab" else FakeRedmineServer
+        )
+        with server_class() as server:
+            server.add_project(1)
+            yield server
+
+    @pytest.fixture
+    def make_client(self, server):
+        clients = []
+
+        def make_client(project_id=1):
+            client: IssueClientInterface
+            if isinstance(server, FakeGitlabServer):
+                client = GitlabClient(
+                    Gitlab(server.url, private_token="token"), project_id
+                )
+            else:
+                client = RedmineClient(Redmine(server.url, key="token"), project_id)
+            clients.append(client)
+            return client
+
+        yield make_client
+        for client in clients:
+            client.close()
+
+    @pytest.fixture
+    def client(self, make_client):
+        return make_client()
+
+    @pytest.mark.asyncio
+    async def test_project_is_not_fetched_to_create_issue(self, server, client):
+        await client.auth()
+        server.reset_counters()
+
+        await client.create_issue("Title", "Description")
+        await client.find_issues("Title")
+
+        assert server.requests == {"POST": 1, "GET": 1}
+
+    @pytest.mark.asyncio
+    async def test_project_validation_is_cached(self, server, client):
+        await client.validate_project()
+        await client.validate_project()
+
+        assert server.request_count == 1
+
+    @pytest.mark.asyncio
+    async def test_missing_project_is_reported(self, make_client):
+        client = make_client(project_id=2)
+
+        with pytest.raises(ProjectDoesNotExistError):
+            await client.create_issue("Title", "Description")
+        with pytest.raises(ProjectDoesNotExistError):
+            await client.find_issues("Title")
+
+    @pytest.mark.asyncio
+    async def test_issues_are_fetched_in_chunks(self, server, client):
+        issues = [server.add_issue(1, f"Title {i}") for i in range(150)]
+        issue_ids = [issue.get("iid", issue["id"]) for issue in issues]
+        await client.auth()
+        server.reset_counters()
+
+        fetched = await client.get_issues([*issue_ids, 999])
+
+        assert sorted(fetched) == issue_ids
+        assert fetched[issue_ids[-1]].title == "Title 149"
+        assert server.request_count == 2
+
+    @pytest.mark.asyncio
+    async def test_issue_fields_are_read_from_the_payload(self, server, client):
+        payload = server.add_issue(1, "Title")
+        closed_at = "2024-05-01T12:00:00+00:00"
+        expected: tuple[str, tuple[str, ...], tuple[str, ...], str]
+        if isinstance(server, FakeGitlabServer):
+            payload.update(
+                state="closed",
+                labels=["bug", "ui"],
+                assignees=[{"username": "alice"}, {"username": "bob"}],
+                milestone={"title": "1.0"},
+                closed_at=closed_at,
+            )
+            expected = ("closed", ("bug", "ui"), ("alice", "bob"), "benchmark")
+        else:
+            payload.update(
+                status={"id": 5, "name": "Closed"},
+                assigned_to={"id": 2, "name": "Alice"},
+                fixed_version={"id": 1, "name": "1.0"},
+                closed_on=closed_at,
+                attachments=[
+                    {
+                        "id": 1,
+                        "filename": "log.txt",
+                        "filesize": 3,
+                        "content_type": "text/plain",
+                        "content_url": f"{server.url}/attachments/download/1/log.txt",
+                    }
+                ],
+            )
+            expected = ("Closed", (), ("Alice",), "Benchmark")
+        await client.auth()
+        server.reset_counters()
+
+        [issue] = await client.find_issues("Title")
+
+        assert (issue.state, issue.labels, issue.assignees, issue.author) == expected
+        assert issue.milestone == "1.0"
+        assert issue.closed_at == datetime.fromisoformat(closed_at)
+        assert issue.created_at is not None
+        if isinstance(server, FakeRedmineServer):
+            assert issue.attachments[0].filename == "log.txt"
+        assert server.request_count == 1
+
+    @pytest.mark.asyncio
+    async def test_uploaded_file_can_be_found_and_downloaded(self, client):
+        content = b"x" * 100_000
+        upload = await client.upload_attachment(
+            "build log.txt", io.BytesIO(content), "text/plain"
+        )
+        issue = await client.create_issue(
+            "Title", f"See [the log]({upload.url}).", attachments=[upload]
+        )
+        file = io.BytesIO()
+
+        [reference] = await client.find_attachments(issue, issue.description)
+        await client.download_attachment(reference.attachment, file, chunk_size=4096)
+
+        assert reference.attachment.filename == "build log.txt"
+        assert issue.description[reference.start : reference.end] == upload.url
+        assert file.getvalue() == content
+
+    @pytest.mark.asyncio
+    async def test_uploaded_file_is_read_in_chunks(self, client):
+        class RecordingFile(io.BytesIO):
+            def read(self, size=-1):
+                sizes.append(size)
+                return super().read(size)
+
+        sizes: list[int | None] = []
+        content = b"x" * 100_000
+
+        upload = await client.upload_attachment(
+            "build.log", RecordingFile(content), "text/plain"
+        )
+        issue = await client.create_issue(
+            "Title", f"See [the log]({upload.url}).", attachments=[upload]
+        )
+        file = io.BytesIO()
+        [reference] = await client.find_attachments(issue, issue.description)
+        await client.download_attachment(reference.attachment, file)
+
+        assert file.getvalue() == content
+        assert all(size is not None and 0 <= size < len(content) for size in sizes)
+
+    @pytest.mark.asyncio
+    async def test_missing_file_cannot_be_downloaded(self, server, client):
+        url = (
+            "/uploads/0123456789abcdef0123456789abcdef/a.txt"
+            if isinstance(server, FakeGitlabServer)
+            else f"{server.url}/attachments/download/999/a.txt"
+        )
+
+        with pytest.raises(AttachmentDoesNotExistError):
+            await client.download_attachment(Attachment("a.txt", url), io.BytesIO())
+
+    @pytest.mark.asyncio
+    async def test_created_notes_are_listed_in_order(self, client):
+        issue = await client.create_issue("Title", "Description")
+        for index in range(5):
+            await client.create_note(issue.id, f"Comment {index}")
+
+        notes = [note async for note in client.iter_notes(issue.id, page_size=2)]
+
+        assert [note.body for note in notes] == [f"Comment {i}" for i in range(5)]
+        assert notes[0].author is not None
+
+    @pytest.mark.asyncio
+    async def test_notes_of_missing_issue_cannot_be_listed(self, client):
+        with pytest.raises(IssueDoesNotExistError):
+            [note async for note in client.iter_notes(999)]
+
+
+class TestInstrumentation:
+    @pytest.fixture
+    def profiler(self):
+        profiler = CallProfiler()
+        add_call_hook(profiler)
+        yield profiler
+        remove_call_hook(profiler)
+
+    @staticmethod
+    def make_event(operation, duration, **kwargs):
+        return CallEvent(
+            backend="gitlab",
+            operation=operation,
+            start_time=1_700_000_000.0,
+            duration=duration,
+            **kwargs,
+        )
+
+    @pytest.mark.asyncio
+    async def test_requests_are_recorded_in_innermost_call(self, profiler):
+        response = TestRateLimitedAdapter.make_response(200, **{"Content-Length": "12"})
+        response.request = TestRateLimitedAdapter.make_request("GET")
+
+        async with track_call("gitlab", "find_issues"):
+            async with track_call("gitlab", "list_issues"):
+                # the executor runs the adapter in a copy of the current context
+                await BlockingExecutor().run(record_response, response)
+
+        inner, outer = profiler.events
+        assert (inner.operation, inner.requests) == ("list_issues", 1)
+        assert (inner.status, inner.bytes_received) == (200, 12)
+        assert inner.parent_span_id == outer.span_id
+        assert (outer.operation, outer.requests) == ("find_issues", 0)
+        assert outer.duration >= inner.duration
+
+    @pytest.mark.asyncio
+    async def test_failed_call_is_recorded_with_error(self, profiler):
+        with pytest.raises(IssueDoesNotExistError):
+            async with track_call("redmine", "get_issue"):
+                raise IssueDoesNotExistError(1)
+
+        assert profiler.events[0].error == "IssueDoesNotExistError"
+
+    @pytest.mark.asyncio
+    async def test_scoped_hook_receives_only_calls_of_its_task(self):
+        profiler = CallProfiler()
+
+        async def call(operation):
+            async with track_call("gitlab", operation):
+                await asyncio.sleep(0)
+
+        async def measured():
+            with scoped_call_hook(profiler):
+                await asyncio.gather(call("inner"), call("inner"))
+
+        await asyncio.gather(measured(), call("outer"), call("outer"))
+
+        assert [event.operation for event in profiler.events] == ["inner", "inner"]
+
+    def test_calls_are_recorded_in_metrics(self):
+        labels = {"backend": "gitlab", "operation": "get_issue", "outcome": "error"}
+        calls = API_CALLS.get(**labels)
+        throttled = API_THROTTLED.get(backend="gitlab")
+
+        record_metrics(
+            self.make_event(
+                "get_issue", 0.2, requests=3, retries=2, throttled=1, error="ValueError"
+            )
+        )
+
+        assert API_CALLS.get(**labels) == calls + 1
+        assert API_THROTTLED.get(backend="gitlab") == throttled + 1
+
+    def test_summary_of_operations(self):
+        profiler = CallProfiler(
+            [self.make_event("get_issue", duration / 1000) for duration in range(1, 21)]
+            + [self.make_event("create_issue", 0.5, error="ValueError")]
+        )
+
+        create_issue, get_issue = profiler.summary()
+
+        assert (create_issue.count, create_issue.errors) == (1, 1)
+        assert (get_issue.count, get_issue.p50, get_issue.p95, get_issue.max) == (
+            20,
+            0.010,
+            0.019,
+            0.020,
+        )
+
+    def test_calls_are_written_as_spans(self):
+        parent = self.make_event("find_issues", 0.2, span_id="1" * 16)
+        child = self.make_event(
+            "list_issues", 0.1, span_id="2" * 16, parent_span_id="1" * 16, status=200
+        )
+        file = io.StringIO()
+
+        CallProfiler([parent, child]).write_spans(file)
+
+        document = json.loads(file.getvalue())
+        spans = document["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert [span["name"] for span in spans] == [
+            "gitlab.find_issues",
+            "gitlab.list_issues",
+        ]
+        assert spans[1]["parentSpanId"] == spans[0]["spanId"]
+        assert int(spans[1]["endTimeUnixNano"]) - int(
+            spans[1]["startTimeUnixNano"]
+        ) == pytest.approx(100_000_000, abs=1000)
+        assert {
+            "key": "http.response.status_code",
+            "value": {"intValue": "200"},
+        } in spans[1]["attributes"]
+
+
+class TestCurrentUserCache:
+    @pytest.mark.asyncio
+    async def test_get_fetches_user_only_once(self):
+        cache: CurrentUserCache[str] = CurrentUserCache()
+        fetch = mock.AsyncMock(return_value="user")
+
+        assert await cache.get(fetch) == "user"
+        assert await cache.get(fetch) == "user"
+
+        fetch.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_gets_wait_for_a_single_fetch(self):
+        cache: CurrentUserCache[str] = CurrentUserCache()
+        fetch = mock.AsyncMock(return_value="user")
+
+        users = await asyncio.gather(*(cache.get(fetch) for _ in range(5)))
+
+        assert users == ["user"] * 5
+        fetch.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_invalidate_drops_cached_user(self):
+        cache: CurrentUserCache[str] = CurrentUserCache()
+        fetch = mock.AsyncMock(side_effect=["user", "other user"])
+        await cache.get(fetch)
+
+        cache.invalidate()
+
+        assert cache.user is None
+        assert await cache.get(fetch) == "other user"
+
+    @pytest.mark.asyncio
+    async def test_expired_user_is_fetched_again(self, monkeypatch):
+        cache: CurrentUserCache[str] = CurrentUserCache(ttl=10)
+        fetch = mock.AsyncMock(side_effect=["user", "other user"])
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now)
+        await cache.get(fetch)
+
+        monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+
+        assert await cache.get(fetch) == "other user"
+
+    @pytest.mark.asyncio
+    async def test_gitlab_client_authenticates_once(self):
+        gitlab = mock.Mock(spec=Gitlab, user=mock.Mock(username="user"))
+        client = GitlabInstanceClient(gitlab)
+
+        assert await client.auth() == "user"
+        await client.get_user()
+
+        gitlab.auth.assert_called_once_with()
+
+
+class TestIssueCache:
+    @pytest.fixture
+    def cache(self, tmp_path):
+        return IssueCache(tmp_path / "cache.sqlite3", max_entries=2)
+
+    @pytest.fixture
+    def issue(self):
+        return Issue(
+            id=1,
+            title="Title",
+            description="Description",
+            web_url="memory:///issue/1",
+            reference="#1",
+            updated_at=datetime(2024, 1, 1, tzinfo=UTC),
+            labels=("bug",),
+            attachments=(Attachment("log.txt", "memory:///log.txt", size=3),),
+        )
+
+    def test_get_returns_stored_issue(self, cache, issue):
+        cache.put("instance", "project", [issue])
+
+        cached = cache.get("instance", "project", 1)
+
+        assert cached.issue == issue
+        assert cached.age() < 1
+        assert cache.get("instance", "other project", 1) is None
+
+    def test_least_recently_used_issues_are_evicted(self, cache, issue, monkeypatch):
+        now = time.time()
+        for offset, issue_id in enumerate([1, 2, 3]):
+            monkeypatch.setattr(time, "time", lambda offset=offset: now + offset)
+            if issue_id == 3:
+                cache.get("instance", "project", 1)
+            cache.put("instance", "project", [attr.evolve(issue, id=issue_id)])
+
+        assert cache.get("instance", "project", 1) is not None
+        assert cache.get("instance", "project", 2) is None
+        assert cache.get("instance", "project", 3) is not None
+
+    def test_stats_and_clear(self, cache, issue):
+        cache.put("instance", "project", [issue])
+        cache.get("instance", "project", 1)
+
+        stats = cache.stats()
+        cache.clear()
+
+        assert (stats.entries, stats.projects, stats.hits) == (1, 1, 1)
+        assert cache.stats().entries == 0
+
+
+class TestCachedIssueClient:
+    @pytest.fixture
+    def client(self):
+        return InMemoryIssueClient()
+
+    @pytest.fixture
+    def cached_client(self, client, tmp_path):
+        return CachedIssueClient(
+            client, IssueCache(tmp_path / "cache.sqlite3"), "instance", "project"
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_issue_is_served_from_cache(self, client, cached_client):
+        issue = await client.create_issue("Title", "Description")
+        await cached_client.get_issue(issue.id)
+        client.get_issue = mock.AsyncMock(side_effect=AssertionError)
+
+        assert await cached_client.get_issue(issue.id) == issue
+
+    @pytest.mark.asyncio
+    async def test_stale_issue_is_fetched_again(self, client, cached_client):
+        issue = await client.create_issue("Title", "Description")
+        await cached_client.get_issue(issue.id)
+        client.issues[issue.id] = updated_issue = attr.evolve(issue, title="New")
+        cached_client.max_age = -1
+
+        assert await cached_client.get_issue(issue.id) == updated_issue
+
+    @pytest.mark.asyncio
+    async def test_issue_changed_in_source_is_not_served_stale(
+        self, client, cached_client
+    ):
+        issues = [await client.create_issue(f"Title {i}", "") for i in range(2)]
+        await cached_client.get_issues([issue.id for issue in issues])
+        updated_issue = await client.update_issue(issues[0].id, "New", "")
+        client.get_issue = mock.AsyncMock(side_effect=AssertionError)
+        client.get_issues = mock.AsyncMock(side_effect=AssertionError)
+
+        assert await cached_client.get_issues([issue.id for issue in issues]) == {
+            issues[0].id: updated_issue,
+            issues[1].id: issues[1],
+        }
+
+    @pytest.mark.asyncio
+    async def test_recently_validated_issues_are_served_without_requests(
+        self, client, cached_client
+    ):
+        issue = await client.create_issue("Title", "Description")
+        await cached_client.get_issue(issue.id)
+        await cached_client.get_issue(issue.id)
+        client.iter_issues = mock.Mock(side_effect=AssertionError)
+        client.get_issue = mock.AsyncMock(side_effect=AssertionError)
+        other_client = CachedIssueClient(
+            client, cached_client.cache, "instance", "project"
+        )
+
+        assert await cached_client.get_issue(issue.id) == issue
+        assert await other_client.get_issue(issue.id) == issue
+
+    @pytest.mark.asyncio
+    async def test_listing_issues_warms_cache(self, client, cached_client):
+        issues = [await client.create_issue(f"Title {i}", "") for i in range(3)]
+        async for _ in cached_client.iter_issues(page_size=2):
+            pass
+        client.get_issue = mock.AsyncMock(side_effect=AssertionError)
+
+        assert [await cached_client.get_issue(issue.id) for issue in issues] == issues
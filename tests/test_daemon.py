@@ -0,0 +1,173 @@
+import asyncio
+import tempfile
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import cast
+
+import pytest
+import pytest_asyncio
+from issx.daemon import (
+    ClientConfigurationError,
+    CommandRunner,
+    DaemonClient,
+    DaemonServer,
+    RemoteError,
+)
+from issx.domain.issues import Issue
+from issx.instance_managers.config_parser import GenericConfigParser
+from issx.services import CopyPlan, CopyResult, PlanAction, SyncReport
+from issx.services.planning import PlanEntry
+
+ISSUE = Issue(
+    id=2,
+    title="Title",
+    description="Description",
+    web_url="memory://issue/2",
+    reference="#2",
+    updated_at=datetime(2024, 1, 1, tzinfo=UTC),
+)
+
+
+class FakeRunner:
+    def __init__(self, config):
+        self.config = config
+        self.closed = False
+
+    async def auth_verify(self, instance):
+        if instance != "instance":
+            raise ClientConfigurationError(f"Unknown instance {instance}")
+        return "memory://", "user"
+
+    async def copy(self, source, target, issue_id, **kwargs):
+        raise ValueError(f"Cannot copy {issue_id}")
+
+    async def copy_many(self, source, target, issue_ids, **kwargs):
+        yield CopyResult(1, issue=ISSUE)
+        yield CopyResult(3, error=ValueError("Error"))
+
+    async def copy_to_targets(self, source, targets, issue_ids, **kwargs):
+        for target in targets:
+            yield CopyResult(1, issue=ISSUE, target=target)
+
+    async def plan(self, source, target, issue_ids, **kwargs):
+        return CopyPlan(
+            entries=[
+                PlanEntry(1, PlanAction.create, "Title", "Description"),
+                PlanEntry(2, PlanAction.skip, "Title", target=ISSUE, found_by="title"),
+            ],
+            source=source,
+            target=target,
+        )
+
+    async def apply_plan(self, plan, **kwargs):
+        for entry in plan.entries:
+            yield CopyResult(entry.issue_id, issue=entry.target or ISSUE)
+
+    async def sync(self, source, target, **kwargs):
+        return SyncReport(updated=[ISSUE], errors={3: ValueError("Error")})
+
+    def close(self):
+        self.closed = True
+
+
+# the fake implements only the commands of the runner served by the daemon
+runner_factory = cast(Callable[[GenericConfigParser], CommandRunner], FakeRunner)
+
+
+class TestDaemon:
+    @pytest.fixture
+    def config_file(self, tmp_path):
+        config_file = tmp_path / "issx.toml"
+        config_file.write_text("[instances]\n")
+        return config_file
+
+    @pytest.fixture
+    def socket_path(self):
+        # paths of unix sockets are limited to about 100 characters
+        with tempfile.TemporaryDirectory() as directory:
+            yield Path(directory) / "daemon.sock"
+
+    @pytest_asyncio.fixture
+    async def server(self, config_file, socket_path):
+        server = DaemonServer(config_file, socket_path, runner_factory=runner_factory)
+        started = asyncio.Event()
+        task = asyncio.create_task(server.serve(started))
+        await started.wait()
+        yield server
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    @pytest.fixture
+    def client(self, socket_path):
+        return DaemonClient(socket_path)
+
+    @pytest.mark.asyncio
+    async def test_copy_results_are_streamed(self, server, client):
+        results = [result async for result in client.copy_many("a", "b", [1, 3])]
+
+        assert results[0] == CopyResult(1, issue=ISSUE)
+        assert (results[1].issue_id, repr(results[1].error)) == (
+            3,
+            "ValueError('Error')",
+        )
+
+    @pytest.mark.asyncio
+    async def test_copy_results_of_targets_are_streamed(self, server, client):
+        results = [
+            result async for result in client.copy_to_targets("a", ["b", "c"], [1])
+        ]
+
+        assert [result.target for result in results] == ["b", "c"]
+        assert results[0] == CopyResult(1, issue=ISSUE, target="b")
+
+    @pytest.mark.asyncio
+    async def test_plan_is_returned_and_applied(self, server, client):
+        plan = await client.plan("a", "b", [1, 2])
+        results = [result async for result in client.apply_plan(plan)]
+
+        assert (plan.source, plan.target) == ("a", "b")
+        assert plan.entries[1].target == ISSUE
+        assert [result.issue_id for result in results] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_sync_report_is_returned(self, server, client):
+        report = await client.sync("a", "b", full=True)
+
+        assert report.updated == [ISSUE]
+        assert list(report.errors) == [3]
+
+    @pytest.mark.asyncio
+    async def test_errors_are_raised_by_client(self, server, client):
+        assert await client.auth_verify("instance") == ("memory://", "user")
+        with pytest.raises(ClientConfigurationError):
+            await client.auth_verify("other")
+        with pytest.raises(RemoteError, match="Cannot copy 1"):
+            await client.copy("a", "b", 1)
+
+    @pytest.mark.asyncio
+    async def test_connect_requires_the_same_config_file(
+        self, server, config_file, socket_path, tmp_path
+    ):
+        # the ping blocks, so the server has to run in the meantime
+        client = await asyncio.to_thread(DaemonClient.connect, config_file, socket_path)
+        other_client = await asyncio.to_thread(
+            DaemonClient.connect, tmp_path / "other.toml", socket_path
+        )
+
+        assert isinstance(client, DaemonClient)
+        assert other_client is None
+
+    def test_connect_returns_none_without_daemon(self, config_file, socket_path):
+        assert DaemonClient.connect(config_file, socket_path) is None
+
+    def test_runner_is_recreated_when_config_changes(self, config_file, socket_path):
+        server = DaemonServer(config_file, socket_path, runner_factory=runner_factory)
+        runner = server.get_runner()
+        assert server.get_runner() is runner
+
+        config_file.write_text("[instances]\n\n")
+        server._config_mtime = -1.0
+
+        assert server.get_runner() is not runner
+        assert cast(FakeRunner, runner).closed
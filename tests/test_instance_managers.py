@@ -1,10 +1,12 @@
 import dataclasses
 import tomllib
 from pathlib import Path
+from unittest import mock
 
 import pytest
 from attr import define
 from issx.clients.gitlab import GitlabClient, GitlabInstanceClient
+from issx.clients.http import RateLimitedAdapter
 from issx.clients.redmine import RedmineClient, RedmineInstanceClient
 from issx.domain import SupportedBackend
 from issx.domain.config import InstanceConfig, ProjectFlatConfig
@@ -168,6 +170,88 @@ class TestInstanceManager:
 
         assert isinstance(manager.get_project_client("project_name"), GitlabClient)
 
+    def test_get_project_client_uses_optional_instance_settings(
+        self, config_dto: ConfigDto
+    ):
+        config_dto.data_dict["instances"][config_dto.instance_name]["max_workers"] = 3
+        manager = InstanceManager(GenericConfigParser.from_dict(config_dto.data_dict))
+
+        client = manager.get_project_client(config_dto.project_name)
+
+        assert isinstance(client, GitlabClient)
+        assert client.executor.max_workers == 3
+
+    def test_project_clients_of_the_same_instance_share_connection(
+        self, config_dto: ConfigDto
+    ):
+        config_dto.data_dict["projects"]["other_project"] = {
+            "instance": config_dto.instance_name,
+            "project": "200",
+        }
+        manager = InstanceManager(GenericConfigParser.from_dict(config_dto.data_dict))
+
+        client_1 = manager.get_project_client(config_dto.project_name)
+        client_2 = manager.get_project_client("other_project")
+
+        assert isinstance(client_1, GitlabClient)
+        assert isinstance(client_2, GitlabClient)
+        assert client_1.project_id != client_2.project_id
+        assert client_1.client is client_2.client
+        assert client_1.executor is client_2.executor
+        assert manager.get_instance_client(config_dto.instance_name) is (
+            manager.get_instance_client(config_dto.instance_name)
+        )
+
+    def test_close_closes_instance_clients(self, config, monkeypatch):
+        m_close = mock.Mock()
+        monkeypatch.setattr(GitlabInstanceClient, "close", m_close)
+
+        with InstanceManager(config) as manager:
+            manager.get_project_client("project_name")
+
+        m_close.assert_called_once_with()
+        assert manager._instance_clients == {}
+
+    def test_instance_settings_configure_connection_pool(self, config_dto: ConfigDto):
+        config_dto.data_dict["instances"][config_dto.instance_name][
+            "max_connections"
+        ] = 4
+        manager = InstanceManager(GenericConfigParser.from_dict(config_dto.data_dict))
+
+        client = manager.get_instance_client(config_dto.instance_name)
+
+        assert isinstance(client, GitlabInstanceClient)
+        adapter = client.client.session.get_adapter("https://gitlab.com")
+        assert adapter._pool_maxsize == 4  # type: ignore[attr-defined]
+
+    def test_instance_settings_configure_rate_limiting(self, config_dto: ConfigDto):
+        config_dto.data_dict["instances"][config_dto.instance_name].update(
+            rate_limit=5, max_retries=1
+        )
+        manager = InstanceManager(GenericConfigParser.from_dict(config_dto.data_dict))
+
+        client = manager.get_instance_client(config_dto.instance_name)
+
+        assert isinstance(client, GitlabInstanceClient)
+        adapter = client.client.session.get_adapter("https://gitlab.com")
+        assert isinstance(adapter, RateLimitedAdapter)
+        assert adapter.bucket.rate == 5
+        assert adapter.retries == 1
+
+    def test_backend_registered_by_import_path_is_imported_on_first_use(self, config):
+        InstanceManager.register_backend(
+            SupportedBackend.gitlab,
+            "issx.clients.gitlab:GitlabInstanceClient",
+            "issx.clients.gitlab:GitlabClient",
+        )
+        manager = InstanceManager(config)
+
+        assert isinstance(manager.get_project_client("project_name"), GitlabClient)
+        assert InstanceManager.backends[SupportedBackend.gitlab] == (
+            GitlabInstanceClient,
+            GitlabClient,
+        )
+
     def test_from_config_with_custom_instance_class(self, config_dto, monkeypatch):
         @define(kw_only=True)
         class CustomProjectFlatConfig(ProjectFlatConfig):
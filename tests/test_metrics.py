@@ -0,0 +1,69 @@
+import urllib.error
+import urllib.request
+
+import pytest
+from issx.metrics import MetricsRegistry, start_http_server
+
+
+class TestMetricsRegistry:
+    @pytest.fixture
+    def registry(self):
+        return MetricsRegistry()
+
+    def test_metrics_are_rendered_in_text_format(self, registry):
+        counter = registry.counter("calls_total", "Calls", ["backend"])
+        histogram = registry.histogram("duration_seconds", "Duration", buckets=[0.1, 1])
+        counter.inc(backend='git"lab')
+        counter.inc(2, backend='git"lab')
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        assert registry.render().splitlines() == [
+            "# HELP calls_total Calls",
+            "# TYPE calls_total counter",
+            'calls_total{backend="git\\"lab"} 3',
+            "# HELP duration_seconds Duration",
+            "# TYPE duration_seconds histogram",
+            'duration_seconds_bucket{le="0.1"} 0',
+            'duration_seconds_bucket{le="1"} 1',
+            'duration_seconds_bucket{le="+Inf"} 2',
+            "duration_seconds_sum 5.5",
+            "duration_seconds_count 2",
+        ]
+
+    def test_labels_have_to_match_label_names(self, registry):
+        counter = registry.counter("calls_total", "Calls", ["backend"])
+
+        with pytest.raises(ValueError, match="expects labels"):
+            counter.inc(operation="get_issue")
+
+    def test_metric_cannot_be_registered_twice(self, registry):
+        registry.gauge("last_sync", "Last sync")
+
+        with pytest.raises(ValueError, match="already registered"):
+            registry.counter("last_sync", "Last sync")
+
+    def test_textfile_is_replaced(self, registry, tmp_path):
+        registry.gauge("last_sync", "Last sync").set(1.5)
+        path = tmp_path / "issx.prom"
+        path.write_text("old")
+
+        registry.write_textfile(path)
+
+        assert path.read_text().endswith("last_sync 1.5\n")
+        assert [file.name for file in tmp_path.iterdir()] == ["issx.prom"]
+
+    def test_metrics_are_served_over_http(self, registry):
+        registry.counter("calls_total", "Calls").inc()
+        server = start_http_server(0, registry=registry)
+        host, port = str(server.server_address[0]), server.server_address[1]
+        try:
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+                body = response.read().decode()
+            with pytest.raises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"http://{host}:{port}/")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert "calls_total 1" in body
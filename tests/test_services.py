@@ -1,8 +1,34 @@
+import asyncio
+import io
+from datetime import UTC, datetime
+from unittest import mock
+
 import pytest
 import pytest_asyncio
+from issx.clients.exceptions import IssueDoesNotExistError
 from issx.clients.interfaces import IssueClientInterface
-from issx.domain.issues import Issue
-from issx.services import CopyIssueService
+from issx.domain.issues import Issue, Note
+from issx.domain.templates import TemplateError
+from issx.services import (
+    AttachmentTransferService,
+    CopyIssueService,
+    CopyPlan,
+    CopyPlanner,
+    FanOutCopyService,
+    IssueMapping,
+    IssueMappingStore,
+    IssueTitleIndex,
+    JobDoesNotExistError,
+    JobStore,
+    NoteCopyService,
+    PlanAction,
+    PlanConflictError,
+    ProjectRef,
+    SyncService,
+    SyncStateStore,
+)
+from issx.services.attachments import ByteBudget
+from issx.services.copying import COPY_FAILURES, DUPLICATES_SKIPPED, ISSUES_COPIED
 
 from tests.memory_clients import InMemoryIssueClient
 
@@ -125,3 +151,848 @@ class TestCopyIssueService:
         copied_issue = await service.copy(issue.id, assign_to_me=True)
 
         assert copied_issue.assignee == client_2.auth()  # type: ignore[attr-defined]
+
+    @pytest.mark.asyncio
+    async def test_copy_many_yields_result_for_every_issue(self, client_1, client_2):
+        issues = [
+            await client_1.create_issue(f"Title {i}", "Description") for i in range(5)
+        ]
+        service = CopyIssueService(client_1, client_2)
+
+        results = [
+            result
+            async for result in service.copy_many(
+                [issue.id for issue in issues], max_concurrency=2
+            )
+        ]
+
+        assert sorted(result.issue_id for result in results) == [
+            issue.id for issue in issues
+        ]
+        assert all(result.ok for result in results)
+        assert sorted(issue.title for issue in client_2.issues.values()) == [
+            issue.title for issue in issues
+        ]
+
+    @pytest.mark.asyncio
+    async def test_copy_many_reports_errors_without_stopping(
+        self, client_1, client_2, issue: Issue
+    ):
+        service = CopyIssueService(client_1, client_2)
+
+        results = {
+            result.issue_id: result
+            async for result in service.copy_many([issue.id, 999, issue.id])
+        }
+
+        assert results.keys() == {issue.id, 999}
+        assert results[issue.id].issue == await client_2.get_issue(1)
+        assert isinstance(results[999].error, IssueDoesNotExistError)
+
+    @pytest.mark.asyncio
+    async def test_copy_many_respects_max_concurrency(self, client_1, client_2):
+        issues = [
+            await client_1.create_issue(f"Title {i}", "Description") for i in range(6)
+        ]
+        in_flight = max_in_flight = 0
+        create_issue = client_2.create_issue
+
+        async def slow_create_issue(*args, **kwargs):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return await create_issue(*args, **kwargs)
+
+        client_2.create_issue = slow_create_issue
+        service = CopyIssueService(client_1, client_2)
+
+        async for _ in service.copy_many(
+            [issue.id for issue in issues], max_concurrency=3
+        ):
+            pass
+
+        assert max_in_flight == 3
+
+    @pytest.mark.asyncio
+    async def test_copy_many_fetches_source_issues_at_once(self, client_1, client_2):
+        issues = [
+            await client_1.create_issue(f"Title {i}", "Description") for i in range(3)
+        ]
+        client_1.get_issue = mock.AsyncMock(side_effect=AssertionError)
+        client_1.get_issues = mock.AsyncMock(
+            return_value={issue.id: issue for issue in issues}
+        )
+        service = CopyIssueService(client_1, client_2)
+
+        results = [
+            result async for result in service.copy_many([issue.id for issue in issues])
+        ]
+
+        assert all(result.ok for result in results)
+        client_1.get_issues.assert_awaited_once_with([issue.id for issue in issues])
+
+    @pytest.mark.asyncio
+    async def test_copy_many_finds_duplicates_without_searching(
+        self, client_1, client_2, issue: Issue
+    ):
+        existing_issue = await client_2.create_issue(issue.title, "Description")
+        client_2.find_issues = mock.AsyncMock(side_effect=AssertionError)
+        service = CopyIssueService(client_1, client_2)
+
+        results = [result async for result in service.copy_many([issue.id])]
+
+        assert results[0].issue == existing_issue
+        assert len(client_2.issues) == 1
+
+    @pytest.mark.asyncio
+    async def test_copy_finds_mapped_issue_without_searching(
+        self, client_1, client_2, issue: Issue, tmp_path
+    ):
+        mapping = IssueMapping(
+            IssueMappingStore(tmp_path / "mappings.sqlite3"),
+            ProjectRef("memory", "1"),
+            ProjectRef("memory", "2"),
+        )
+        copied_issue = await CopyIssueService(client_1, client_2, mapping=mapping).copy(
+            issue.id
+        )
+        client_2.find_issues = mock.AsyncMock(side_effect=AssertionError)
+
+        service = CopyIssueService(client_1, client_2, mapping=mapping)
+
+        assert await service.copy(issue.id, title_format="Other {title}") == (
+            copied_issue
+        )
+        assert mapping.get_target_id(issue.id) == copied_issue.id
+
+    @pytest.mark.asyncio
+    async def test_copy_many_creates_issues_with_same_title_once(
+        self, client_1, client_2
+    ):
+        issues = [await client_1.create_issue("Title", str(i)) for i in range(3)]
+        service = CopyIssueService(client_1, client_2)
+
+        results = [result async for result in service.copy_many([i.id for i in issues])]
+
+        assert len(client_2.issues) == 1
+        assert {result.issue for result in results} == set(client_2.issues.values())
+        assert service.title_index is None
+
+    @pytest.mark.asyncio
+    async def test_copy_many_rejects_invalid_template_before_requests(
+        self, client_1, client_2
+    ):
+        client_1.get_issue = mock.AsyncMock(side_effect=AssertionError)
+        service = CopyIssueService(client_1, client_2)
+
+        with pytest.raises(TemplateError):
+            async for _ in service.copy_many([1], title_format="{unknown}"):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_copies_are_counted_in_metrics(
+        self, client_1, client_2, issue: Issue
+    ):
+        service = CopyIssueService(client_1, client_2)
+        copied = ISSUES_COPIED.get()
+        skipped = DUPLICATES_SKIPPED.get(found_by="title")
+        failed = COPY_FAILURES.get()
+
+        await service.copy(issue.id)
+        await service.copy(issue.id)
+        with pytest.raises(IssueDoesNotExistError):
+            await service.copy(404)
+
+        assert ISSUES_COPIED.get() == copied + 1
+        assert DUPLICATES_SKIPPED.get(found_by="title") == skipped + 1
+        assert COPY_FAILURES.get() == failed + 1
+
+
+class TestFanOutCopyService:
+    @pytest.fixture
+    def source_client(self):
+        return InMemoryIssueClient(base_url="memory://source")
+
+    @pytest.fixture
+    def target_clients(self):
+        return {
+            name: InMemoryIssueClient(base_url=f"memory://{name}")
+            for name in ("a", "b", "c")
+        }
+
+    @pytest.fixture
+    def service(self, source_client, target_clients):
+        return FanOutCopyService(
+            source_client,
+            {
+                name: CopyIssueService(source_client, client)
+                for name, client in target_clients.items()
+            },
+        )
+
+    @pytest.mark.asyncio
+    async def test_issues_are_fetched_once_and_copied_to_all_targets(
+        self, source_client, target_clients, service
+    ):
+        issues = [await source_client.create_issue(f"Title {i}", "") for i in range(2)]
+        source_client.get_issue = mock.AsyncMock(side_effect=AssertionError)
+        source_client.get_issues = mock.AsyncMock(
+            return_value={issue.id: issue for issue in issues}
+        )
+
+        results = [
+            result
+            async for result in service.copy_many(
+                [issue.id for issue in issues], title_formats={"b": "B: {title}"}
+            )
+        ]
+
+        source_client.get_issues.assert_awaited_once()
+        assert sorted((result.target, result.issue_id) for result in results) == [
+            (name, issue.id) for name in ("a", "b", "c") for issue in issues
+        ]
+        assert all(result.ok for result in results)
+        assert [issue.title for issue in target_clients["b"].issues.values()] == [
+            "B: Title 0",
+            "B: Title 1",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_failing_target_does_not_stop_others(
+        self, source_client, target_clients, service
+    ):
+        issue = await source_client.create_issue("Title", "Description")
+        target_clients["a"].create_issue = mock.AsyncMock(side_effect=ValueError)
+
+        results = {
+            result.target: result async for result in service.copy_many([issue.id])
+        }
+
+        assert isinstance(results["a"].error, ValueError)
+        assert results["b"].ok and results["c"].ok
+
+    @pytest.mark.asyncio
+    async def test_slow_target_does_not_hold_back_others(
+        self, source_client, target_clients, service
+    ):
+        issue = await source_client.create_issue("Title", "Description")
+        released = asyncio.Event()
+        create_issue = target_clients["a"].create_issue
+
+        async def slow_create_issue(*args, **kwargs):
+            await released.wait()
+            return await create_issue(*args, **kwargs)
+
+        target_clients["a"].create_issue = slow_create_issue
+        results = service.copy_many([issue.id])
+
+        first, second = [await anext(results), await anext(results)]
+        released.set()
+        last = await anext(results)
+
+        assert {first.target, second.target} == {"b", "c"}
+        assert last.target == "a"
+
+
+class TestAttachmentTransferService:
+    @pytest.fixture
+    def source(self):
+        source = InMemoryIssueClient(base_url="memory://source")
+        source.files = {"/files/1/a.png": b"image", "/files/2/b.png": b"image"}
+        return source
+
+    @pytest.fixture
+    def target(self):
+        return InMemoryIssueClient(base_url="memory://target")
+
+    @pytest.fixture
+    def service(self, source, target):
+        return AttachmentTransferService(source, target, max_bytes_in_flight=3)
+
+    @pytest.mark.asyncio
+    async def test_references_are_rewritten_to_uploads(self, service, source, target):
+        issue = await source.create_issue("Title", "")
+        target.files["/files/1/other.txt"] = b"other"
+
+        transferred = await service.transfer(
+            issue, "![a](/files/1/a.png) and again /files/1/a.png"
+        )
+
+        assert transferred.text == "![a](/files/2/a.png) and again /files/2/a.png"
+        assert target.files["/files/2/a.png"] == b"image"
+        assert len(transferred.uploads) == 1
+
+    @pytest.mark.asyncio
+    async def test_same_content_is_uploaded_once(self, service, source, target):
+        issue = await source.create_issue("Title", "")
+
+        first = await service.transfer(issue, "/files/1/a.png")
+        second = await service.transfer(issue, "/files/2/b.png")
+
+        assert first.text == second.text == "/files/1/a.png"
+        assert list(target.files) == ["/files/1/a.png"]
+
+    @pytest.mark.asyncio
+    async def test_missing_files_keep_their_references(self, service, source):
+        issue = await source.create_issue("Title", "")
+
+        transferred = await service.transfer(issue, "/files/3/c.png /files/1/a.png")
+
+        assert transferred.text == "/files/3/c.png /files/1/a.png"
+        assert [attachment.url for attachment in transferred.missing] == [
+            "/files/3/c.png"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_copy_transfers_files_of_description(self, source, target, service):
+        issue = await source.create_issue("Title", "See /files/1/a.png")
+
+        copied = await CopyIssueService(source, target, attachments=service).copy(
+            issue.id
+        )
+
+        assert copied.description == "See /files/1/a.png"
+        assert target.files == {"/files/1/a.png": b"image"}
+
+    @pytest.mark.asyncio
+    async def test_byte_budget_limits_concurrent_uploads(self):
+        budget = ByteBudget(10)
+        events = []
+
+        async def transfer(name, size):
+            async with budget.reserve(size):
+                events.append(f"start {name}")
+                await asyncio.sleep(0)
+                events.append(f"end {name}")
+
+        await asyncio.gather(transfer("a", 6), transfer("b", 6), transfer("c", 20))
+
+        assert events == ["start a", "end a", "start b", "end b", "start c", "end c"]
+
+
+class TestNoteCopyService:
+    @pytest_asyncio.fixture
+    async def source(self):
+        source = InMemoryIssueClient(base_url="memory://source")
+        issue = await source.create_issue("Title", "Description")
+        for body in ("first", "second", "third"):
+            await source.create_note(issue.id, body)
+        return source
+
+    @pytest.fixture
+    def target(self):
+        return InMemoryIssueClient(base_url="memory://target")
+
+    @pytest.mark.asyncio
+    async def test_notes_are_copied_in_order_with_markers(self, source, target):
+        target_issue = await target.create_issue("Title", "Description")
+
+        result = await NoteCopyService(source, target).copy(1, target_issue.id)
+
+        assert (result.created, result.skipped) == (3, 0)
+        assert [note.body for note in target.notes[target_issue.id]] == [
+            "first\n\n<!-- issx:note 1 -->",
+            "second\n\n<!-- issx:note 2 -->",
+            "third\n\n<!-- issx:note 3 -->",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_notes_copied_before_are_skipped(self, source, target):
+        target_issue = await target.create_issue("Title", "Description")
+        service = NoteCopyService(source, target, preserve_order=False)
+        await service.copy(1, target_issue.id)
+        await source.create_note(1, "fourth")
+
+        result = await service.copy(1, target_issue.id)
+
+        assert (result.created, result.skipped) == (1, 3)
+        assert len(target.notes[target_issue.id]) == 4
+
+    def test_body_mentions_author_and_date(self):
+        note = Note(
+            id=7,
+            body="Hello",
+            author="john",
+            created_at=datetime(2024, 5, 1, 12, tzinfo=UTC),
+        )
+
+        assert NoteCopyService.prepare_body(note) == (
+            "_Posted by john on 2024-05-01_\n\nHello\n\n<!-- issx:note 7 -->"
+        )
+
+    @pytest.mark.asyncio
+    async def test_copy_syncs_notes_of_duplicates(self, source, target):
+        service = CopyIssueService(
+            source, target, notes=NoteCopyService(source, target)
+        )
+        copied = await service.copy(1)
+        await source.create_note(1, "fourth")
+
+        duplicate = await service.copy(1)
+
+        assert duplicate == copied
+        assert [note.body.partition("\n")[0] for note in target.notes[copied.id]] == [
+            "first",
+            "second",
+            "third",
+            "fourth",
+        ]
+
+
+class TestCopyPlanner:
+    @pytest.fixture
+    def source(self):
+        return InMemoryIssueClient(
+            [
+                Issue(id=1, title="New", description="One"),
+                Issue(id=2, title="Copied", description="Two"),
+                Issue(id=3, title="Mapped", description="Three"),
+                Issue(id=4, title="Ambiguous", description="Four"),
+                Issue(id=5, title="New", description="Five"),
+            ],
+            base_url="memory://source",
+        )
+
+    @pytest.fixture
+    def target(self):
+        return InMemoryIssueClient(
+            [
+                Issue(id=1, title="Copied", description="Two"),
+                Issue(id=2, title="Renamed", description="Three"),
+                Issue(id=3, title="Ambiguous", description=""),
+                Issue(id=4, title="Ambiguous", description=""),
+            ],
+            base_url="memory://target",
+        )
+
+    @pytest.fixture
+    def mapping(self, tmp_path):
+        store = IssueMappingStore(tmp_path / "mappings.sqlite3")
+        mapping = IssueMapping(
+            store, ProjectRef("instance", "source"), ProjectRef("instance", "target")
+        )
+        mapping.add(3, 2)
+        yield mapping
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_issues_are_planned_without_changes(self, source, target, mapping):
+        planner = CopyPlanner(source, target, mapping=mapping)
+
+        plan = await planner.plan(
+            [1, 2, 3, 4, 5, 6], description_format="> {description}"
+        )
+
+        assert [(entry.issue_id, entry.action) for entry in plan.entries] == [
+            (1, PlanAction.create),
+            (2, PlanAction.skip),
+            (3, PlanAction.skip),
+            (4, PlanAction.conflict),
+            (5, PlanAction.conflict),
+            (6, PlanAction.conflict),
+        ]
+        assert plan.entries[0].description == "> One"
+        assert [entry.found_by for entry in plan.get_entries(PlanAction.skip)] == [
+            "title",
+            "mapping",
+        ]
+        assert plan.entries[4].reason == (
+            "Issue 1 is planned to be copied with the same title"
+        )
+        assert len(target.issues) == 4
+        assert plan.estimate.requests == 1
+
+    @pytest.mark.asyncio
+    async def test_duration_is_estimated_with_rate_limit(self, source, target):
+        plan = await CopyPlanner(source, target).plan(
+            range(1, 6), allow_duplicates=True, rate_limit=2, rate_limit_burst=1
+        )
+
+        assert plan.estimate.requests == 5
+        assert plan.estimate.seconds == 2
+
+    @pytest.mark.asyncio
+    async def test_plan_is_applied_without_fetching_source(
+        self, source, target, mapping
+    ):
+        plan = await CopyPlanner(source, target, mapping=mapping).plan([1, 2, 6])
+        file = io.StringIO()
+        plan.write(file)
+        file.seek(0)
+        source.issues.clear()
+        service = CopyIssueService(source, target, mapping=mapping)
+
+        results = {
+            result.issue_id: result
+            async for result in service.apply_plan(CopyPlan.read(file))
+        }
+
+        assert results[1].issue == target.issues[5]
+        assert results[2].issue == target.issues[1]
+        assert isinstance(results[6].error, PlanConflictError)
+        assert mapping.get_target_id(1) == 5
+
+    @pytest.mark.asyncio
+    async def test_applying_plan_again_does_not_create_issues(
+        self, source, target, mapping
+    ):
+        plan = await CopyPlanner(source, target, mapping=mapping).plan([1])
+        service = CopyIssueService(source, target, mapping=mapping)
+        [first] = [result async for result in service.apply_plan(plan)]
+
+        [second] = [result async for result in service.apply_plan(plan)]
+
+        assert second.issue == first.issue
+        assert len(target.issues) == 5
+
+
+class TestJobJournal:
+    @pytest.fixture
+    def store(self, tmp_path):
+        return JobStore(tmp_path)
+
+    @pytest.fixture
+    def source(self):
+        return InMemoryIssueClient(base_url="memory://source")
+
+    @pytest.fixture
+    def target(self):
+        return InMemoryIssueClient(base_url="memory://target")
+
+    @pytest.fixture
+    def header(self):
+        return {"source": "source", "targets": ["target"], "issue_ids": [1, 2]}
+
+    async def _run(self, store, header, source, target, notes=False, **kwargs):
+        with store.open("job", header) as journal:
+            service = CopyIssueService(
+                source,
+                target,
+                notes=NoteCopyService(source, target) if notes else None,
+                journal=journal.for_target("target"),
+            )
+            return [
+                result
+                async for result in service.copy_many(header["issue_ids"], **kwargs)
+            ]
+
+    @pytest.mark.asyncio
+    async def test_resumed_job_skips_copied_issues(self, store, header, source, target):
+        for i in range(2):
+            await source.create_issue(f"Title {i}", "")
+        first = await self._run(store, header, source, target)
+        source.get_issues = mock.AsyncMock(return_value={})
+        target.create_issue = mock.AsyncMock(side_effect=AssertionError)
+        target.iter_issues = mock.Mock(side_effect=AssertionError)
+
+        resumed = await self._run(store, header, source, target)
+
+        source.get_issues.assert_awaited_once_with([])
+        assert sorted(resumed, key=lambda result: result.issue_id) == sorted(
+            first, key=lambda result: result.issue_id
+        )
+
+    @pytest.mark.asyncio
+    async def test_interrupted_creation_is_resolved_without_duplicate(
+        self, store, header, source, target
+    ):
+        for i in range(2):
+            await source.create_issue(f"Title {i}", "")
+        with store.open("job", header) as journal:
+            await journal.start("target", 1, "Title 0")
+            await journal.start("target", 2, "Title 1")
+        # only the first creation reached the target before the crash
+        created = await target.create_issue("Title 0", "")
+
+        results = await self._run(store, header, source, target, allow_duplicates=True)
+
+        issues = {result.issue_id: result.issue for result in results}
+        assert issues[1] == created
+        assert issues[2].title == "Title 1"
+        assert len(target.issues) == 2
+
+    @pytest.mark.asyncio
+    async def test_interrupted_copy_of_notes_is_finished_on_resume(
+        self, store, header, source, target
+    ):
+        for i in range(2):
+            await source.create_issue(f"Title {i}", "")
+        for body in ("first", "second"):
+            await source.create_note(1, body)
+        create_note = target.create_note
+        calls = 0
+
+        async def flaky_create_note(issue_id, body):
+            nonlocal calls
+            calls += 1
+            if calls == 2:
+                raise ConnectionError
+            await create_note(issue_id, body)
+
+        target.create_note = flaky_create_note
+        results = await self._run(store, header, source, target, notes=True)
+        first = {result.issue_id: result for result in results}
+
+        resumed = await self._run(store, header, source, target, notes=True)
+
+        assert not first[1].ok and first[2].ok
+        assert all(result.ok for result in resumed)
+        assert len(target.issues) == 2
+        [copy] = [issue for issue in target.issues.values() if issue.title == "Title 0"]
+        assert [note.body.split("\n")[0] for note in target.notes[copy.id]] == [
+            "first",
+            "second",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_incomplete_last_record_is_discarded(
+        self, store, header, source, target
+    ):
+        await source.create_issue("Title", "")
+        await self._run(store, header, source, target)
+        with (store.directory / "job.jsonl").open("a") as file:
+            file.write('{"event": "started", "tar')
+
+        with store.open("job", header) as journal:
+            assert journal.get_copied("target", 1).title == "Title"
+            await journal.start("target", 2, "Other")
+        with store.open("job", header) as journal:
+            assert journal.get_in_flight("target", 2) == "Other"
+
+    def test_job_cannot_change_its_header(self, store, header):
+        store.open("job", header).close()
+
+        with pytest.raises(ValueError):
+            store.open("job", {**header, "issue_ids": [3]})
+        with pytest.raises(JobDoesNotExistError):
+            store.read_header("other")
+        assert store.read_header("job") == header
+
+
+class TestIssueMappingStore:
+    @pytest.fixture
+    def store(self, tmp_path):
+        return IssueMappingStore(tmp_path / "mappings.sqlite3")
+
+    def test_add_replaces_previous_mapping(self, store):
+        source, target = ProjectRef("a", "1"), ProjectRef("b", "2")
+        store.add(source, 1, target, 10)
+        store.add(source, 1, target, 11)
+
+        assert store.get(source, 1, target) == 11
+        assert store.get(source, 1, ProjectRef("b", "3")) is None
+
+    def test_export_and_import(self, store, tmp_path):
+        source, target = ProjectRef("a", "1"), ProjectRef("b", "2")
+        store.add(source, 1, target, 10)
+        store.add(source, 2, target, 20)
+        file = io.StringIO()
+
+        assert store.export(file) == 2
+        other_store = IssueMappingStore(tmp_path / "other.sqlite3")
+        file.seek(0)
+
+        assert other_store.import_(file) == 2
+        assert other_store.get(source, 2, target) == 20
+
+
+class TestIssueTitleIndex:
+    @pytest.fixture
+    def client(self):
+        return InMemoryIssueClient()
+
+    @pytest.mark.asyncio
+    async def test_find_returns_first_issue_with_exact_title(self, client):
+        issue = await client.create_issue("Title", "Description")
+        await client.create_issue("Title", "Other description")
+        await client.create_issue("Title 2", "Description")
+
+        index = IssueTitleIndex(client)
+
+        assert await index.find("Title") == issue
+        assert await index.find("Titl") is None
+
+    @pytest.mark.asyncio
+    async def test_issues_are_listed_only_once(self, client):
+        await client.create_issue("Title", "Description")
+        client.iter_issues = mock.Mock(wraps=client.iter_issues)
+        index = IssueTitleIndex(client)
+
+        await asyncio.gather(index.find("Title"), index.find("Other title"))
+
+        client.iter_issues.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_added_issue_can_be_found(self, client):
+        index = IssueTitleIndex(client)
+        await index.find("Title")
+
+        issue = await client.create_issue("Title", "Description")
+        index.add(issue)
+
+        assert await index.find("Title") == issue
+
+
+class TestSyncService:
+    @pytest.fixture
+    def source(self):
+        return InMemoryIssueClient(base_url="memory://source")
+
+    @pytest.fixture
+    def target(self):
+        return InMemoryIssueClient(base_url="memory://target")
+
+    @pytest.fixture
+    def state_store(self, tmp_path):
+        return SyncStateStore(tmp_path / "sync.sqlite3")
+
+    @pytest.fixture
+    def service(self, source, target, state_store):
+        return SyncService(source, target, state_store, "source->target")
+
+    @pytest.mark.asyncio
+    async def test_first_sync_creates_all_issues(self, source, target, service):
+        issues = [await source.create_issue(f"Title {i}", "") for i in range(3)]
+
+        report = await service.sync()
+
+        assert len(report.created) == 3
+        assert sorted(issue.title for issue in target.issues.values()) == [
+            issue.title for issue in issues
+        ]
+        assert report.cursor == max(issue.updated_at for issue in issues)
+
+    @pytest.mark.asyncio
+    async def test_next_sync_processes_only_changed_issues(
+        self, source, target, service
+    ):
+        issue = await source.create_issue("Title", "Description")
+        await source.create_issue("Other title", "Description")
+        await service.sync(description_format="{description}!")
+        await source.update_issue(issue.id, "Title", "New description")
+
+        report = await service.sync(description_format="{description}!")
+
+        assert [issue.title for issue in report.updated] == ["Title"]
+        assert len(report.created) == 0
+        assert (await target.find_issues("Title"))[0].description == (
+            "New description!"
+        )
+
+    @pytest.mark.asyncio
+    async def test_changed_issue_is_searched_without_listing_target(
+        self, source, target, service
+    ):
+        for index in range(10):
+            await target.create_issue(f"Other title {index}", "")
+        await source.create_issue("Title", "Description")
+        await target.create_issue("Title", "Old description")
+        target.iter_issues = mock.Mock(side_effect=AssertionError)
+        target.find_issues = mock.AsyncMock(wraps=target.find_issues)
+
+        report = await service.sync()
+
+        assert [issue.description for issue in report.updated] == ["Description"]
+        target.find_issues.assert_awaited_once_with("Title")
+
+    @pytest.mark.asyncio
+    async def test_cursor_is_not_advanced_past_failed_issue(
+        self, source, target, service, state_store
+    ):
+        issue_1 = await source.create_issue("Title 1", "")
+        await source.create_issue("Title 2", "")
+        create_issue = target.create_issue
+
+        async def failing_create_issue(title, *args, **kwargs):
+            if title == issue_1.title:
+                raise ValueError("Error")
+            return await create_issue(title, *args, **kwargs)
+
+        target.create_issue = failing_create_issue
+
+        report = await service.sync()
+
+        assert list(report.errors) == [issue_1.id]
+        assert state_store.get_cursor("source->target") == issue_1.updated_at
+
+    @pytest.mark.asyncio
+    async def test_mapped_issue_is_updated_after_title_change(
+        self, source, target, state_store, tmp_path
+    ):
+        mapping = IssueMapping(
+            IssueMappingStore(tmp_path / "mappings.sqlite3"),
+            ProjectRef("memory", "source"),
+            ProjectRef("memory", "target"),
+        )
+        service = SyncService(source, target, state_store, "key", mapping=mapping)
+        issue = await source.create_issue("Title", "Description")
+        await service.sync()
+        await source.update_issue(issue.id, "New title", "Description")
+
+        report = await service.sync()
+
+        assert [issue.title for issue in report.updated] == ["New title"]
+        assert [issue.title for issue in target.issues.values()] == ["New title"]
+
+    @pytest.mark.asyncio
+    async def test_mapped_issues_are_fetched_by_id_in_a_batch(
+        self, source, target, state_store, tmp_path
+    ):
+        mapping = IssueMapping(
+            IssueMappingStore(tmp_path / "mappings.sqlite3"),
+            ProjectRef("memory", "source"),
+            ProjectRef("memory", "target"),
+        )
+        service = SyncService(source, target, state_store, "key", mapping=mapping)
+        issues = [await source.create_issue(f"Title {i}", "") for i in range(3)]
+        await service.sync()
+        for issue in issues:
+            await source.update_issue(issue.id, issue.title, "Changed")
+        target.iter_issues = mock.Mock(side_effect=AssertionError)
+        target.find_issues = mock.AsyncMock(side_effect=AssertionError)
+        target.get_issues = mock.AsyncMock(wraps=target.get_issues)
+
+        report = await service.sync()
+
+        assert len(report.updated) == 3
+        target.get_issues.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_removed_mapped_issue_is_created_again(
+        self, source, target, state_store, tmp_path
+    ):
+        mapping = IssueMapping(
+            IssueMappingStore(tmp_path / "mappings.sqlite3"),
+            ProjectRef("memory", "source"),
+            ProjectRef("memory", "target"),
+        )
+        service = SyncService(source, target, state_store, "key", mapping=mapping)
+        issue = await source.create_issue("Title", "Description")
+        await service.sync()
+        target.issues.clear()
+
+        report = await service.sync(full=True)
+
+        [copy] = report.created
+        assert mapping.get_target_id(issue.id) == copy.id
+
+    @pytest.mark.asyncio
+    async def test_unchanged_mapped_issue_is_not_updated(
+        self, source, target, state_store, tmp_path
+    ):
+        mapping = IssueMapping(
+            IssueMappingStore(tmp_path / "mappings.sqlite3"),
+            ProjectRef("memory", "source"),
+            ProjectRef("memory", "target"),
+        )
+        service = SyncService(source, target, state_store, "key", mapping=mapping)
+        await source.create_issue("Title", "Description")
+        await service.sync()
+        target.update_issue = mock.AsyncMock(side_effect=AssertionError)
+
+        report = await service.sync(full=True)
+
+        assert [issue.title for issue in report.unchanged] == ["Title"]
+        assert not report.updated and not report.errors
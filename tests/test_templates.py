@@ -0,0 +1,73 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from issx.domain.issues import Issue
+from issx.domain.templates import Template, TemplateError, compile_template
+
+
+@pytest.fixture
+def issue():
+    return Issue(
+        id=7,
+        title="Title",
+        description="First line\nSecond line",
+        web_url="https://example.com/7",
+        reference="#7",
+        updated_at=datetime(2024, 5, 1),
+        labels=("bug", "ui"),
+    )
+
+
+class TestTemplate:
+    @pytest.mark.parametrize(
+        "source, expected",
+        [
+            ("[{reference}] {title}", "[#7] Title"),
+            ("{{title}} {id:03d}", "{title} 007"),
+            ("{updated_at.year}", "2024"),
+            ("{description|first_line|upper}", "FIRST LINE"),
+            ("{description|truncate(5)}", "Firs…"),
+            ("{title!r}", "'Title'"),
+            ("{labels|join}", "bug, ui"),
+            ("{labels|join(' ')}", "bug ui"),
+        ],
+    )
+    def test_render(self, issue, source, expected):
+        assert Template(source).render(issue) == expected
+
+    def test_fields_lists_only_used_attributes(self):
+        assert Template("{title} {updated_at.year}").fields == {"title", "updated_at"}
+
+    @pytest.mark.parametrize(
+        "source",
+        [
+            "{unknown}",
+            "{}",
+            "{title",
+            "{title|unknown}",
+            "{title|truncate}",
+            "{title.foo}",
+            "{updated_at.foo}",
+            "{title.__class__}",
+            "{labels|join(':')}",
+            "{description|default('n/a: none')}",
+        ],
+    )
+    def test_invalid_template_raises_error(self, source):
+        with pytest.raises(TemplateError):
+            Template(source)
+
+    def test_missing_nested_attribute_raises_error(self, issue):
+        template = Template("{closed_at.year}")
+
+        with pytest.raises(TemplateError, match="closed_at.year"):
+            template.render(issue)
+
+    def test_unused_attributes_are_not_read(self):
+        issue = SimpleNamespace(title="Title")
+
+        assert Template("{title}").render(issue) == "Title"  # type: ignore[arg-type]
+
+    def test_compile_template_reuses_compiled_templates(self):
+        assert compile_template("{title}") is compile_template("{title}")